@@ -4,17 +4,22 @@ Maneja las peticiones del API Gateway para gestión de imágenes
 """
 import json
 import os
+import base64
+import hashlib
+import hmac
 import boto3
 from datetime import datetime, timedelta
 from decimal import Decimal
+from urllib.parse import quote
 import logging
 
 # Configuración
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-s3_client = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
+session = boto3.session.Session()
+s3_client = session.client('s3')
+dynamodb = session.resource('dynamodb')
 
 RAW_BUCKET = os.environ['RAW_BUCKET']
 PROCESSED_BUCKET = os.environ['PROCESSED_BUCKET']
@@ -26,6 +31,23 @@ table = dynamodb.Table(DYNAMODB_TABLE)
 # URL firmada válida por 15 minutos
 PRESIGNED_URL_EXPIRATION = 900
 
+# Índices ordenados por fecha de carga
+GADGET_UPLOADED_AT_INDEX = 'GadgetUploadedAtIndex'
+ENVIRONMENT_UPLOADED_AT_INDEX = 'EnvironmentUploadedAtIndex'
+
+# Atributos del LastEvaluatedKey de cada índice (clave de la tabla + clave del índice)
+CURSOR_ATTRIBUTES = {
+    GADGET_UPLOADED_AT_INDEX: {'gadgetId', 'imageId', 'uploadedAt'},
+    ENVIRONMENT_UPLOADED_AT_INDEX: {'environment', 'uploadedAt', 'gadgetId', 'imageId'}
+}
+
+# Paginación de GET /images
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+# Claves de firma SigV4 derivadas, por (access key, fecha, región)
+_signing_key_cache = {}
+
 
 def lambda_handler(event, context):
     """
@@ -108,42 +130,182 @@ def handle_upload_url(event, user_email):
 def handle_list_images(event, user_email):
     """
     GET /images
-    Lista todas las imágenes con paginación
+    Lista las imágenes ordenadas por uploadedAt con paginación por cursor.
+
+    Query params:
+      gadgetId  - filtra por gadget (opcional)
+      limit     - tamaño de página (máx. MAX_PAGE_SIZE)
+      cursor    - token opaco devuelto como nextCursor en la página anterior
+      order     - 'desc' (default, más recientes primero) o 'asc'
+      include   - 'urls' agrega URLs firmadas del thumbnail a cada imagen
     """
     try:
         query_params = event.get('queryStringParameters') or {}
         gadget_id = query_params.get('gadgetId')
-        limit = int(query_params.get('limit', 50))
+        include = set(filter(None, query_params.get('include', '').split(',')))
+        
+        try:
+            limit = int(query_params.get('limit', DEFAULT_PAGE_SIZE))
+        except ValueError:
+            return response(400, {'error': 'limit must be an integer'})
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        query_kwargs = {
+            'Limit': limit,
+            'ScanIndexForward': query_params.get('order', 'desc') == 'asc'
+        }
         
         if gadget_id:
-            # Query por gadgetId específico
-            response_data = table.query(
-                KeyConditionExpression='gadgetId = :gid',
-                ExpressionAttributeValues={':gid': gadget_id},
-                Limit=limit
-            )
+            # Imágenes de un gadget, ordenadas por fecha
+            partition = ('gadgetId', gadget_id)
+            query_kwargs.update({
+                'IndexName': GADGET_UPLOADED_AT_INDEX,
+                'KeyConditionExpression': 'gadgetId = :gid',
+                'ExpressionAttributeValues': {':gid': gadget_id}
+            })
         else:
-            # Scan de toda la tabla
-            response_data = table.scan(Limit=limit)
+            # Todas las imágenes del ambiente, ordenadas por fecha (sin scan)
+            partition = ('environment', ENVIRONMENT)
+            query_kwargs.update({
+                'IndexName': ENVIRONMENT_UPLOADED_AT_INDEX,
+                'KeyConditionExpression': '#env = :env',
+                'ExpressionAttributeNames': {'#env': 'environment'},
+                'ExpressionAttributeValues': {':env': ENVIRONMENT}
+            })
+        
+        cursor = query_params.get('cursor')
+        if cursor:
+            try:
+                query_kwargs['ExclusiveStartKey'] = decode_cursor(cursor, query_kwargs['IndexName'], partition)
+            except ValueError:
+                return response(400, {'error': 'Invalid cursor'})
+        
+        response_data = table.query(**query_kwargs)
         
         items = response_data.get('Items', [])
         
         # Convertir Decimal a float para JSON
         items = json.loads(json.dumps(items, default=decimal_default))
         
+        if 'urls' in include:
+            keys = [item.get('versions', {}).get('thumbnail') for item in items]
+            urls = presign_get_urls(PROCESSED_BUCKET, [key for key in keys if key])
+            for item, key in zip(items, keys):
+                if key:
+                    item['thumbnailUrl'] = urls[key]
+        
+        last_key = response_data.get('LastEvaluatedKey')
+        
         logger.info(f"Listed {len(items)} images")
         
-        return response(200, {
+        body = {
             'images': items,
             'count': len(items),
-            'scannedCount': response_data.get('ScannedCount', 0)
-        })
+            'scannedCount': response_data.get('ScannedCount', 0),
+            'nextCursor': encode_cursor(last_key) if last_key else None
+        }
+        if 'urls' in include:
+            body['urlExpiresIn'] = PRESIGNED_URL_EXPIRATION
+        
+        return response(200, body)
     
     except Exception as e:
         logger.error(f"Error listing images: {str(e)}")
         return response(500, {'error': 'Failed to list images'})
 
 
+def encode_cursor(last_evaluated_key):
+    """
+    Convierte un LastEvaluatedKey de DynamoDB en un cursor opaco
+    """
+    raw = json.dumps(last_evaluated_key, default=decimal_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, index_name, partition):
+    """
+    Reconstruye el ExclusiveStartKey a partir de un cursor opaco.
+    El cursor debe venir de una consulta al mismo índice y partición
+    (gadgetId o environment); si no, es un error del cliente (400)
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    
+    if not isinstance(key, dict) or not all(isinstance(v, str) for v in key.values()):
+        raise ValueError('Invalid cursor')
+    attribute, value = partition
+    if set(key) != CURSOR_ATTRIBUTES[index_name] or key[attribute] != value:
+        raise ValueError('Invalid cursor')
+    return key
+
+
+def presign_get_urls(bucket, keys, expires_in=PRESIGNED_URL_EXPIRATION):
+    """
+    Firma URLs GET (SigV4 por query string) para varias keys en una pasada.
+
+    Equivalente a s3_client.generate_presigned_url('get_object', ...), pero
+    las credenciales se leen una sola vez por página y la clave de firma
+    derivada se reutiliza entre llamadas del mismo día.
+    """
+    credentials = session.get_credentials().get_frozen_credentials()
+    region = s3_client.meta.region_name
+    now = datetime.utcnow()
+    amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+    date_stamp = now.strftime('%Y%m%d')
+    scope = f"{date_stamp}/{region}/s3/aws4_request"
+    signing_key = get_signing_key(credentials.secret_key, date_stamp, region)
+    
+    host = f"{bucket}.s3.{region}.amazonaws.com"
+    base_params = {
+        'X-Amz-Algorithm': 'AWS4-HMAC-SHA256',
+        'X-Amz-Credential': f"{credentials.access_key}/{scope}",
+        'X-Amz-Date': amz_date,
+        'X-Amz-Expires': str(expires_in),
+        'X-Amz-SignedHeaders': 'host'
+    }
+    if credentials.token:
+        base_params['X-Amz-Security-Token'] = credentials.token
+    query = '&'.join(
+        f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}"
+        for k, v in sorted(base_params.items())
+    )
+    
+    urls = {}
+    for key in keys:
+        path = '/' + quote(key, safe='/-_.~')
+        canonical_request = f"GET\n{path}\n{query}\nhost:{host}\n\nhost\nUNSIGNED-PAYLOAD"
+        string_to_sign = '\n'.join([
+            'AWS4-HMAC-SHA256',
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
+        ])
+        signature = hmac.new(signing_key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+        urls[key] = f"https://{host}{path}?{query}&X-Amz-Signature={signature}"
+    
+    return urls
+
+
+def get_signing_key(secret_key, date_stamp, region):
+    """
+    Deriva (o reutiliza) la clave de firma SigV4 para S3
+    """
+    cache_key = (secret_key, date_stamp, region)
+    signing_key = _signing_key_cache.get(cache_key)
+    if signing_key is None:
+        k_date = hmac.new(f"AWS4{secret_key}".encode('utf-8'), date_stamp.encode('utf-8'), hashlib.sha256).digest()
+        k_region = hmac.new(k_date, region.encode('utf-8'), hashlib.sha256).digest()
+        k_service = hmac.new(k_region, b's3', hashlib.sha256).digest()
+        signing_key = hmac.new(k_service, b'aws4_request', hashlib.sha256).digest()
+        # Las credenciales rotan: solo se conserva la clave vigente
+        _signing_key_cache.clear()
+        _signing_key_cache[cache_key] = signing_key
+    return signing_key
+
+
 def handle_get_image(image_id, user_email):
     """
     GET /images/{imageId}
@@ -5,12 +5,17 @@ Procesa imágenes subidas a S3, genera thumbnails y versiones optimizadas
 import json
 import os
 import boto3
-import uuid
+import hashlib
+import tempfile
+import threading
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
 from datetime import datetime
-from PIL import Image
-from io import BytesIO
+from PIL import Image, ImageOps
 import logging
 
+from utils.image_helper import describe_image, probe_s3_image
+
 # Configuración
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -26,6 +31,27 @@ ENVIRONMENT = os.environ.get('ENVIRONMENT', 'sandbox')
 THUMBNAIL_SIZE = (256, 256)
 PREVIEW_SIZE = (1024, 1024)
 
+# Límites de entrada (se validan con la cabecera, antes de la descarga completa)
+MAX_IMAGE_BYTES = int(os.environ.get('MAX_IMAGE_BYTES', 50 * 1024 * 1024))
+MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', 100 * 1000 * 1000))
+
+# Lectura del objeto original por bloques (para calcular el fingerprint)
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Escritura en S3: 'stream' sube partes multipart a medida que se codifica,
+# 'spool' codifica a un archivo temporal (en memoria hasta SPOOL_MAX_MEMORY,
+# luego en /tmp) y lo sube con la transferencia administrada de boto3
+UPLOAD_MODE = os.environ.get('UPLOAD_MODE', 'stream')
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+# Pocas partes en vuelo para que la transferencia también tenga memoria acotada
+SPOOL_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=MULTIPART_PART_SIZE,
+    multipart_chunksize=MULTIPART_PART_SIZE,
+    max_concurrency=2
+)
+CONTENT_HASH_INDEX = 'ContentHashIndex'
+
 table = dynamodb.Table(DYNAMODB_TABLE)
 
 
@@ -43,21 +69,23 @@ def lambda_handler(event, context):
             
             logger.info(f"Processing image: s3://{bucket}/{key}")
             
-            # Descargar imagen original
-            response = s3_client.get_object(Bucket=bucket, Key=key)
-            image_data = response['Body'].read()
-            
-            # Validar que es una imagen
-            try:
-                img = Image.open(BytesIO(image_data))
-                original_format = img.format
-                original_size = img.size
-            except Exception as e:
-                logger.error(f"Invalid image format: {e}")
+            # Inspeccionar solo la cabecera para rechazar archivos inválidos
+            # o demasiado grandes sin descargarlos
+            probe = probe_s3_image(s3_client, bucket, key)
+            if not probe['valid'] and not probe.get('truncated'):
+                logger.error(f"Invalid image format: {probe.get('error')}")
+                continue
+            if probe['contentLength'] > MAX_IMAGE_BYTES or exceeds_pixel_limit(probe):
+                logger.error(f"Image rejected (too large): {probe}")
                 continue
             
-            # Generar ID único para la imagen
-            image_id = str(uuid.uuid4())
+            # Descargar imagen original calculando su fingerprint
+            response = s3_client.get_object(Bucket=bucket, Key=key)
+            original_file, content_hash = read_with_fingerprint(response['Body'])
+            
+            # El ID se deriva del contenido: una re-entrega del evento o una
+            # carga duplicada producen el mismo imageId
+            image_id = content_hash[:32]
             
             # Extraer gadgetId del nombre del archivo o usar default
             # Formato esperado: gadgetId/filename.jpg
@@ -69,25 +97,42 @@ def lambda_handler(event, context):
                 gadget_id = 'unknown'
                 filename = key
             
-            # Procesar y guardar versiones
-            versions = {}
-            
-            # 1. Original (validada y optimizada)
-            original_key = f"{gadget_id}/{image_id}/original.jpg"
-            save_image(img, original_key, quality=95)
-            versions['original'] = original_key
-            
-            # 2. Thumbnail
-            thumbnail_key = f"{gadget_id}/{image_id}/thumbnail.jpg"
-            thumbnail = create_thumbnail(img, THUMBNAIL_SIZE)
-            save_image(thumbnail, thumbnail_key, quality=85)
-            versions['thumbnail'] = thumbnail_key
+            existing = find_processed_image(content_hash, gadget_id)
+            if existing and existing['gadgetId'] == gadget_id:
+                logger.info(f"Duplicate image skipped: {gadget_id}/{image_id} (s3://{bucket}/{key})")
+                continue
             
-            # 3. Preview
-            preview_key = f"{gadget_id}/{image_id}/preview.jpg"
-            preview = create_thumbnail(img, PREVIEW_SIZE)
-            save_image(preview, preview_key, quality=90)
-            versions['preview'] = preview_key
+            if existing:
+                # Mismo contenido ya procesado para otro gadget: enlazar versiones
+                # con un imageId propio (GET /images/{imageId} debe ser único)
+                image_id = linked_image_id(content_hash, gadget_id)
+                logger.info(f"Linking {gadget_id}/{image_id} to {existing['gadgetId']}/{existing['imageId']}")
+                versions = existing['versions']
+                original_size = (int(existing['originalSize']['width']), int(existing['originalSize']['height']))
+                original_format = existing.get('format')
+                linked_from = f"{existing['gadgetId']}/{existing['imageId']}"
+            else:
+                # Validar que es una imagen
+                try:
+                    img = Image.open(original_file)
+                    if not probe['valid']:
+                        # La cabecera no cabía en el probe: inspeccionar el objeto completo
+                        probe.update(describe_image(img), valid=True)
+                except Exception as e:
+                    logger.error(f"Invalid image format: {e}")
+                    continue
+                if exceeds_pixel_limit(probe):
+                    logger.error(f"Image rejected (too large): {probe}")
+                    continue
+                original_format = probe['format']
+                original_size = (probe['width'], probe['height'])
+                
+                # Aplicar la orientación EXIF antes de generar las versiones
+                if probe['orientation'] != 1:
+                    img = ImageOps.exif_transpose(img)
+                
+                versions = process_versions(img, gadget_id, image_id)
+                linked_from = None
             
             # Guardar metadatos en DynamoDB
             metadata = {
@@ -99,6 +144,7 @@ def lambda_handler(event, context):
                     'height': original_size[1]
                 },
                 'format': original_format or 'JPEG',
+                'contentHash': content_hash,
                 'versions': versions,
                 'uploadedAt': datetime.utcnow().isoformat(),
                 'processedAt': datetime.utcnow().isoformat(),
@@ -106,7 +152,21 @@ def lambda_handler(event, context):
                 'status': 'processed'
             }
             
-            table.put_item(Item=metadata)
+            if linked_from:
+                metadata['linkedFrom'] = linked_from
+            
+            # Escritura condicional: con entrega at-least-once solo la primera
+            # invocación crea el registro
+            try:
+                table.put_item(
+                    Item=metadata,
+                    ConditionExpression='attribute_not_exists(imageId)'
+                )
+            except ClientError as e:
+                if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                logger.info(f"Image already registered: {gadget_id}/{image_id}")
+                continue
             
             logger.info(f"Image processed successfully: {image_id}")
             logger.info(f"Metadata saved to DynamoDB: {gadget_id}/{image_id}")
@@ -124,12 +184,90 @@ def lambda_handler(event, context):
         raise
 
 
+def exceeds_pixel_limit(probe):
+    """
+    Indica si la imagen inspeccionada supera MAX_IMAGE_PIXELS
+    """
+    return probe['valid'] and probe['width'] * probe['height'] > MAX_IMAGE_PIXELS
+
+
+def read_with_fingerprint(body):
+    """
+    Lee el cuerpo del objeto por bloques y calcula su SHA-256 en la misma pasada.
+    Retorna un archivo temporal posicionado al inicio y el hash.
+    """
+    digest = hashlib.sha256()
+    # El original pasa a /tmp si supera SPOOL_MAX_MEMORY
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, dir=tempfile.gettempdir())
+    for chunk in iter(lambda: body.read(READ_CHUNK_SIZE), b''):
+        digest.update(chunk)
+        spool.write(chunk)
+    spool.seek(0)
+    return spool, digest.hexdigest()
+
+
+def find_processed_image(content_hash, gadget_id=None):
+    """
+    Busca una imagen ya procesada con el mismo fingerprint de contenido.
+    Prefiere el registro del mismo gadget y, si no hay, el original (no enlazado)
+    """
+    response = table.query(
+        IndexName=CONTENT_HASH_INDEX,
+        KeyConditionExpression='contentHash = :h',
+        ExpressionAttributeValues={':h': content_hash}
+    )
+    items = response.get('Items', [])
+    for item in items:
+        if item['gadgetId'] == gadget_id:
+            return item
+    for item in items:
+        if item['imageId'] == content_hash[:32]:
+            return item
+    return items[0] if items else None
+
+
+def linked_image_id(content_hash, gadget_id):
+    """
+    imageId de un registro enlazado: distinto del original pero estable,
+    para que una re-entrega del evento no cree otro registro
+    """
+    return hashlib.sha256(f"{gadget_id}/{content_hash}".encode('utf-8')).hexdigest()[:32]
+
+
+def process_versions(img, gadget_id, image_id):
+    """
+    Genera y guarda las versiones original, thumbnail y preview
+    """
+    versions = {}
+    
+    # 1. Original (validada y optimizada)
+    original_key = f"{gadget_id}/{image_id}/original.jpg"
+    save_image(img, original_key, quality=95)
+    versions['original'] = original_key
+    
+    # 2. Thumbnail
+    thumbnail_key = f"{gadget_id}/{image_id}/thumbnail.jpg"
+    thumbnail = create_thumbnail(img, THUMBNAIL_SIZE)
+    save_image(thumbnail, thumbnail_key, quality=85)
+    versions['thumbnail'] = thumbnail_key
+    
+    # 3. Preview
+    preview_key = f"{gadget_id}/{image_id}/preview.jpg"
+    preview = create_thumbnail(img, PREVIEW_SIZE)
+    save_image(preview, preview_key, quality=90)
+    versions['preview'] = preview_key
+    
+    return versions
+
+
 def create_thumbnail(img, size):
     """
     Crea un thumbnail manteniendo el aspect ratio
     """
-    img_copy = img.copy()
-    img_copy.thumbnail(size, Image.Resampling.LANCZOS)
+    # Redimensionar directamente al tamaño final (sin copiar el bitmap completo)
+    scale = min(1.0, size[0] / img.width, size[1] / img.height)
+    target = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    img_copy = img.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
     
     # Crear imagen con fondo blanco si es necesario
     if img_copy.mode in ('RGBA', 'LA', 'P'):
@@ -146,10 +284,8 @@ def create_thumbnail(img, size):
 
 def save_image(img, key, quality=90):
     """
-    Guarda una imagen en S3
+    Guarda una imagen en S3 sin mantener toda la salida codificada en memoria
     """
-    buffer = BytesIO()
-    
     # Convertir a RGB si es necesario
     if img.mode in ('RGBA', 'LA', 'P'):
         background = Image.new('RGB', img.size, (255, 255, 255))
@@ -163,15 +299,134 @@ def save_image(img, key, quality=90):
     elif img.mode != 'RGB':
         img = img.convert('RGB')
     
-    img.save(buffer, format='JPEG', quality=quality, optimize=True)
-    buffer.seek(0)
+    extra_args = {'ContentType': 'image/jpeg', 'ServerSideEncryption': 'aws:kms'}
     
-    s3_client.put_object(
-        Bucket=PROCESSED_BUCKET,
-        Key=key,
-        Body=buffer,
-        ContentType='image/jpeg',
-        ServerSideEncryption='aws:kms'
-    )
+    if UPLOAD_MODE == 'spool':
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, dir=tempfile.gettempdir()) as spool:
+            img.save(spool, format='JPEG', quality=quality, optimize=True)
+            spool.seek(0)
+            s3_client.upload_fileobj(spool, PROCESSED_BUCKET, key, ExtraArgs=extra_args, Config=SPOOL_TRANSFER_CONFIG)
+    else:
+        writer = S3MultipartWriter(PROCESSED_BUCKET, key, extra_args)
+        try:
+            img.save(writer, format='JPEG', quality=quality, optimize=True)
+            writer.close()
+        except Exception:
+            writer.abort()
+            raise
     
     logger.info(f"Saved image to s3://{PROCESSED_BUCKET}/{key}")
+
+
+class S3MultipartWriter:
+    """
+    Archivo de solo escritura que sube a S3 por partes mientras se escribe.
+
+    Pillow escribe la salida del codificador directamente en fileno() (un
+    pipe) y un hilo lo drena subiendo partes de MULTIPART_PART_SIZE, así la
+    salida codificada nunca se acumula completa en memoria. Si toda la salida
+    cabe en una parte se usa un único put_object.
+    """
+    
+    def __init__(self, bucket, key, extra_args, part_size=MULTIPART_PART_SIZE):
+        self.bucket = bucket
+        self.key = key
+        self.extra_args = extra_args
+        self.part_size = part_size
+        self.buffer = bytearray()
+        self.upload_id = None
+        self.parts = []
+        self.closed = False
+        self._write_fd = None
+        self._reader = None
+        self._reader_error = None
+    
+    def fileno(self):
+        if self._write_fd is None:
+            read_fd, self._write_fd = os.pipe()
+            self._reader = threading.Thread(target=self._drain, args=(read_fd,), daemon=True)
+            self._reader.start()
+        return self._write_fd
+    
+    def write(self, data):
+        if self._write_fd is not None:
+            os.write(self._write_fd, data)
+        else:
+            self._append(data)
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        if self.closed:
+            return
+        self._stop_reader()
+        if self.upload_id is None:
+            s3_client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self.buffer), **self.extra_args)
+        else:
+            if self.buffer:
+                self._upload_part(bytes(self.buffer))
+            s3_client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                UploadId=self.upload_id,
+                MultipartUpload={'Parts': self.parts}
+            )
+        self.buffer = bytearray()
+        self.closed = True
+    
+    def abort(self):
+        if self.closed:
+            return
+        try:
+            self._stop_reader()
+        except Exception:
+            pass
+        if self.upload_id is not None:
+            s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+        self.buffer = bytearray()
+        self.closed = True
+    
+    def _stop_reader(self):
+        if self._write_fd is not None:
+            os.close(self._write_fd)
+            self._write_fd = None
+            self._reader.join()
+        if self._reader_error is not None:
+            raise self._reader_error
+    
+    def _drain(self, read_fd):
+        with os.fdopen(read_fd, 'rb') as pipe:
+            for chunk in iter(lambda: pipe.read(READ_CHUNK_SIZE), b''):
+                # Tras un error se sigue leyendo para no bloquear al codificador
+                if self._reader_error is None:
+                    try:
+                        self._append(chunk)
+                    except Exception as e:
+                        self._reader_error = e
+    
+    def _append(self, data):
+        # Se llena la parte exacta y se entrega sin copiarla
+        view = memoryview(data)
+        while view:
+            room = self.part_size - len(self.buffer)
+            self.buffer += view[:room]
+            view = view[room:]
+            if len(self.buffer) >= self.part_size:
+                part, self.buffer = self.buffer, bytearray()
+                self._upload_part(part)
+    
+    def _upload_part(self, data):
+        if self.upload_id is None:
+            response = s3_client.create_multipart_upload(Bucket=self.bucket, Key=self.key, **self.extra_args)
+            self.upload_id = response['UploadId']
+        part_number = len(self.parts) + 1
+        response = s3_client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=data
+        )
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
@@ -1,9 +1,88 @@
 from PIL import Image
 from io import BytesIO
+from botocore.exceptions import ClientError
 import logging
 
 logger = logging.getLogger()
 
+# Bytes iniciales que se leen para inspeccionar la cabecera
+PROBE_SIZE = 64 * 1024
+# Límite de lectura si los segmentos EXIF/ICC empujan la cabecera más allá
+MAX_PROBE_SIZE = 1024 * 1024
+
+EXIF_ORIENTATION_TAG = 0x0112
+
+
+def inspect_image(image_bytes):
+    """Lee formato, dimensiones y orientación EXIF abriendo la imagen una sola vez"""
+    return describe_image(Image.open(BytesIO(image_bytes)))
+
+
+def describe_image(img):
+    """Formato, modo, dimensiones y orientación EXIF de una imagen ya abierta"""
+    try:
+        orientation = img.getexif().get(EXIF_ORIENTATION_TAG, 1)
+    except Exception:
+        orientation = 1
+    return {
+        'format': img.format,
+        'mode': img.mode,
+        'width': img.width,
+        'height': img.height,
+        'orientation': orientation
+    }
+
+
+def probe_s3_image(s3_client, bucket, key, probe_size=PROBE_SIZE, max_probe_size=MAX_PROBE_SIZE):
+    """
+    Inspecciona una imagen en S3 leyendo solo su cabecera (GET con Range).
+
+    Retorna un dict con valid, format, mode, width, height, orientation y
+    contentLength (tamaño total del objeto). Si la imagen no es válida,
+    valid es False y error describe el motivo; si además truncated es True,
+    la cabecera no estaba en los primeros max_probe_size bytes y la
+    validación debe hacerse con el objeto completo.
+    """
+    result = {'valid': False, 'contentLength': None}
+    size = probe_size
+    while True:
+        try:
+            response = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{size - 1}")
+        except ClientError as e:
+            # Objeto vacío: S3 no admite Range sobre 0 bytes
+            if e.response['Error']['Code'] != 'InvalidRange':
+                raise
+            result.update({'contentLength': 0, 'error': 'Empty object'})
+            return result
+        head = response['Body'].read()
+        result['contentLength'] = content_length(response, len(head))
+        try:
+            result.update(inspect_image(head))
+            result['valid'] = True
+            return result
+        except Exception as e:
+            if len(head) >= result['contentLength']:
+                logger.error(f"Validación fallida: {str(e)}")
+                result['error'] = str(e)
+                return result
+            if size >= max_probe_size:
+                # Formatos con la cabecera al final (p. ej. TIFF): sin veredicto
+                logger.warning(f"Cabecera no encontrada en {size} bytes: {str(e)}")
+                result.update({'error': str(e), 'truncated': True})
+                return result
+            size = min(size * 4, max_probe_size)
+
+
+def content_length(response, read_length):
+    """Obtiene el tamaño total del objeto a partir de Content-Range"""
+    content_range = response.get('ContentRange')
+    if content_range and '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+        if total != '*':
+            return int(total)
+    return response.get('ContentLength', read_length)
+
+
 def validate_image(image_bytes):
     """Valida que sea una imagen válida"""
     try:
@@ -17,8 +96,8 @@ def validate_image(image_bytes):
 def get_image_dimensions(image_bytes):
     """Obtiene dimensiones de imagen"""
     try:
-        img = Image.open(BytesIO(image_bytes))
-        return {'width': img.width, 'height': img.height}
+        info = inspect_image(image_bytes)
+        return {'width': info['width'], 'height': info['height']}
     except Exception as e:
         logger.error(f"Error obteniendo dimensiones: {str(e)}")
         return None
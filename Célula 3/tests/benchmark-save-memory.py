@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark de Memoria de save_image (image-processor)
+Codifica originales de 10 a 40 MP con los modos de subida 'stream' y 'spool'
+y compara el pico de memoria de buffers Python (tracemalloc) con el enfoque
+anterior de BytesIO + put_object. El bitmap decodificado de Pillow no se
+contabiliza: se mide solo lo que crece con el tamaño de la salida.
+
+Falla (exit 1) si el pico de 'stream' o 'spool' supera el límite esperado.
+
+Requiere: pip install Pillow boto3
+"""
+
+import os
+import sys
+import argparse
+import importlib.util
+import time
+import tracemalloc
+from io import BytesIO
+
+from PIL import Image
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda')
+
+# Megapíxeles de los originales de prueba (40 MP ~ 7300x5475)
+MEGAPIXELS = [10, 20, 40]
+ASPECT_RATIO = 4 / 3
+
+# Margen para buffers de boto3/Pillow además de las partes en memoria
+OVERHEAD_BYTES = 2 * 1024 * 1024
+
+
+class DiscardingS3Client:
+    """
+    Stand-in de S3 que cuenta bytes y llamadas sin guardar el contenido
+    (para que el almacenamiento no contamine la medición de memoria)
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.bytes_received = 0
+
+    def _count(self, name, body=None):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if body is not None:
+            self.bytes_received += len(body)
+
+    def put_object(self, Body, **kwargs):
+        self._count('put_object', Body if isinstance(Body, (bytes, bytearray)) else Body.getvalue())
+        return {'ETag': '"put"'}
+
+    def create_multipart_upload(self, **kwargs):
+        self._count('create_multipart_upload')
+        return {'UploadId': 'upload-1'}
+
+    def upload_part(self, Body, PartNumber, **kwargs):
+        self._count('upload_part', Body)
+        return {'ETag': f'"part-{PartNumber}"'}
+
+    def complete_multipart_upload(self, **kwargs):
+        self._count('complete_multipart_upload')
+        return {}
+
+    def abort_multipart_upload(self, **kwargs):
+        self._count('abort_multipart_upload')
+        return {}
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None, Config=None):
+        # Como la transferencia administrada: hasta max_concurrency partes en memoria
+        self._count('upload_fileobj')
+        in_flight = []
+        for chunk in iter(lambda: fileobj.read(Config.multipart_chunksize), b''):
+            in_flight.append(chunk)
+            self.bytes_received += len(chunk)
+            if len(in_flight) >= Config.max_concurrency:
+                in_flight.pop(0)
+
+
+def load_processor():
+    """
+    Importa image-processor/lambda_function.py con variables de entorno locales
+    """
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ.setdefault('PROCESSED_BUCKET', 'acme-gadgets-processed-local')
+    os.environ.setdefault('DYNAMODB_TABLE', 'GadgetImages-local')
+    sys.path.insert(0, LAMBDA_DIR)
+
+    path = os.path.join(LAMBDA_DIR, 'image-processor', 'lambda_function.py')
+    spec = importlib.util.spec_from_file_location('image_processor', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def legacy_save(processor, img, key, quality):
+    """
+    Implementación anterior: toda la salida en un BytesIO y un único put_object
+    """
+    buffer = BytesIO()
+    img.save(buffer, format='JPEG', quality=quality, optimize=True)
+    buffer.seek(0)
+    processor.s3_client.put_object(Bucket=processor.PROCESSED_BUCKET, Key=key, Body=buffer)
+
+
+def make_original(megapixels):
+    """
+    Imagen con ruido (peor caso para JPEG: la salida no se comprime mucho)
+    """
+    height = int((megapixels * 1_000_000 / ASPECT_RATIO) ** 0.5)
+    width = int(height * ASPECT_RATIO)
+    noise = Image.effect_noise((width, height), 96)
+    return Image.merge('RGB', (noise, noise.rotate(90, expand=False), noise.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+
+
+def measure(fn):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, elapsed
+
+
+def run(megapixels_list, quality):
+    processor = load_processor()
+    # stream: una parte en armado; spool: max_concurrency partes en vuelo
+    limit = processor.SPOOL_TRANSFER_CONFIG.max_concurrency * processor.MULTIPART_PART_SIZE + OVERHEAD_BYTES
+    failures = []
+
+    print(f"Límite esperado para stream/spool: {limit / 1024 / 1024:.1f} MB")
+    print("-" * 78)
+    print(f"{'MP':>4} {'salida MB':>10} {'modo':>8} {'pico MB':>9} {'tiempo s':>9}  llamadas S3")
+
+    for megapixels in megapixels_list:
+        img = make_original(megapixels)
+        for mode in ('legacy', 'stream', 'spool'):
+            client = DiscardingS3Client()
+            processor.s3_client = client
+            processor.UPLOAD_MODE = mode
+            key = f"benchmark/{megapixels}mp-{mode}.jpg"
+
+            if mode == 'legacy':
+                peak, elapsed = measure(lambda: legacy_save(processor, img, key, quality))
+            else:
+                peak, elapsed = measure(lambda: processor.save_image(img, key, quality=quality))
+
+            output_mb = client.bytes_received / 1024 / 1024
+            calls = ', '.join(f"{name}={count}" for name, count in sorted(client.calls.items()))
+            print(f"{megapixels:>4} {output_mb:>10.1f} {mode:>8} {peak / 1024 / 1024:>9.1f} {elapsed:>9.2f}  {calls}")
+
+            if mode != 'legacy' and peak > limit:
+                failures.append(f"{megapixels} MP / {mode}: pico {peak / 1024 / 1024:.1f} MB")
+
+    print("-" * 78)
+    if failures:
+        print("✗ Pico de memoria por encima del límite:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("✓ El pico de memoria de stream/spool es acotado e independiente del tamaño de salida")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de memoria de save_image")
+    parser.add_argument('--megapixels', default=','.join(str(mp) for mp in MEGAPIXELS),
+                        help="Tamaños de original en MP separados por coma")
+    parser.add_argument('--quality', type=int, default=95, help="Calidad JPEG (la del original es 95)")
+    args = parser.parse_args()
+
+    sys.exit(run([int(mp) for mp in args.megapixels.split(',')], args.quality))
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Generador de Corpus de Imágenes para Benchmarks de Acme Image Handler
+Genera miles de imágenes deterministas (semilla fija) en paralelo, combinando
+tamaños (hasta 8K), modos de color y formatos, y escribe un manifest.
+"""
+
+import os
+import json
+import argparse
+import hashlib
+import random
+import time
+from itertools import product
+from multiprocessing import Pool
+from PIL import Image, ImageDraw
+
+# Configuración
+OUTPUT_DIR = "data/test-corpus"
+MANIFEST_FILE = "manifest.json"
+DEFAULT_COUNT = 1000
+DEFAULT_SEED = 42
+
+# Matriz de tamaños (clase -> dimensiones)
+SIZES = {
+    "vga": (640, 480),
+    "hd": (1280, 720),
+    "fhd": (1920, 1080),
+    "4k": (3840, 2160),
+    "8k": (7680, 4320),
+    "portrait": (1080, 1920),
+}
+
+MODES = ["RGB", "RGBA", "P", "L", "CMYK"]
+
+# Formato -> (extensión, modos que el formato puede guardar)
+FORMATS = {
+    "JPEG": ("jpg", {"RGB", "L", "CMYK"}),
+    "PNG": ("png", {"RGB", "RGBA", "P", "L"}),
+    "WEBP": ("webp", {"RGB", "RGBA"}),
+    "GIF": ("gif", {"P", "L"}),
+    "TIFF": ("tif", {"RGB", "RGBA", "P", "L", "CMYK"}),
+}
+
+
+def build_matrix(sizes, modes, formats):
+    """
+    Combinaciones válidas (tamaño, modo, formato) del corpus
+    """
+    return [
+        (size, mode, fmt)
+        for size, mode, fmt in product(sizes, modes, formats)
+        if mode in FORMATS[fmt][1]
+    ]
+
+
+def render_image(rng, dimensions, mode):
+    """
+    Dibuja una imagen sintética usando solo el generador recibido (determinista)
+    """
+    width, height = dimensions
+
+    # Fondo: gradientes por canal escalados al tamaño final
+    channels = []
+    for _ in range(3):
+        gradient = Image.linear_gradient('L').rotate(rng.randint(0, 359)).resize(dimensions, Image.Resampling.BILINEAR)
+        channels.append(gradient.point(lambda v, k=rng.randint(64, 255): v * k // 255))
+    img = Image.merge('RGB', channels)
+    draw = ImageDraw.Draw(img)
+
+    # Formas para que la compresión tenga bordes y detalle
+    for _ in range(rng.randint(20, 60)):
+        x0 = rng.randint(0, width - 1)
+        y0 = rng.randint(0, height - 1)
+        x1 = min(width - 1, x0 + rng.randint(width // 50, width // 4))
+        y1 = min(height - 1, y0 + rng.randint(height // 50, height // 4))
+        color = (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255))
+        if rng.random() < 0.5:
+            draw.rectangle([x0, y0, x1, y1], fill=color)
+        else:
+            draw.ellipse([x0, y0, x1, y1], outline=color, width=max(1, width // 400))
+
+    if mode == 'RGBA':
+        alpha = Image.radial_gradient('L').resize(dimensions, Image.Resampling.BILINEAR)
+        img.putalpha(alpha)
+    elif mode == 'P':
+        img = img.quantize(colors=rng.choice([16, 64, 256]), method=Image.Quantize.FASTOCTREE)
+    elif mode != 'RGB':
+        img = img.convert(mode)
+
+    return img
+
+
+def generate_one(task):
+    """
+    Genera y guarda una imagen del corpus (se ejecuta en un proceso worker)
+    """
+    index, size_class, mode, fmt, seed, output_dir = task
+    rng = random.Random(f"{seed}:{index}")
+    dimensions = SIZES[size_class]
+
+    start = time.perf_counter()
+    img = render_image(rng, dimensions, mode)
+
+    extension = FORMATS[fmt][0]
+    gadget_id = f"GADGET-{index % 100:04d}"
+    filename = f"{index:06d}-{size_class}-{mode}.{extension}"
+    relative_path = os.path.join(gadget_id, filename)
+    filepath = os.path.join(output_dir, relative_path)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+    save_kwargs = {}
+    if fmt in ('JPEG', 'WEBP'):
+        save_kwargs['quality'] = rng.choice([75, 85, 95])
+    elif fmt == 'TIFF':
+        save_kwargs['compression'] = 'tiff_lzw'
+    img.save(filepath, fmt, **save_kwargs)
+
+    with open(filepath, 'rb') as f:
+        sha256 = hashlib.sha256(f.read()).hexdigest()
+
+    return {
+        'index': index,
+        'path': relative_path,
+        'gadgetId': gadget_id,
+        'class': f"{size_class}/{mode}/{fmt}",
+        'sizeClass': size_class,
+        'mode': mode,
+        'format': fmt,
+        'resolution': {'width': dimensions[0], 'height': dimensions[1]},
+        'fileSize': os.path.getsize(filepath),
+        'sha256': sha256,
+        'generationMs': round((time.perf_counter() - start) * 1000, 1)
+    }
+
+
+def generate_corpus(count, seed, workers, output_dir, sizes, modes, formats):
+    """
+    Reparte el corpus en la matriz (round-robin) y lo genera en paralelo
+    """
+    matrix = build_matrix(sizes, modes, formats)
+    if not matrix:
+        raise SystemExit("La combinación de tamaños/modos/formatos no produce imágenes válidas")
+
+    # El orden de la matriz se baraja con la semilla para no agrupar 8K al final
+    random.Random(seed).shuffle(matrix)
+    tasks = [
+        (i, *matrix[i % len(matrix)], seed, output_dir)
+        for i in range(count)
+    ]
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"Generando {count} imágenes ({len(matrix)} combinaciones, {workers} workers, seed={seed})...")
+    print(f"Directorio de salida: {output_dir}")
+    print("-" * 50)
+
+    start = time.perf_counter()
+    entries = []
+    with Pool(processes=workers) as pool:
+        for entry in pool.imap_unordered(generate_one, tasks, chunksize=4):
+            entries.append(entry)
+            if len(entries) % 100 == 0:
+                print(f"✓ {len(entries)}/{count}")
+    elapsed = time.perf_counter() - start
+
+    entries.sort(key=lambda e: e['index'])
+    manifest = {
+        'seed': seed,
+        'count': count,
+        'sizes': {name: SIZES[name] for name in sizes},
+        'modes': modes,
+        'formats': formats,
+        'totalBytes': sum(e['fileSize'] for e in entries),
+        'images': entries
+    }
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    print("-" * 50)
+    print(f"✓ {count} imágenes generadas en {elapsed:.1f}s ({count / elapsed:.1f} img/s)")
+    print(f"✓ Manifest guardado en: {manifest_path}")
+    print(f"✓ Tamaño total: {manifest['totalBytes'] / 1024 / 1024:.2f} MB")
+    return manifest
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Genera un corpus determinista de imágenes de prueba")
+    parser.add_argument('--count', type=int, default=DEFAULT_COUNT, help="Número de imágenes")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Semilla (mismo valor = mismo corpus)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Procesos en paralelo")
+    parser.add_argument('--output', default=OUTPUT_DIR, help="Directorio de salida")
+    parser.add_argument('--sizes', default=','.join(SIZES), help="Clases de tamaño separadas por coma")
+    parser.add_argument('--modes', default=','.join(MODES), help="Modos de color separados por coma")
+    parser.add_argument('--formats', default=','.join(FORMATS), help="Formatos separados por coma")
+    args = parser.parse_args()
+
+    args.sizes = args.sizes.split(',')
+    args.modes = args.modes.split(',')
+    args.formats = [fmt.upper() for fmt in args.formats.split(',')]
+    for name, values, valid in (('sizes', args.sizes, SIZES), ('modes', args.modes, MODES), ('formats', args.formats, FORMATS)):
+        unknown = [v for v in values if v not in valid]
+        if unknown:
+            parser.error(f"{name} desconocidos: {', '.join(unknown)}")
+    return args
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    generate_corpus(args.count, args.seed, args.workers, args.output, args.sizes, args.modes, args.formats)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Replay del Corpus contra image-processor
+Sube el corpus generado por generate-test-corpus.py a un S3 local (moto) y
+ejecuta image-processor.lambda_handler imagen por imagen, reportando
+imágenes por segundo y latencia p50/p95 por clase (tamaño/modo/formato),
+además de las imágenes que el procesador descartó (rech).
+
+Requiere: pip install moto Pillow boto3
+"""
+
+import os
+import sys
+import json
+import argparse
+import importlib.util
+import logging
+import time
+from collections import defaultdict
+
+from moto import mock_aws
+import boto3
+
+# Configuración
+CORPUS_DIR = "data/test-corpus"
+RAW_BUCKET = "acme-gadgets-raw-local"
+PROCESSED_BUCKET = "acme-gadgets-processed-local"
+DYNAMODB_TABLE = "GadgetImages-local"
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'lambda')
+
+
+def percentile(values, pct):
+    """
+    Percentil por rango más cercano
+    """
+    ordered = sorted(values)
+    index = max(0, int(round(pct / 100 * len(ordered))) - 1)
+    return ordered[index]
+
+
+def create_resources():
+    """
+    Crea los buckets y la tabla (con sus índices) en el stand-in local
+    """
+    s3 = boto3.client('s3', region_name='us-east-1')
+    s3.create_bucket(Bucket=RAW_BUCKET)
+    s3.create_bucket(Bucket=PROCESSED_BUCKET)
+
+    def index(name, hash_key, range_key=None):
+        schema = [{'AttributeName': hash_key, 'KeyType': 'HASH'}]
+        if range_key:
+            schema.append({'AttributeName': range_key, 'KeyType': 'RANGE'})
+        return {'IndexName': name, 'KeySchema': schema, 'Projection': {'ProjectionType': 'ALL'}}
+
+    boto3.client('dynamodb', region_name='us-east-1').create_table(
+        TableName=DYNAMODB_TABLE,
+        BillingMode='PAY_PER_REQUEST',
+        AttributeDefinitions=[
+            {'AttributeName': name, 'AttributeType': 'S'}
+            for name in ('gadgetId', 'imageId', 'uploadedAt', 'environment', 'contentHash')
+        ],
+        KeySchema=[
+            {'AttributeName': 'gadgetId', 'KeyType': 'HASH'},
+            {'AttributeName': 'imageId', 'KeyType': 'RANGE'}
+        ],
+        GlobalSecondaryIndexes=[
+            index('GadgetUploadedAtIndex', 'gadgetId', 'uploadedAt'),
+            index('EnvironmentUploadedAtIndex', 'environment', 'uploadedAt'),
+            index('ContentHashIndex', 'contentHash')
+        ]
+    )
+    return s3
+
+
+def load_processor():
+    """
+    Importa image-processor/lambda_function.py (el directorio lleva guion)
+    """
+    os.environ['PROCESSED_BUCKET'] = PROCESSED_BUCKET
+    os.environ['DYNAMODB_TABLE'] = DYNAMODB_TABLE
+    os.environ['ENVIRONMENT'] = 'local'
+    sys.path.insert(0, LAMBDA_DIR)
+
+    path = os.path.join(LAMBDA_DIR, 'image-processor', 'lambda_function.py')
+    spec = importlib.util.spec_from_file_location('image_processor', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def replay(corpus_dir, limit=None, class_filter=None):
+    """
+    Ejecuta el handler para cada imagen del manifest y agrupa latencias por clase
+    """
+    with open(os.path.join(corpus_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+
+    images = manifest['images']
+    if class_filter:
+        images = [img for img in images if class_filter in img['class']]
+    if limit:
+        images = images[:limit]
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    rejected = defaultdict(int)
+
+    with mock_aws():
+        s3 = create_resources()
+        processor = load_processor()
+
+        print(f"Replay de {len(images)} imágenes desde {corpus_dir}")
+        print("-" * 50)
+
+        total_start = time.perf_counter()
+        for i, image in enumerate(images, 1):
+            key = image['path'].replace(os.sep, '/')
+            with open(os.path.join(corpus_dir, image['path']), 'rb') as f:
+                s3.put_object(Bucket=RAW_BUCKET, Key=key, Body=f.read())
+
+            event = {'Records': [{'s3': {'bucket': {'name': RAW_BUCKET}, 'object': {'key': key}}}]}
+            start = time.perf_counter()
+            try:
+                processor.lambda_handler(event, None)
+                latencies[image['class']].append(time.perf_counter() - start)
+            except Exception:
+                errors[image['class']] += 1
+            else:
+                # El handler no falla al descartar una imagen: confirmar que se registró
+                if not processor.find_processed_image(image['sha256']):
+                    rejected[image['class']] += 1
+
+            # El objeto original ya no se necesita: liberar memoria del stand-in
+            s3.delete_object(Bucket=RAW_BUCKET, Key=key)
+
+            if i % 100 == 0:
+                print(f"✓ {i}/{len(images)}")
+        total_elapsed = time.perf_counter() - total_start
+
+    report = {'total': len(images), 'elapsedSeconds': round(total_elapsed, 2), 'classes': {}}
+    for name in sorted(set(latencies) | set(errors)):
+        values = latencies.get(name, [])
+        busy = sum(values)
+        report['classes'][name] = {
+            'count': len(values),
+            'errors': errors.get(name, 0),
+            'rejected': rejected.get(name, 0),
+            'imagesPerSecond': round(len(values) / busy, 2) if busy else 0.0,
+            'p50Ms': round(percentile(values, 50) * 1000, 1) if values else None,
+            'p95Ms': round(percentile(values, 95) * 1000, 1) if values else None
+        }
+    return report
+
+
+def print_report(report):
+    print("-" * 50)
+    print(f"{'Clase':<28} {'n':>5} {'err':>4} {'rech':>5} {'img/s':>8} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, stats in report['classes'].items():
+        p50 = f"{stats['p50Ms']:.1f}" if stats['p50Ms'] is not None else '-'
+        p95 = f"{stats['p95Ms']:.1f}" if stats['p95Ms'] is not None else '-'
+        print(f"{name:<28} {stats['count']:>5} {stats['errors']:>4} {stats['rejected']:>5} {stats['imagesPerSecond']:>8.2f} {p50:>9} {p95:>9}")
+    print("-" * 50)
+    print(f"✓ {report['total']} imágenes en {report['elapsedSeconds']}s "
+          f"({report['total'] / report['elapsedSeconds']:.2f} img/s incluyendo carga a S3)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay del corpus contra image-processor.lambda_handler")
+    parser.add_argument('--corpus', default=CORPUS_DIR, help="Directorio con manifest.json")
+    parser.add_argument('--limit', type=int, help="Procesar solo las primeras N imágenes")
+    parser.add_argument('--class', dest='class_filter', help="Filtrar por clase (ej. 8k o RGBA/PNG)")
+    parser.add_argument('--json', dest='json_output', help="Guardar el reporte en un archivo JSON")
+    args = parser.parse_args()
+
+    # Credenciales ficticias para el stand-in local
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    logging.disable(logging.INFO)
+
+    report = replay(args.corpus, args.limit, args.class_filter)
+    print_report(report)
+
+    if args.json_output:
+        with open(args.json_output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Reporte guardado en: {args.json_output}")
@@ -1,11 +1,30 @@
 #!/usr/bin/env python3
 """
-Script para generar 50 órdenes de muestra para DynamoDB
+Script para generar órdenes de muestra para DynamoDB
+
+Sin argumentos genera 50 órdenes en data/orders-50.json. Para pruebas de
+carga genera millones de órdenes en shards NDJSON con varios procesos:
+la popularidad de clientes y productos sigue una distribución Zipf (pocos
+clientes concentran muchas órdenes, como las particiones calientes de
+CustomerIndex) y orderDate sigue una curva diaria y semanal.
+Cada shard usa su propia semilla derivada de --seed: la salida es
+reproducible sin importar la cantidad de procesos.
+
+Uso:
+  python3 data/generate-orders.py
+  python3 data/generate-orders.py --count 5000000 --shards 50 --customers 200000
 """
+import argparse
 import json
+import os
 import random
-from datetime import datetime, timedelta
+import time
 import uuid
+from bisect import bisect
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import accumulate
+from multiprocessing import Pool
 
 # Datos de muestra
 CUSTOMERS = [
@@ -60,83 +79,214 @@ CITIES = [
     {"city": "Murcia", "state": "Murcia", "zipCode": "30001"},
 ]
 
+FIRST_NAMES = ["María", "Juan", "Ana", "Carlos", "Laura", "Pedro", "Isabel", "Miguel", "Carmen", "David",
+               "Lucía", "Javier", "Elena", "Pablo", "Sofía", "Diego", "Paula", "Sergio", "Marta", "Andrés"]
+LAST_NAMES = ["García", "Pérez", "Martínez", "Rodríguez", "Sánchez", "López", "Fernández", "Torres", "Ruiz",
+              "Moreno", "Gómez", "Díaz", "Romero", "Navarro", "Gil", "Serrano", "Molina", "Castro", "Ortiz", "Vega"]
+
 STATUSES = ["PENDING", "PAYMENT_PROCESSED", "SHIPPED", "DELIVERED"]
 PAYMENT_METHODS = ["credit_card", "debit_card", "paypal"]
 
-def generate_order(order_num):
-    """Generar una orden de muestra"""
-    customer = random.choice(CUSTOMERS)
-    
-    # Generar items (1-4 productos)
-    num_items = random.randint(1, 4)
-    items = []
-    total_amount = 0
-    
-    for _ in range(num_items):
-        product = random.choice(PRODUCTS)
-        quantity = random.randint(1, 3)
-        items.append({
-            "productId": product["id"],
-            "name": product["name"],
-            "quantity": quantity,
-            "price": product["price"]
-        })
-        total_amount += product["price"] * quantity
-    
-    # Fecha aleatoria en los últimos 30 días
-    days_ago = random.randint(0, 30)
-    order_date = datetime.utcnow() - timedelta(days=days_ago)
-    
-    # Dirección de envío
-    location = random.choice(CITIES)
-    shipping_address = {
-        "street": f"Calle {random.choice(['Principal', 'Mayor', 'Sol', 'Luna', 'Norte'])} {random.randint(1, 999)}",
-        "city": location["city"],
-        "state": location["state"],
-        "zipCode": location["zipCode"],
-        "country": "España"
-    }
-    
-    order = {
-        "orderId": f"order-{str(order_num).zfill(3)}",
-        "customerId": customer["id"],
-        "customerName": customer["name"],
-        "customerEmail": customer["email"],
-        "orderDate": order_date.isoformat() + "Z",
-        "status": random.choice(STATUSES),
-        "totalAmount": round(total_amount, 2),
-        "paymentMethod": random.choice(PAYMENT_METHODS),
-        "items": items,
-        "shippingAddress": shipping_address
-    }
-    
-    # Agregar campos adicionales según el estado
-    if order["status"] in ["PAYMENT_PROCESSED", "SHIPPED", "DELIVERED"]:
-        order["paymentDate"] = (order_date + timedelta(hours=1)).isoformat() + "Z"
-        order["transactionId"] = f"TXN-{uuid.uuid4().hex[:8].upper()}"
-    
-    if order["status"] in ["SHIPPED", "DELIVERED"]:
-        order["shipmentDate"] = (order_date + timedelta(days=1)).isoformat() + "Z"
-        order["trackingNumber"] = f"TRACK-{uuid.uuid4().hex[:12].upper()}"
-        order["estimatedDeliveryDays"] = random.randint(3, 5)
-    
-    if order["status"] == "DELIVERED":
-        order["deliveryDate"] = (order_date + timedelta(days=random.randint(3, 7))).isoformat() + "Z"
-    
-    return order
+# Configuración
+OUTPUT_FILE = "data/orders-50.json"
+SHARDS_DIR = "data/shards"
+DEFAULT_COUNT = 50
+DEFAULT_SEED = 42
+DEFAULT_CUSTOMERS = 100_000
+DEFAULT_DAYS = 30
+# Fecha fija para que la salida no dependa del día de ejecución
+DEFAULT_END_DATE = "2025-11-01"
+
+# Exponentes Zipf: con s=1.1 y 100K clientes el más activo concentra ~13% de las órdenes
+CUSTOMER_ZIPF_S = 1.1
+PRODUCT_ZIPF_S = 1.2
+
+# Peso relativo de cada hora del día (picos al mediodía y por la noche)
+HOURLY_WEIGHTS = [2, 1, 1, 1, 1, 2, 4, 7, 10, 12, 13, 14, 15, 14, 12, 11, 11, 12, 14, 17, 19, 18, 12, 5]
+# Lunes a domingo
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 1.0, 1.1, 1.3, 1.2]
+
+
+class WeightedSampler:
+    """Muestreo por pesos con búsqueda binaria sobre los pesos acumulados"""
+
+    def __init__(self, weights):
+        self.cumulative = list(accumulate(weights))
+        self.total = self.cumulative[-1]
+
+    def sample(self, rng):
+        return bisect(self.cumulative, rng.random() * self.total)
+
+
+def zipf_sampler(n, s):
+    """Rango 0..n-1 con probabilidad proporcional a 1/(rango+1)^s"""
+    return WeightedSampler(1 / k ** s for k in range(1, n + 1))
+
+
+def customer_for_rank(rank):
+    """Cliente por rango de popularidad (0 = el más activo); los primeros son los de CUSTOMERS"""
+    if rank < len(CUSTOMERS):
+        return CUSTOMERS[rank]
+    number = rank + 1
+    first = FIRST_NAMES[number % len(FIRST_NAMES)]
+    last = LAST_NAMES[(number // len(FIRST_NAMES)) % len(LAST_NAMES)]
+    email_name = f"{first}.{last}".lower().translate(str.maketrans("áéíóú", "aeiou"))
+    return {"id": f"cust-{number:03d}", "name": f"{first} {last}", "email": f"{email_name}{number}@email.com"}
+
+
+class OrderGenerator:
+    """Genera órdenes a partir de un generador aleatorio propio (determinista)"""
+
+    def __init__(self, rng, customers, days, end_date):
+        self.rng = rng
+        self.customers = zipf_sampler(customers, CUSTOMER_ZIPF_S)
+        self.products = zipf_sampler(len(PRODUCTS), PRODUCT_ZIPF_S)
+        self.hours = WeightedSampler(HOURLY_WEIGHTS)
+        start = end_date - timedelta(days=days)
+        self.days = [start + timedelta(days=d) for d in range(days)]
+        self.day_sampler = WeightedSampler(WEEKDAY_WEIGHTS[day.weekday()] for day in self.days)
+
+    def order_date(self):
+        rng = self.rng
+        day = self.days[self.day_sampler.sample(rng)]
+        return day + timedelta(hours=self.hours.sample(rng), seconds=rng.randrange(3600),
+                               microseconds=rng.randrange(1_000_000))
+
+    def generate(self, order_id=None):
+        rng = self.rng
+        rank = self.customers.sample(rng)
+        customer = customer_for_rank(rank)
+
+        # Generar items (1-4 productos)
+        items = []
+        total_amount = 0
+        for _ in range(rng.randint(1, 4)):
+            product = PRODUCTS[self.products.sample(rng)]
+            quantity = rng.randint(1, 3)
+            items.append({
+                "productId": product["id"],
+                "name": product["name"],
+                "quantity": quantity,
+                "price": product["price"]
+            })
+            total_amount += product["price"] * quantity
+
+        order_date = self.order_date()
+
+        # Dirección de envío
+        location = rng.choice(CITIES)
+        shipping_address = {
+            "street": f"Calle {rng.choice(['Principal', 'Mayor', 'Sol', 'Luna', 'Norte'])} {rng.randint(1, 999)}",
+            "city": location["city"],
+            "state": location["state"],
+            "zipCode": location["zipCode"],
+            "country": "España"
+        }
+
+        order = {
+            "orderId": order_id or str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "customerId": customer["id"],
+            "customerName": customer["name"],
+            "customerEmail": customer["email"],
+            "orderDate": order_date.isoformat() + "Z",
+            "status": rng.choice(STATUSES),
+            "totalAmount": round(total_amount, 2),
+            "paymentMethod": rng.choice(PAYMENT_METHODS),
+            "items": items,
+            "itemCount": len(items),
+            "shippingAddress": shipping_address
+        }
+
+        # Agregar campos adicionales según el estado
+        if order["status"] in ["PAYMENT_PROCESSED", "SHIPPED", "DELIVERED"]:
+            order["paymentDate"] = (order_date + timedelta(hours=1)).isoformat() + "Z"
+            order["transactionId"] = f"TXN-{rng.getrandbits(32):08X}"
+
+        if order["status"] in ["SHIPPED", "DELIVERED"]:
+            order["shipmentDate"] = (order_date + timedelta(days=1)).isoformat() + "Z"
+            order["trackingNumber"] = f"TRACK-{rng.getrandbits(48):012X}"
+            order["estimatedDeliveryDays"] = rng.randint(3, 5)
+
+        if order["status"] == "DELIVERED":
+            order["deliveryDate"] = (order_date + timedelta(days=rng.randint(3, 7))).isoformat() + "Z"
+
+        return order, rank
+
+
+def generate_shard(task):
+    """Genera un shard NDJSON (se ejecuta en un proceso worker)"""
+    shard, count, seed, customers, days, end_date, output_dir = task
+    generator = OrderGenerator(random.Random(f"{seed}:{shard}"), customers, days, end_date)
+    path = os.path.join(output_dir, f"orders-{shard:05d}.ndjson")
+    # Solo los clientes más activos: suficiente para medir la concentración
+    top_customers = Counter()
+    top_limit = max(1, customers // 100)
+    with open(path, "w", encoding="utf-8") as f:
+        for _ in range(count):
+            order, rank = generator.generate()
+            if rank < top_limit:
+                top_customers[rank] += 1
+            f.write(json.dumps(order, ensure_ascii=False) + "\n")
+    return path, count, top_customers
+
+
+def generate_shards(count, shards, workers, seed, customers, days, end_date, output_dir):
+    """Reparte las órdenes en shards y los genera en paralelo"""
+    os.makedirs(output_dir, exist_ok=True)
+    per_shard = [count // shards + (1 if i < count % shards else 0) for i in range(shards)]
+    tasks = [(i, n, seed, customers, days, end_date, output_dir) for i, n in enumerate(per_shard)]
+
+    print(f"Generando {count} órdenes en {shards} shards ({workers} workers, seed={seed})...")
+    print(f"Directorio de salida: {output_dir}")
+    print("-" * 50)
+
+    start = time.perf_counter()
+    top_customers = Counter()
+    done = 0
+    with Pool(processes=workers) as pool:
+        for path, n, top in pool.imap_unordered(generate_shard, tasks):
+            done += n
+            top_customers.update(top)
+            print(f"✓ {os.path.basename(path)} ({done}/{count})")
+    elapsed = time.perf_counter() - start
+
+    print("-" * 50)
+    print(f"✓ {count} órdenes generadas en {elapsed:.1f}s ({count / elapsed:.0f} órdenes/s)")
+    if count:
+        hottest_rank, hottest = top_customers.most_common(1)[0] if top_customers else (0, 0)
+        print(f"✓ Cliente más activo: {customer_for_rank(hottest_rank)['id']} "
+              f"({hottest} órdenes, {hottest / count:.1%})")
+        print(f"✓ 1% de clientes más activos: {sum(top_customers.values()) / count:.1%} de las órdenes")
+
 
 def main():
-    """Generar 50 órdenes"""
-    orders = []
-    for i in range(1, 51):
-        order = generate_order(i)
-        orders.append(order)
-    
+    parser = argparse.ArgumentParser(description="Genera órdenes de muestra (JSON) o de carga (shards NDJSON)")
+    parser.add_argument("--count", type=int, default=DEFAULT_COUNT, help="Número de órdenes")
+    parser.add_argument("--shards", type=int, default=0, help="Shards NDJSON (0 = un arreglo JSON en --output)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Procesos en paralelo")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Semilla (mismo valor = mismas órdenes)")
+    parser.add_argument("--customers", type=int, default=DEFAULT_CUSTOMERS, help="Clientes distintos")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="Días hacia atrás desde --end-date")
+    parser.add_argument("--end-date", default=DEFAULT_END_DATE, help="Último día del rango (YYYY-MM-DD)")
+    parser.add_argument("--output", default=OUTPUT_FILE, help="Archivo JSON (sin --shards)")
+    parser.add_argument("--output-dir", default=SHARDS_DIR, help="Directorio de los shards")
+    args = parser.parse_args()
+    end_date = datetime.strptime(args.end_date, "%Y-%m-%d")
+
+    if args.shards:
+        generate_shards(args.count, args.shards, args.workers, args.seed, args.customers,
+                        args.days, end_date, args.output_dir)
+        return
+
+    # Muestra pequeña: IDs legibles y un único archivo JSON
+    generator = OrderGenerator(random.Random(args.seed), args.customers, args.days, end_date)
+    orders = [generator.generate(f"order-{str(i).zfill(3)}")[0] for i in range(1, args.count + 1)]
+
     # Guardar en archivo JSON
-    with open('data/orders-50.json', 'w', encoding='utf-8') as f:
+    with open(args.output, 'w', encoding='utf-8') as f:
         json.dump(orders, f, indent=2, ensure_ascii=False)
-    
-    print(f"✓ Generadas {len(orders)} órdenes en data/orders-50.json")
+
+    print(f"✓ Generadas {len(orders)} órdenes en {args.output}")
 
 if __name__ == "__main__":
     main()
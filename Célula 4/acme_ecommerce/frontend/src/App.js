@@ -7,6 +7,7 @@ import { getOrders, createOrder, getOrder } from './services/api';
 
 function App() {
   const [orders, setOrders] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [selectedOrder, setSelectedOrder] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
@@ -21,7 +22,22 @@ function App() {
     setError(null);
     try {
       const data = await getOrders();
-      setOrders(data);
+      setOrders(data.orders);
+      setNextCursor(data.nextCursor);
+    } catch (err) {
+      setError('Error cargando órdenes: ' + err.message);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const loadMoreOrders = async () => {
+    setLoading(true);
+    setError(null);
+    try {
+      const data = await getOrders(null, nextCursor);
+      setOrders([...orders, ...data.orders]);
+      setNextCursor(data.nextCursor);
     } catch (err) {
       setError('Error cargando órdenes: ' + err.message);
     } finally {
@@ -100,6 +116,7 @@ function App() {
           <OrderList 
             orders={orders} 
             onViewOrder={handleViewOrder}
+            onLoadMore={nextCursor ? loadMoreOrders : null}
           />
         )}
 
@@ -1,7 +1,7 @@
 import React from 'react';
 import './OrderList.css';
 
-function OrderList({ orders, onViewOrder }) {
+function OrderList({ orders, onViewOrder, onLoadMore }) {
   const getStatusBadge = (status) => {
     const statusMap = {
       'PENDING': { label: 'Pendiente', color: '#ffa500' },
@@ -63,7 +63,7 @@ function OrderList({ orders, onViewOrder }) {
                 📅 {formatDate(order.orderDate)}
               </p>
               <p className="order-items">
-                📦 {order.items?.length || 0} item(s)
+                📦 {order.itemCount ?? order.items?.length ?? 0} item(s)
               </p>
               <p className="order-total">
                 <strong>💰 ${order.totalAmount}</strong>
@@ -81,6 +81,12 @@ function OrderList({ orders, onViewOrder }) {
           </div>
         ))}
       </div>
+
+      {onLoadMore && (
+        <button onClick={onLoadMore} className="view-button load-more-button">
+          Cargar más órdenes
+        </button>
+      )}
     </div>
   );
 }
@@ -34,11 +34,13 @@ api.interceptors.response.use(
 );
 
 /**
- * Obtener todas las órdenes
+ * Obtener una página de órdenes ({ orders, count, nextCursor })
  */
-export const getOrders = async (customerId = null) => {
+export const getOrders = async (customerId = null, cursor = null) => {
   try {
-    const params = customerId ? { customerId } : {};
+    const params = {};
+    if (customerId) params.customerId = customerId;
+    if (cursor) params.cursor = cursor;
     const response = await api.get('/orders', { params });
     return response.data;
   } catch (error) {
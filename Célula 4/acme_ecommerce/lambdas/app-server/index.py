@@ -1,18 +1,51 @@
 import json
+import base64
 import boto3
+import hashlib
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 
 dynamodb = boto3.resource('dynamodb')
 sqs = boto3.client('sqs')
 table = dynamodb.Table('Orders')
 
+REQUIRED_FIELDS = ['customerId', 'customerName', 'customerEmail', 'items', 'totalAmount']
+
+# Ingesta masiva: límite de órdenes por request y tamaño máximo de send_message_batch
+MAX_BULK_ORDERS = 500
+SQS_BATCH_SIZE = 10
+SQS_BATCH_ATTEMPTS = 3
+
+# Paginación de GET /orders
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+# Proyección de la vista de lista: sin items ni shippingAddress
+SUMMARY_FIELDS = ['orderId', 'customerId', 'customerName', 'status', 'orderDate', 'totalAmount', 'itemCount']
+
+# Reutilizado entre invocaciones (el cliente de SQS es thread-safe)
+executor = ThreadPoolExecutor(max_workers=4)
+
+# Caché de GET /orders/{id} por contenedor (LRU con TTL según el estado).
+# Los contenedores no comparten memoria: una orden que process-order todavía
+# va a mover vive ORDER_CACHE_TTL segundos; una orden asentada (enviada y
+# notificada) ya no cambia de estado y vive ORDER_CACHE_SETTLED_TTL
+ORDER_CACHE_TTL = float(os.environ.get('ORDER_CACHE_TTL', '2'))
+ORDER_CACHE_SETTLED_TTL = float(os.environ.get('ORDER_CACHE_SETTLED_TTL', '60'))
+ORDER_CACHE_MAX_ENTRIES = int(os.environ.get('ORDER_CACHE_MAX_ENTRIES', '1000'))
+SETTLED_STATUSES = ('SHIPPED', 'DELIVERED')
+order_cache = OrderedDict()
+
 class DecimalEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, Decimal):
-            return float(obj)
+            # Enteros como int: el mismo item serializa igual antes y después de DynamoDB (ETag)
+            return int(obj) if obj == obj.to_integral_value() else float(obj)
         return super(DecimalEncoder, self).default(obj)
 
 def lambda_handler(event, context):
@@ -28,6 +61,8 @@ def lambda_handler(event, context):
     # Routing
     if http_method == 'POST' and path == '/orders':
         return create_order(event)
+    elif http_method == 'POST' and path == '/orders/batch':
+        return create_orders_batch(event)
     elif http_method == 'GET' and path == '/orders':
         return get_orders(event)
     elif http_method == 'GET' and '/orders/' in path:
@@ -47,43 +82,42 @@ def lambda_handler(event, context):
 def create_order(event):
     """Crear una nueva orden"""
     try:
-        body = json.loads(event.get('body', '{}'))
+        # Decimal desde el parseo: DynamoDB rechaza los float (p. ej. el precio de un item)
+        body = json.loads(event.get('body', '{}'), parse_float=Decimal)
         
         # Validar datos requeridos
-        required_fields = ['customerId', 'customerName', 'customerEmail', 'items', 'totalAmount']
-        for field in required_fields:
-            if field not in body:
-                return {
-                    'statusCode': 400,
-                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                    'body': json.dumps({'error': f'Missing required field: {field}'})
-                }
-        
-        order_id = str(uuid.uuid4())
-        order = {
-            'orderId': order_id,
-            'customerId': body.get('customerId'),
-            'customerName': body.get('customerName'),
-            'customerEmail': body.get('customerEmail'),
-            'items': body.get('items', []),
-            'totalAmount': Decimal(str(body.get('totalAmount'))),
-            'status': 'PENDING',
-            'orderDate': datetime.utcnow().isoformat(),
-            'shippingAddress': body.get('shippingAddress', {}),
-            'paymentMethod': body.get('paymentMethod', 'credit_card')
-        }
+        missing = missing_field(body)
+        if missing:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': f'Missing required field: {missing}'})
+            }
         
-        # Guardar en DynamoDB
-        table.put_item(Item=order)
+        order = build_order(body)
         
-        # Enviar a SQS para procesamiento asíncrono
+        # Enviar a SQS en paralelo con el put_item: la latencia del request es
+        # la mayor de las dos llamadas y no su suma. Si el put_item falla, el
+        # mensaje no crea la orden (process-order exige que exista en la tabla)
         queue_url = os.environ.get('QUEUE_URL')
+        enqueue = None
         if queue_url:
-            sqs.send_message(
+            enqueue = executor.submit(
+                sqs.send_message,
                 QueueUrl=queue_url,
-                MessageBody=json.dumps({'orderId': order_id})
+                MessageBody=json.dumps({'orderId': order['orderId']})
             )
         
+        # Guardar en DynamoDB
+        try:
+            table.put_item(Item=order)
+        finally:
+            if enqueue:
+                enqueue.result()
+        
+        # El primer poll de la orden recién creada no necesita leer la tabla
+        cache_order(order)
+        
         return {
             'statusCode': 201,
             'headers': {
@@ -100,23 +134,249 @@ def create_order(event):
             'body': json.dumps({'error': str(e)})
         }
 
+def create_orders_batch(event):
+    """
+    Crear varias órdenes en un solo request
+    Body: {"orders": [...]} con el mismo formato de POST /orders.
+    Retorna el estado de cada orden en el orden recibido:
+    QUEUED (guardada y encolada), SAVED (guardada, no encolada), INVALID o FAILED
+    """
+    try:
+        # Decimal desde el parseo: un float en items haría fallar todo el lote
+        body = json.loads(event.get('body', '{}'), parse_float=Decimal)
+        orders_in = body.get('orders') if isinstance(body, dict) else None
+        if not isinstance(orders_in, list) or not orders_in:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'Body must contain a non-empty "orders" list'})
+            }
+        if len(orders_in) > MAX_BULK_ORDERS:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': f'Too many orders: maximum is {MAX_BULK_ORDERS}'})
+            }
+        
+        results = []
+        orders = []
+        for index, data in enumerate(orders_in):
+            if not isinstance(data, dict):
+                results.append({'index': index, 'status': 'INVALID', 'error': 'Order must be an object'})
+                continue
+            missing = missing_field(data)
+            if missing:
+                results.append({'index': index, 'status': 'INVALID', 'error': f'Missing required field: {missing}'})
+                continue
+            order = build_order(data)
+            orders.append(order)
+            results.append({'index': index, 'orderId': order['orderId'], 'status': 'SAVED'})
+        
+        by_id = {r['orderId']: r for r in results if 'orderId' in r}
+        
+        # Guardar en DynamoDB (batch_writer agrupa de a 25 y reintenta los UnprocessedItems)
+        if orders:
+            try:
+                with table.batch_writer() as batch:
+                    for order in orders:
+                        batch.put_item(Item=order)
+            except Exception as e:
+                # No se sabe qué lotes llegaron a escribirse: ninguna se encola
+                print(f"Error writing orders batch: {str(e)}")
+                for order in orders:
+                    by_id[order['orderId']].update({'status': 'FAILED', 'error': str(e)})
+                orders = []
+        
+        # Encolar en grupos de 10 (los grupos se envían en paralelo)
+        queue_url = os.environ.get('QUEUE_URL')
+        if queue_url and orders:
+            groups = [orders[i:i + SQS_BATCH_SIZE] for i in range(0, len(orders), SQS_BATCH_SIZE)]
+            for failed in executor.map(lambda group: enqueue_orders(queue_url, group), groups):
+                for order_id, error in failed.items():
+                    by_id[order_id]['error'] = error
+            for order in orders:
+                if 'error' not in by_id[order['orderId']]:
+                    by_id[order['orderId']]['status'] = 'QUEUED'
+        
+        summary = {}
+        for result in results:
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        
+        # 201 si todas quedaron guardadas; 207 si alguna falló o fue inválida
+        all_saved = all(r['status'] in ('QUEUED', 'SAVED') for r in results)
+        return {
+            'statusCode': 201 if all_saved else 207,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*'
+            },
+            'body': json.dumps({'summary': summary, 'results': results}, cls=DecimalEncoder)
+        }
+    except Exception as e:
+        print(f"Error creating orders batch: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+            'body': json.dumps({'error': str(e)})
+        }
+
+def enqueue_orders(queue_url, orders):
+    """
+    Enviar hasta 10 órdenes con send_message_batch
+    Reintenta las entradas fallidas que no son culpa del emisor.
+    Retorna {orderId: error} de las que no se pudieron encolar
+    """
+    pending = {str(i): order['orderId'] for i, order in enumerate(orders)}
+    failed = {}
+    for _ in range(SQS_BATCH_ATTEMPTS):
+        try:
+            response = sqs.send_message_batch(
+                QueueUrl=queue_url,
+                Entries=[
+                    {'Id': entry_id, 'MessageBody': json.dumps({'orderId': order_id})}
+                    for entry_id, order_id in pending.items()
+                ]
+            )
+        except Exception as e:
+            print(f"Error sending message batch: {str(e)}")
+            failed.update({order_id: str(e) for order_id in pending.values()})
+            continue
+        
+        retry = {}
+        for entry in response.get('Failed', []):
+            order_id = pending[entry['Id']]
+            failed[order_id] = entry.get('Message', entry.get('Code', 'Unknown error'))
+            if not entry.get('SenderFault'):
+                retry[entry['Id']] = order_id
+        for entry in response.get('Successful', []):
+            failed.pop(pending[entry['Id']], None)
+        if not retry:
+            break
+        pending = retry
+    return failed
+
+def missing_field(data):
+    """Primer campo requerido ausente, o None si la orden es válida"""
+    for field in REQUIRED_FIELDS:
+        if field not in data:
+            return field
+    return None
+
+def build_order(body):
+    """Armar el item de DynamoDB para una orden nueva"""
+    items = body.get('items', [])
+    return {
+        'orderId': str(uuid.uuid4()),
+        'customerId': body.get('customerId'),
+        'customerName': body.get('customerName'),
+        'customerEmail': body.get('customerEmail'),
+        'items': items,
+        # Para la vista de lista, que no transfiere items
+        'itemCount': len(items) if isinstance(items, list) else 0,
+        'totalAmount': Decimal(str(body.get('totalAmount'))),
+        'status': 'PENDING',
+        'orderDate': datetime.utcnow().isoformat(),
+        'shippingAddress': body.get('shippingAddress', {}),
+        'paymentMethod': body.get('paymentMethod', 'credit_card')
+    }
+
 def get_orders(event):
-    """Obtener todas las órdenes"""
+    """
+    Listar órdenes paginadas (más recientes primero)
+    Query params: customerId, from/to (ISO 8601 sobre orderDate), limit,
+    cursor (nextCursor de la página anterior), view=summary|full
+    """
     try:
         # Obtener parámetros de query
         query_params = event.get('queryStringParameters') or {}
         customer_id = query_params.get('customerId')
+        date_from = query_params.get('from')
+        date_to = query_params.get('to')
+        
+        try:
+            limit = int(query_params.get('limit', DEFAULT_PAGE_SIZE))
+            if limit < 1:
+                raise ValueError('limit must be positive')
+            limit = min(limit, MAX_PAGE_SIZE)
+            start_key = decode_cursor(query_params['cursor']) if query_params.get('cursor') else None
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': f'Invalid pagination parameters: {str(e)}'})
+            }
+        
+        view = query_params.get('view', 'summary')
+        if view not in ('summary', 'full'):
+            return {
+                'statusCode': 400,
+                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                'body': json.dumps({'error': 'view must be summary or full'})
+            }
+        
+        # Un "to" con solo fecha (YYYY-MM-DD) incluye el día completo
+        if date_to and len(date_to) == 10:
+            date_to += 'T23:59:59.999999Z'
+        
+        params = {'Limit': limit}
+        names = {}
+        values = {}
+        if view == 'summary':
+            params['ProjectionExpression'] = ', '.join(f'#f{i}' for i in range(len(SUMMARY_FIELDS)))
+            names.update({f'#f{i}': field for i, field in enumerate(SUMMARY_FIELDS)})
+        
+        date_condition = None
+        if date_from and date_to:
+            date_condition = '#date BETWEEN :from AND :to'
+        elif date_from:
+            date_condition = '#date >= :from'
+        elif date_to:
+            date_condition = '#date <= :to'
+        if date_condition:
+            names['#date'] = 'orderDate'
+            values.update({k: v for k, v in ((':from', date_from), (':to', date_to)) if v})
         
         if customer_id:
-            # Buscar por cliente usando GSI
-            response = table.query(
-                IndexName='CustomerIndex',
-                KeyConditionExpression='customerId = :cid',
-                ExpressionAttributeValues={':cid': customer_id}
-            )
+            # El cursor debe venir de una consulta del mismo cliente
+            if start_key is not None and start_key.get('customerId') != customer_id:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': 'Invalid pagination parameters: cursor does not match customerId'})
+                }
+            # Buscar por cliente usando GSI (orderDate es la sort key: el rango no lee de más)
+            names['#cid'] = 'customerId'
+            values[':cid'] = customer_id
+            key_condition = '#cid = :cid'
+            if date_condition:
+                key_condition += f' AND {date_condition}'
+            params.update({
+                'IndexName': 'CustomerIndex',
+                'KeyConditionExpression': key_condition,
+                'ScanIndexForward': False
+            })
+            operation = table.query
         else:
-            # Scan completo (limitado)
-            response = table.scan(Limit=50)
+            if start_key is not None and set(start_key) != {'orderId'}:
+                return {
+                    'statusCode': 400,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': 'Invalid pagination parameters: cursor requires customerId'})
+                }
+            # Scan paginado; el rango de fechas es un filtro (una página puede venir con menos órdenes)
+            if date_condition:
+                params['FilterExpression'] = date_condition
+            operation = table.scan
+        
+        if names:
+            params['ExpressionAttributeNames'] = names
+        if values:
+            params['ExpressionAttributeValues'] = values
+        if start_key is not None:
+            params['ExclusiveStartKey'] = start_key
+        
+        response = operation(**params)
+        last_key = response.get('LastEvaluatedKey')
         
         return {
             'statusCode': 200,
@@ -124,7 +384,11 @@ def get_orders(event):
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'
             },
-            'body': json.dumps(response.get('Items', []), cls=DecimalEncoder)
+            'body': json.dumps({
+                'orders': response.get('Items', []),
+                'count': response.get('Count', 0),
+                'nextCursor': encode_cursor(last_key) if last_key else None
+            }, cls=DecimalEncoder)
         }
     except Exception as e:
         print(f"Error getting orders: {str(e)}")
@@ -134,27 +398,64 @@ def get_orders(event):
             'body': json.dumps({'error': str(e)})
         }
 
+def encode_cursor(key):
+    """Serializar LastEvaluatedKey como cursor opaco"""
+    return base64.urlsafe_b64encode(json.dumps(key, cls=DecimalEncoder).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Deserializar el cursor a ExclusiveStartKey (ValueError si es inválido)"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('invalid cursor')
+    if not isinstance(key, dict) or 'orderId' not in key or not all(isinstance(v, str) for v in key.values()):
+        raise ValueError('invalid cursor')
+    return key
+
 def get_order(event):
-    """Obtener una orden específica"""
+    """
+    Obtener una orden específica
+    Responde desde la caché del contenedor si la entrada no expiró.
+    ?consistent=true o Cache-Control: no-cache leen la tabla con lectura
+    consistente. Con If-None-Match igual al ETag actual responde 304 sin body
+    """
     try:
         order_id = event['path'].split('/')[-1]
-        response = table.get_item(Key={'orderId': order_id})
+        query_params = event.get('queryStringParameters') or {}
+        # API Gateway no normaliza el case de los headers
+        headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+        consistent = (query_params.get('consistent') == 'true'
+                      or 'no-cache' in headers.get('cache-control', ''))
         
-        if 'Item' in response:
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Content-Type': 'application/json',
-                    'Access-Control-Allow-Origin': '*'
-                },
-                'body': json.dumps(response['Item'], cls=DecimalEncoder)
-            }
-        else:
-            return {
-                'statusCode': 404,
-                'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
-                'body': json.dumps({'error': 'Order not found'})
-            }
+        entry = None if consistent else cached_order(order_id)
+        cache_status = 'HIT' if entry else 'MISS'
+        if entry is None:
+            response = table.get_item(Key={'orderId': order_id}, ConsistentRead=consistent)
+            if 'Item' not in response:
+                invalidate_order(order_id)
+                return {
+                    'statusCode': 404,
+                    'headers': {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'},
+                    'body': json.dumps({'error': 'Order not found'})
+                }
+            entry = cache_order(response['Item'])
+        
+        response_headers = {
+            'Access-Control-Allow-Origin': '*',
+            # El navegador revalida cada poll con If-None-Match
+            'Cache-Control': 'no-cache',
+            'ETag': entry['etag'],
+            'X-Cache': cache_status
+        }
+        if entry['etag'] in [tag.strip() for tag in headers.get('if-none-match', '').split(',')]:
+            return {'statusCode': 304, 'headers': response_headers, 'body': ''}
+        
+        response_headers['Content-Type'] = 'application/json'
+        return {
+            'statusCode': 200,
+            'headers': response_headers,
+            'body': entry['body']
+        }
     except Exception as e:
         print(f"Error getting order: {str(e)}")
         return {
@@ -163,6 +464,40 @@ def get_order(event):
             'body': json.dumps({'error': str(e)})
         }
 
+def cache_order(item):
+    """Guardar la orden serializada con su ETag; retorna la entrada"""
+    # Claves ordenadas: el mismo item da el mismo ETag en cualquier contenedor
+    body = json.dumps(item, cls=DecimalEncoder, sort_keys=True)
+    settled = item.get('status') in SETTLED_STATUSES and item.get('notificationSentDate')
+    ttl = ORDER_CACHE_SETTLED_TTL if settled else ORDER_CACHE_TTL
+    entry = {
+        'body': body,
+        'etag': '"' + hashlib.sha1(body.encode('utf-8')).hexdigest()[:20] + '"',
+        'expires': time.monotonic() + ttl
+    }
+    if ttl <= 0:
+        return entry
+    order_cache[item['orderId']] = entry
+    order_cache.move_to_end(item['orderId'])
+    while len(order_cache) > ORDER_CACHE_MAX_ENTRIES:
+        order_cache.popitem(last=False)
+    return entry
+
+def cached_order(order_id):
+    """Entrada vigente de la caché, o None si no está o expiró"""
+    entry = order_cache.get(order_id)
+    if entry is None:
+        return None
+    if entry['expires'] <= time.monotonic():
+        del order_cache[order_id]
+        return None
+    order_cache.move_to_end(order_id)
+    return entry
+
+def invalidate_order(order_id):
+    """Quitar la orden de la caché del contenedor"""
+    order_cache.pop(order_id, None)
+
 def health_check():
     """Health check endpoint"""
     return {
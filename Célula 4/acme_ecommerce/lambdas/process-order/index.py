@@ -1,18 +1,83 @@
 import json
 import boto3
 import os
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal
 import random
+import time
 
 dynamodb = boto3.resource('dynamodb')
 sns = boto3.client('sns')
+sqs = boto3.client('sqs')
 table = dynamodb.Table('Orders')
+deserializer = TypeDeserializer()
+
+# Estados desde los que cada paso puede avanzar, y estados que indican que ya se hizo
+PAYABLE_STATUSES = ('PENDING', 'PAYMENT_FAILED')
+PAID_STATUSES = ('PAYMENT_PROCESSED', 'SHIPPED', 'DELIVERED')
+SHIPPED_STATUSES = ('SHIPPED', 'DELIVERED')
+
+# Notificaciones: 'direct' publica en el paso del workflow; 'batch' encola la
+# orden en NOTIFICATION_QUEUE_URL y la Lambda la publica en lote desde SQS
+NOTIFICATION_MODE = os.environ.get('NOTIFICATION_MODE', 'direct')
+SNS_BATCH_SIZE = 10
+
+# Actualizaciones concurrentes de notificationSentDate en modo batch
+executor = ThreadPoolExecutor(max_workers=8)
+
+# Plantilla del email (se arma una sola vez por contenedor)
+NOTIFICATION_TEMPLATE = """
+Order Confirmation - E-commerce Store
+
+Dear {customerName},
+
+Thank you for your order!
+
+Order Details:
+--------------
+Order ID: {orderId}
+Order Date: {orderDate}
+Status: {status}
+
+Items:
+{itemsSummary}
+
+Total Amount: ${totalAmount}
+
+Shipping Address:
+{street}, 
+{city}, 
+{state} {zipCode}
+
+Tracking Number: {trackingNumber}
+Estimated Delivery: {estimatedDeliveryDays} business days
+
+Thank you for shopping with us!
+
+Best regards,
+E-commerce Team
+        """
+ITEM_LINE_TEMPLATE = '  - {name} x{quantity} - ${price}'
+
+# Modo pipeline: intentos por paso dentro de la misma invocación
+# (1 + 3 reintentos, como el Retry de ProcessPayment en el workflow)
+PIPELINE_MAX_ATTEMPTS = int(os.environ.get('PIPELINE_MAX_ATTEMPTS', '4'))
+PIPELINE_RETRY_DELAY = float(os.environ.get('PIPELINE_RETRY_DELAY', '0.2'))
+
+class OrderStateConflict(Exception):
+    """La orden existe pero no está en el estado que el paso espera"""
+    
+    def __init__(self, order):
+        super().__init__(f"Order {order.get('orderId')} is in status {order.get('status')}")
+        self.order = order
 
 class DecimalEncoder(json.JSONEncoder):
     def default(self, obj):
         if isinstance(obj, Decimal):
-            return float(obj)
+            return int(obj) if obj % 1 == 0 else float(obj)
         return super(DecimalEncoder, self).default(obj)
 
 def lambda_handler(event, context):
@@ -24,82 +89,212 @@ def lambda_handler(event, context):
     
     order_id = event.get('orderId')
     action = event.get('action', 'process_payment')
+    # Mensajes de la cola de notificaciones (modo batch)
+    if 'Records' in event:
+        return send_notifications_batch(event['Records'])
+    
+    # Snapshot de la orden que el paso anterior devolvió en el payload
+    order = event.get('order')
+    # Reintentos de Step Functions ($$.State.RetryCount): verifican si el paso ya se hizo
+    retry_count = event.get('retryCount', 0)
     
     if not order_id:
         raise ValueError('orderId is required')
     
     if action == 'process_payment':
-        return process_payment(order_id)
+        return process_payment(order_id, retry_count)
     elif action == 'arrange_shipment':
-        return arrange_shipment(order_id)
+        return arrange_shipment(order_id, retry_count)
     elif action == 'send_notification':
-        return send_notification(order_id)
+        return send_notification(order_id, order)
+    elif action == 'process_order':
+        return process_order_pipeline(order_id, order)
     else:
         raise ValueError(f'Unknown action: {action}')
 
-def process_payment(order_id):
+def update_order(order_id, update_expression, values, names=None, condition=None):
+    """
+    Actualizar la orden y devolver el snapshot resultante (ALL_NEW)
+    La condición reemplaza la lectura previa para verificar que la orden existe;
+    con `condition` además exige un estado: si no se cumple se lanza
+    OrderStateConflict con la orden actual (ALL_OLD, sin una lectura extra)
+    """
+    condition_expression = 'attribute_exists(orderId)'
+    if condition:
+        condition_expression += f' AND ({condition})'
+    params = {
+        'TableName': table.name,
+        'Key': {'orderId': order_id},
+        'UpdateExpression': update_expression,
+        'ConditionExpression': condition_expression,
+        'ExpressionAttributeValues': values,
+        'ReturnValues': 'ALL_NEW',
+        'ReturnValuesOnConditionCheckFailure': 'ALL_OLD'
+    }
+    if names:
+        params['ExpressionAttributeNames'] = names
+    try:
+        # Cliente del resource (thread-safe, con la misma serialización que table)
+        response = table.meta.client.update_item(**params)
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            item = e.response.get('Item')
+            if not item:
+                raise ValueError(f'Order {order_id} not found')
+            # El error trae el item en formato de bajo nivel
+            raise OrderStateConflict(to_snapshot({k: deserializer.deserialize(v) for k, v in item.items()}))
+        raise
+    return to_snapshot(response['Attributes'])
+
+def load_order(order_id, order=None, consistent_read=False):
+    """
+    Usar el snapshot recibido si corresponde a la orden; si no, leer DynamoDB
+    """
+    if order and order.get('orderId') == order_id:
+        return order
+    response = table.get_item(Key={'orderId': order_id}, ConsistentRead=consistent_read)
+    item = response.get('Item')
+    if not item:
+        raise ValueError(f'Order {order_id} not found')
+    return to_snapshot(item)
+
+def to_snapshot(item):
+    """Convertir un item de DynamoDB (Decimal) a un dict serializable para Step Functions"""
+    return json.loads(json.dumps(item, cls=DecimalEncoder))
+
+def process_order_pipeline(order_id, order=None):
+    """
+    Procesar la orden completa en una sola invocación (pago → envío → notificación)
+    Alternativa al workflow de tres Tasks para el state machine Express.
+    Cada paso deja su estado en DynamoDB (checkpoint): si la invocación se
+    reintenta, se retoma desde el último paso completado.
+    """
+    # Lectura consistente: un reintento no debe ver un checkpoint anterior
+    order = load_order(order_id, order, consistent_read=True)
+    result = {'status': 'order_completed', 'orderId': order_id, 'completedSteps': []}
+
+    if order.get('status') not in PAID_STATUSES:
+        payment = run_pipeline_step(process_payment, order_id)
+        result['transactionId'] = payment['transactionId']
+        result['completedSteps'].append('process_payment')
+        order = payment['order']
+    else:
+        result['transactionId'] = order.get('transactionId')
+
+    if order.get('status') not in SHIPPED_STATUSES:
+        shipment = run_pipeline_step(arrange_shipment, order_id)
+        result['completedSteps'].append('arrange_shipment')
+        order = shipment['order']
+
+    if not order.get('notificationSentDate'):
+        notification = run_pipeline_step(send_notification, order_id, order)
+        result['completedSteps'].append('send_notification')
+        order = notification['order']
+
+    result['trackingNumber'] = order.get('trackingNumber')
+    result['order'] = order
+    print(f"Order {order_id} completed in pipeline mode: {result['completedSteps']}")
+    return result
+
+def run_pipeline_step(step, *args):
+    """Ejecutar un paso con los reintentos del modo pipeline (equivalente al Retry del workflow)"""
+    for attempt in range(1, PIPELINE_MAX_ATTEMPTS + 1):
+        try:
+            return step(*args)
+        except Exception:
+            if attempt == PIPELINE_MAX_ATTEMPTS:
+                raise
+            time.sleep(PIPELINE_RETRY_DELAY * 2 ** (attempt - 1))
+
+def process_payment(order_id, retry_count=0):
     """
     Procesar pago de la orden
-    Simula integración con sistema de pagos externo
+    Simula integración con sistema de pagos externo.
+    Idempotente: solo cambia el estado desde PENDING o PAYMENT_FAILED, y un
+    reintento no repite el cobro si la orden ya quedó pagada
     """
     try:
-        # Obtener detalles de la orden
-        response = table.get_item(Key={'orderId': order_id})
-        order = response.get('Item')
-        
-        if not order:
-            raise ValueError(f'Order {order_id} not found')
+        if retry_count:
+            current = load_order(order_id, consistent_read=True)
+            if current.get('status') in PAID_STATUSES:
+                return payment_result(order_id, current)
         
         # Simular procesamiento de pago (90% éxito)
         payment_success = random.random() > 0.1
         
+        condition = '#status IN (:pending, :failed)'
+        condition_values = {':pending': 'PENDING', ':failed': 'PAYMENT_FAILED'}
+        
         if not payment_success:
-            # Actualizar estado a PAYMENT_FAILED
-            table.update_item(
-                Key={'orderId': order_id},
-                UpdateExpression='SET #status = :status, paymentFailedDate = :date',
-                ExpressionAttributeNames={'#status': 'status'},
-                ExpressionAttributeValues={
-                    ':status': 'PAYMENT_FAILED',
-                    ':date': datetime.utcnow().isoformat()
-                }
-            )
+            # Actualizar estado a PAYMENT_FAILED (nunca sobre una orden ya pagada)
+            try:
+                update_order(
+                    order_id,
+                    'SET #status = :status, paymentFailedDate = :date',
+                    {
+                        ':status': 'PAYMENT_FAILED',
+                        ':date': datetime.utcnow().isoformat(),
+                        **condition_values
+                    },
+                    {'#status': 'status'},
+                    condition
+                )
+            except OrderStateConflict as e:
+                return payment_result(order_id, e.order)
             raise Exception('Payment processing failed')
         
         # Actualizar estado a PAYMENT_PROCESSED
-        table.update_item(
-            Key={'orderId': order_id},
-            UpdateExpression='SET #status = :status, paymentDate = :date, transactionId = :txn',
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={
-                ':status': 'PAYMENT_PROCESSED',
-                ':date': datetime.utcnow().isoformat(),
-                ':txn': f'TXN-{order_id[:8]}'
-            }
-        )
+        try:
+            order = update_order(
+                order_id,
+                'SET #status = :status, paymentDate = :date, transactionId = :txn',
+                {
+                    ':status': 'PAYMENT_PROCESSED',
+                    ':date': datetime.utcnow().isoformat(),
+                    ':txn': f'TXN-{order_id[:8]}',
+                    **condition_values
+                },
+                {'#status': 'status'},
+                condition
+            )
+        except OrderStateConflict as e:
+            return payment_result(order_id, e.order)
         
         print(f'Payment processed successfully for order {order_id}')
         return {
             'status': 'payment_processed',
             'orderId': order_id,
-            'transactionId': f'TXN-{order_id[:8]}'
+            'transactionId': f'TXN-{order_id[:8]}',
+            'order': order
         }
     except Exception as e:
         print(f'Error processing payment: {str(e)}')
         raise
 
-def arrange_shipment(order_id):
+def payment_result(order_id, order):
+    """Resultado de un pago ya registrado (reintento); falla si la orden no está pagada"""
+    if order.get('status') not in PAID_STATUSES:
+        raise OrderStateConflict(order)
+    print(f'Payment already processed for order {order_id}, skipping')
+    return {
+        'status': 'payment_processed',
+        'orderId': order_id,
+        'transactionId': order.get('transactionId'),
+        'order': order,
+        'alreadyProcessed': True
+    }
+
+def arrange_shipment(order_id, retry_count=0):
     """
     Arreglar envío de la orden
-    Simula integración con sistema de envíos externo
+    Simula integración con sistema de envíos externo.
+    Idempotente: solo envía órdenes en PAYMENT_PROCESSED
     """
     try:
-        # Obtener detalles de la orden
-        response = table.get_item(Key={'orderId': order_id})
-        order = response.get('Item')
-        
-        if not order:
-            raise ValueError(f'Order {order_id} not found')
+        if retry_count:
+            current = load_order(order_id, consistent_read=True)
+            if current.get('status') in SHIPPED_STATUSES:
+                return shipment_result(order_id, current)
         
         # Generar número de tracking
         tracking_number = f'TRACK-{order_id[:12].upper()}'
@@ -108,108 +303,196 @@ def arrange_shipment(order_id):
         estimated_days = random.randint(3, 5)
         
         # Actualizar estado a SHIPPED
-        table.update_item(
-            Key={'orderId': order_id},
-            UpdateExpression='SET #status = :status, shipmentDate = :date, trackingNumber = :tracking, estimatedDeliveryDays = :days',
-            ExpressionAttributeNames={'#status': 'status'},
-            ExpressionAttributeValues={
-                ':status': 'SHIPPED',
-                ':date': datetime.utcnow().isoformat(),
-                ':tracking': tracking_number,
-                ':days': estimated_days
-            }
-        )
+        try:
+            order = update_order(
+                order_id,
+                'SET #status = :status, shipmentDate = :date, trackingNumber = :tracking, estimatedDeliveryDays = :days',
+                {
+                    ':status': 'SHIPPED',
+                    ':date': datetime.utcnow().isoformat(),
+                    ':tracking': tracking_number,
+                    ':days': estimated_days,
+                    ':paid': 'PAYMENT_PROCESSED'
+                },
+                {'#status': 'status'},
+                '#status = :paid'
+            )
+        except OrderStateConflict as e:
+            return shipment_result(order_id, e.order)
         
         print(f'Shipment arranged for order {order_id}, tracking: {tracking_number}')
         return {
             'status': 'shipped',
             'orderId': order_id,
             'trackingNumber': tracking_number,
-            'estimatedDeliveryDays': estimated_days
+            'estimatedDeliveryDays': estimated_days,
+            'order': order
         }
     except Exception as e:
         print(f'Error arranging shipment: {str(e)}')
         raise
 
-def send_notification(order_id):
+def shipment_result(order_id, order):
+    """Resultado de un envío ya registrado (reintento); falla si la orden no está enviada"""
+    if order.get('status') not in SHIPPED_STATUSES:
+        raise OrderStateConflict(order)
+    print(f'Shipment already arranged for order {order_id}, skipping')
+    return {
+        'status': 'shipped',
+        'orderId': order_id,
+        'trackingNumber': order.get('trackingNumber'),
+        'estimatedDeliveryDays': order.get('estimatedDeliveryDays'),
+        'order': order,
+        'alreadyProcessed': True
+    }
+
+def render_notification(order_id, order):
+    """Armar (subject, message, attributes) de la notificación de una orden"""
+    address = order.get('shippingAddress', {})
+    items_summary = '\n'.join([
+        ITEM_LINE_TEMPLATE.format(
+            name=item.get('name', 'Item'),
+            quantity=item.get('quantity', 1),
+            price=float(item.get('price', 0))
+        )
+        for item in order.get('items', [])
+    ])
+    message = NOTIFICATION_TEMPLATE.format(
+        customerName=order.get('customerName', 'Customer'),
+        orderId=order_id,
+        orderDate=order.get('orderDate', 'N/A'),
+        status=order.get('status', 'N/A'),
+        itemsSummary=items_summary,
+        totalAmount=float(order.get('totalAmount', 0)),
+        street=address.get('street', ''),
+        city=address.get('city', ''),
+        state=address.get('state', ''),
+        zipCode=address.get('zipCode', ''),
+        trackingNumber=order.get('trackingNumber', 'Will be provided soon'),
+        estimatedDeliveryDays=order.get('estimatedDeliveryDays', 'N/A')
+    )
+    attributes = {
+        'orderId': {'DataType': 'String', 'StringValue': order_id},
+        'customerEmail': {'DataType': 'String', 'StringValue': order.get('customerEmail', '')}
+    }
+    return f'Order Confirmation - {order_id}', message, attributes
+
+def send_notification(order_id, order=None):
     """
     Enviar notificación al cliente
-    Publica mensaje a SNS Topic
+    Publica mensaje a SNS Topic, o lo encola para publicarlo en lote (modo batch)
     """
     try:
-        # Obtener detalles de la orden
-        response = table.get_item(Key={'orderId': order_id})
-        order = response.get('Item')
-        
-        if not order:
-            raise ValueError(f'Order {order_id} not found')
+        # Obtener detalles de la orden (solo se lee si no llegó en el payload)
+        order = load_order(order_id, order)
         
-        # Preparar mensaje de notificación
-        items_summary = '\n'.join([
-            f"  - {item.get('name', 'Item')} x{item.get('quantity', 1)} - ${float(item.get('price', 0))}"
-            for item in order.get('items', [])
-        ])
-        
-        message = f"""
-Order Confirmation - E-commerce Store
-
-Dear {order.get('customerName', 'Customer')},
-
-Thank you for your order!
-
-Order Details:
---------------
-Order ID: {order_id}
-Order Date: {order.get('orderDate', 'N/A')}
-Status: {order.get('status', 'N/A')}
-
-Items:
-{items_summary}
-
-Total Amount: ${float(order.get('totalAmount', 0))}
-
-Shipping Address:
-{order.get('shippingAddress', {}).get('street', '')}, 
-{order.get('shippingAddress', {}).get('city', '')}, 
-{order.get('shippingAddress', {}).get('state', '')} {order.get('shippingAddress', {}).get('zipCode', '')}
-
-Tracking Number: {order.get('trackingNumber', 'Will be provided soon')}
-Estimated Delivery: {order.get('estimatedDeliveryDays', 'N/A')} business days
-
-Thank you for shopping with us!
-
-Best regards,
-E-commerce Team
-        """
+        queue_url = os.environ.get('NOTIFICATION_QUEUE_URL')
+        if NOTIFICATION_MODE == 'batch' and queue_url:
+            # notificationSentDate lo registra la Lambda al publicar el lote
+            sqs.send_message(
+                QueueUrl=queue_url,
+                MessageBody=json.dumps({'orderId': order_id, 'order': order}, cls=DecimalEncoder)
+            )
+            print(f'Notification queued for order {order_id}')
+            return {
+                'status': 'notification_queued',
+                'orderId': order_id,
+                'customerEmail': order.get('customerEmail'),
+                'order': order
+            }
         
         # Publicar a SNS
+        subject, message, attributes = render_notification(order_id, order)
         sns_topic_arn = os.environ.get('SNS_TOPIC_ARN')
         if sns_topic_arn:
             sns.publish(
                 TopicArn=sns_topic_arn,
-                Subject=f'Order Confirmation - {order_id}',
+                Subject=subject,
                 Message=message,
-                MessageAttributes={
-                    'orderId': {'DataType': 'String', 'StringValue': order_id},
-                    'customerEmail': {'DataType': 'String', 'StringValue': order.get('customerEmail', '')}
-                }
+                MessageAttributes=attributes
             )
         
         # Actualizar orden con fecha de notificación
-        table.update_item(
-            Key={'orderId': order_id},
-            UpdateExpression='SET notificationSentDate = :date',
-            ExpressionAttributeValues={
-                ':date': datetime.utcnow().isoformat()
-            }
+        order = update_order(
+            order_id,
+            'SET notificationSentDate = :date',
+            {':date': datetime.utcnow().isoformat()}
         )
         
         print(f'Notification sent for order {order_id}')
         return {
             'status': 'notification_sent',
             'orderId': order_id,
-            'customerEmail': order.get('customerEmail')
+            'customerEmail': order.get('customerEmail'),
+            'order': order
         }
     except Exception as e:
         print(f'Error sending notification: {str(e)}')
         raise
+
+def send_notifications_batch(records):
+    """
+    Publicar las notificaciones encoladas con publish_batch (hasta 10 por llamada)
+    El batching window del event source mapping acota la espera de cada orden.
+    Retorna batchItemFailures para que SQS reintente solo los mensajes fallidos
+    """
+    sns_topic_arn = os.environ.get('SNS_TOPIC_ARN')
+    failures = []
+    pending = []
+    for record in records:
+        try:
+            body = json.loads(record['body'])
+            order_id = body['orderId']
+            subject, message, attributes = render_notification(order_id, body['order'])
+        except Exception as e:
+            print(f"Invalid notification message {record.get('messageId')}: {str(e)}")
+            failures.append(record['messageId'])
+            continue
+        pending.append((record['messageId'], order_id, subject, message, attributes))
+    
+    # Los grupos de 10 se publican en paralelo
+    groups = [pending[i:i + SNS_BATCH_SIZE] for i in range(0, len(pending), SNS_BATCH_SIZE)]
+    sent = []
+    for group_sent, group_failed in executor.map(lambda group: publish_group(sns_topic_arn, group), groups):
+        sent.extend(group_sent)
+        failures.extend(group_failed)
+    
+    # Registrar la fecha de notificación de las órdenes publicadas (en paralelo)
+    sent_date = datetime.utcnow().isoformat()
+    
+    def mark_sent(entry):
+        message_id, order_id = entry[0], entry[1]
+        try:
+            update_order(order_id, 'SET notificationSentDate = :date', {':date': sent_date})
+        except ValueError as e:
+            # La notificación ya salió: no se reintenta por una orden inexistente
+            print(f'Error updating notification date: {str(e)}')
+        except Exception as e:
+            print(f'Error updating notification date: {str(e)}')
+            return message_id
+        return None
+    
+    failures.extend(message_id for message_id in executor.map(mark_sent, sent) if message_id)
+    
+    print(f'Notifications published: {len(sent)}, failed: {len(failures)}')
+    return {'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failures]}
+
+def publish_group(sns_topic_arn, group):
+    """Publicar hasta 10 notificaciones; retorna (enviadas, messageIds fallidos)"""
+    if not sns_topic_arn:
+        return group, []
+    try:
+        response = sns.publish_batch(
+            TopicArn=sns_topic_arn,
+            PublishBatchRequestEntries=[
+                {'Id': str(j), 'Subject': subject, 'Message': message, 'MessageAttributes': attributes}
+                for j, (_, _, subject, message, attributes) in enumerate(group)
+            ]
+        )
+    except Exception as e:
+        print(f'Error publishing notification batch: {str(e)}')
+        return [], [message_id for message_id, *_ in group]
+    failed_ids = {int(entry['Id']) for entry in response.get('Failed', [])}
+    sent = [entry for j, entry in enumerate(group) if j not in failed_ids]
+    failed = [entry[0] for j, entry in enumerate(group) if j in failed_ids]
+    return sent, failed
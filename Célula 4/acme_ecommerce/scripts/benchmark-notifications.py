@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark de notificaciones: publish por orden vs publish_batch desde SQS
+
+Con un ritmo fijo de órdenes completadas compara el modo 'direct' (un
+sns.publish y un update_item dentro del paso SendNotification) con el modo
+'batch' (el paso encola la orden; la Lambda recibe lotes del event source
+mapping y publica de a 10 con publish_batch).
+
+El event source mapping se simula con un reloj: un lote se entrega cuando
+junta --batch-size mensajes o cuando pasan --flush-interval segundos desde el
+primero. La latencia de cada notificación es la espera en la cola más la
+duración de la invocación. Cada llamada a AWS espera --aws-call-ms antes de
+llegar a moto, así las llamadas concurrentes del modo batch se solapan como
+en producción (las duraciones incluyen además el tiempo de moto).
+
+Uso: python scripts/benchmark-notifications.py [--orders 1000] [--rate 50] [--flush-interval 5]
+Requiere: pip install boto3 moto pyyaml
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+from moto import mock_aws
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import local_stack  # noqa: E402
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    ordered = sorted(values)
+    index = max(0, int(round(pct / 100 * len(ordered))) - 1)
+    return ordered[index]
+
+
+class Invoker:
+    """Ejecuta una función de la Lambda y retorna su duración en segundos"""
+
+    def __call__(self, fn, *args):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = fn(*args)
+        return result, time.perf_counter() - start
+
+
+def add_latency(seconds, *clients):
+    """Esperar `seconds` antes de cada llamada a la API (latencia de red simulada)"""
+    for client in clients:
+        service = client.meta.service_model.service_name
+        client.meta.events.register(f'before-call.{service}.*', lambda **kwargs: time.sleep(seconds))
+
+
+def run_direct(process_order, orders, invoke):
+    process_order.NOTIFICATION_MODE = 'direct'
+    latencies = []
+    step_seconds = 0.0
+    for order in orders:
+        _, duration = invoke(process_order.send_notification, order['orderId'], order)
+        latencies.append(duration)
+        step_seconds += duration
+    return latencies, step_seconds, 0.0
+
+
+def run_batch(process_order, orders, invoke, args, queue_url):
+    process_order.NOTIFICATION_MODE = 'batch'
+    arrivals = [i / args.rate for i in range(len(orders))]
+    latencies = []
+    step_seconds = 0.0
+    batch_seconds = 0.0
+
+    # Paso SendNotification: solo encola
+    for order in orders:
+        _, duration = invoke(process_order.send_notification, order['orderId'], order)
+        step_seconds += duration
+
+    # Event source mapping: lotes por tamaño o por ventana de tiempo
+    i = 0
+    while i < len(orders):
+        window_end = arrivals[i] + args.flush_interval
+        j = i
+        while j < len(orders) and j - i < args.batch_size and arrivals[j] <= window_end:
+            j += 1
+        flush_at = arrivals[j - 1] if j - i == args.batch_size else window_end
+        records = local_stack.receive_records(queue_url, j - i)
+        response, duration = invoke(process_order.lambda_handler, {'Records': records}, None)
+        local_stack.delete_records(queue_url, records)
+        if response['batchItemFailures']:
+            print(f"✗ {len(response['batchItemFailures'])} notificaciones fallidas en el lote")
+        batch_seconds += duration
+        latencies.extend(flush_at - arrivals[k] + duration for k in range(i, j))
+        i = j
+    return latencies, step_seconds, batch_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Notificaciones directas vs publish_batch desde SQS')
+    parser.add_argument('--orders', type=int, default=1000, help='Órdenes completadas')
+    parser.add_argument('--rate', type=float, default=50.0, help='Órdenes completadas por segundo')
+    parser.add_argument('--flush-interval', type=float, default=5.0,
+                        help='MaximumBatchingWindowInSeconds del event source mapping')
+    parser.add_argument('--batch-size', type=int, default=100, help='BatchSize del event source mapping')
+    parser.add_argument('--aws-call-ms', type=float, default=10.0, help='Latencia por llamada a AWS')
+    args = parser.parse_args()
+
+    local_stack.configure_environment()
+    with mock_aws():
+        resources = local_stack.create_resources()
+        process_order = local_stack.load_lambda('process-order')
+        clients = (process_order.table.meta.client, process_order.sns, process_order.sqs)
+        counter = local_stack.CallCounter(*clients)
+        add_latency(args.aws_call_ms / 1000, *clients)
+        invoke = Invoker()
+
+        reports = {}
+        for mode in ('direct', 'batch'):
+            orders = local_stack.load_sample_orders(args.orders, prefix=f'{mode}-')
+            for order in orders:
+                process_order.table.put_item(Item=order)
+            orders = [process_order.to_snapshot(order) for order in orders]
+
+            counter.reset()
+            if mode == 'direct':
+                latencies, step_seconds, batch_seconds = run_direct(process_order, orders, invoke)
+            else:
+                latencies, step_seconds, batch_seconds = run_batch(
+                    process_order, orders, invoke, args, resources['notificationQueueUrl'])
+            reports[mode] = {
+                'latencies': latencies,
+                'stepSeconds': step_seconds,
+                'batchSeconds': batch_seconds,
+                'calls': dict(counter.calls)
+            }
+
+    n = args.orders
+    print('=' * 78)
+    print(f"{args.orders} órdenes a {args.rate:.0f}/s, ventana {args.flush_interval:.1f}s, lote {args.batch_size}")
+    print(f"{'modo':<7} {'p50 s':>7} {'p95 s':>7} {'máx s':>7} {'SNS/ord':>8} {'SQS/ord':>8} "
+          f"{'DDB/ord':>8} {'paso ms/ord':>12} {'lote ms/ord':>12}")
+    for mode, report in reports.items():
+        calls = report['calls']
+        sns_calls = sum(v for k, v in calls.items() if k.startswith('sns:'))
+        sqs_calls = sum(v for k, v in calls.items() if k.startswith('sqs:'))
+        ddb_calls = sum(v for k, v in calls.items() if k.startswith('dynamodb:'))
+        latencies = report['latencies']
+        print(f"{mode:<7} {percentile(latencies, 50):>7.2f} {percentile(latencies, 95):>7.2f} "
+              f"{max(latencies):>7.2f} {sns_calls / n:>8.2f} {sqs_calls / n:>8.2f} {ddb_calls / n:>8.2f} "
+              f"{report['stepSeconds'] / n * 1000:>12.2f} {report['batchSeconds'] / n * 1000:>12.2f}")
+    print('-' * 78)
+    print("paso: duración de SendNotification en el workflow; lote: invocaciones desde la cola")
+    print(f"Latencia máxima esperada en batch: ventana ({args.flush_interval:.1f}s) + duración del lote")
+    print('=' * 78)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark de GET /orders?customerId=... a medida que crece el historial
+
+Para clientes con historiales de distinto tamaño compara la consulta
+anterior (query completa del CustomerIndex con todos los atributos) con la
+primera página de la consulta paginada (limit + vista summary): órdenes
+leídas, bytes de la respuesta, RCUs estimadas y tiempo del handler.
+
+Las RCUs se estiman como lo factura DynamoDB para un query eventualmente
+consistente: tamaño total leído redondeado a 4 KB, a media unidad cada 4 KB.
+El tiempo es el de moto, que filtra en memoria: crece con el historial en
+ambos casos y solo sirve como referencia relativa.
+
+Uso: python scripts/benchmark-order-history.py [--sizes 100,1000,5000]
+Requiere: pip install boto3 moto pyyaml
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import sys
+import time
+
+from moto import mock_aws
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import local_stack  # noqa: E402
+
+HISTORY_SIZES = [100, 1000, 5000]
+PAGE_SIZE = 20
+
+
+def estimate_rcus(items):
+    """RCUs de un query eventualmente consistente sobre estos items (tamaño aproximado por JSON)"""
+    size = sum(len(json.dumps(item, default=str)) for item in items)
+    return math.ceil(size / 4096) * 0.5
+
+
+def legacy_query(app, customer_id):
+    """Consulta anterior: todo el historial del cliente con todos los atributos"""
+    response = app.table.query(
+        IndexName='CustomerIndex',
+        KeyConditionExpression='customerId = :cid',
+        ExpressionAttributeValues={':cid': customer_id}
+    )
+    body = json.dumps(response.get('Items', []), cls=app.DecimalEncoder)
+    # DynamoDB lee (y cobra) los items completos que devolvió
+    return body, response['Items']
+
+
+def paged_query(app, customer_id):
+    """Primera página de GET /orders con la vista summary"""
+    event = {
+        'httpMethod': 'GET',
+        'path': '/orders',
+        'queryStringParameters': {'customerId': customer_id, 'limit': str(PAGE_SIZE)}
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = app.lambda_handler(event, None)
+    return response['body'], None
+
+
+def items_read(app, customer_id):
+    """
+    Items completos que DynamoDB lee para la página (la proyección no reduce
+    las RCUs, solo lo transferido): misma consulta sin ProjectionExpression
+    """
+    return app.table.query(
+        IndexName='CustomerIndex',
+        KeyConditionExpression='customerId = :cid',
+        ExpressionAttributeValues={':cid': customer_id},
+        ScanIndexForward=False,
+        Limit=PAGE_SIZE
+    )['Items']
+
+
+def measure(fn, app, customer_id):
+    start = time.perf_counter()
+    body, read = fn(app, customer_id)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if read is None:
+        read = items_read(app, customer_id)
+    return {
+        'read': len(read),
+        'bytes': len(body),
+        'rcus': estimate_rcus(read),
+        'ms': elapsed_ms
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GET /orders por cliente: consulta completa vs paginada')
+    parser.add_argument('--sizes', default=','.join(str(n) for n in HISTORY_SIZES),
+                        help='Tamaños de historial separados por coma')
+    args = parser.parse_args()
+    sizes = [int(n) for n in args.sizes.split(',')]
+
+    local_stack.configure_environment()
+    with mock_aws():
+        local_stack.create_resources()
+        app = local_stack.load_lambda('app-server')
+
+        print('=' * 78)
+        print(f"{'historial':>9} {'modo':>8} {'leídas':>7} {'bytes resp':>11} {'RCUs':>7} {'ms (moto)':>10}")
+        for size in sizes:
+            customer_id = f'cust-history-{size}'
+            with app.table.batch_writer() as batch:
+                for i, order in enumerate(local_stack.load_sample_orders(size, prefix=f'{customer_id}-')):
+                    order['customerId'] = customer_id
+                    order['orderDate'] = f'2025-01-01T00:00:00.{i:06d}Z'
+                    order['itemCount'] = len(order.get('items', []))
+                    batch.put_item(Item=order)
+
+            for mode, fn in (('anterior', legacy_query), ('paginada', paged_query)):
+                stats = measure(fn, app, customer_id)
+                print(f"{size:>9} {mode:>8} {stats['read']:>7} {stats['bytes']:>11} "
+                      f"{stats['rcus']:>7.1f} {stats['ms']:>10.1f}")
+        print('=' * 78)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmark de GET /orders/{id} con la caché del app-server bajo polling
+
+Simula una tienda donde cada orden recién creada tiene varios pollers
+(pestañas del storefront) consultando su estado a intervalos fijos mientras
+process-order la lleva de PENDING a SHIPPED y notificada. Los pollers
+reenvían el último ETag en If-None-Match, como un navegador, y una fracción
+de los polls pide lectura consistente.
+
+Compara sin caché (ORDER_CACHE_TTL=0: cada poll lee la tabla) con la caché
+habilitada: lecturas a DynamoDB, RCUs, respuestas 304 y respuestas con un
+estado distinto al de la tabla en ese momento (costo de la caché en frescura).
+El reloj es simulado; las RCUs se estiman como las factura DynamoDB
+(4 KB por unidad; media unidad si es eventualmente consistente).
+
+Uso: python scripts/benchmark-order-polling.py [--orders 200] [--pollers 2] [--poll-interval 2]
+Requiere: pip install boto3 moto pyyaml
+"""
+import argparse
+import contextlib
+import heapq
+import io
+import json
+import math
+import os
+import random
+import sys
+
+from moto import mock_aws
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import local_stack  # noqa: E402
+
+STEPS = ('process_payment', 'arrange_shipment', 'send_notification')
+# Espera del Retry de ProcessPayment en el workflow (IntervalSeconds)
+RETRY_DELAY = 2.0
+
+
+class SimulatedClock:
+    """Reemplaza el módulo time del app-server: la caché expira en tiempo simulado"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+class ReadMeter:
+    """Cuenta los GetItem del app-server y estima sus RCUs"""
+
+    def __init__(self, client):
+        self.reads = 0
+        self.rcus = 0.0
+        self._consistent = False
+        client.meta.events.register('before-parameter-build.dynamodb.GetItem', self._params)
+        client.meta.events.register('after-call.dynamodb.GetItem', self._read)
+
+    def _params(self, params, **kwargs):
+        self._consistent = bool(params.get('ConsistentRead'))
+
+    def _read(self, parsed, **kwargs):
+        size = len(json.dumps(parsed.get('Item', {})))
+        self.reads += 1
+        self.rcus += max(1, math.ceil(size / 4096)) * (1 if self._consistent else 0.5)
+
+
+def create_order(app, sample):
+    body = {k: v for k, v in sample.items() if k not in ('orderId', 'status', 'orderDate', 'itemCount')}
+    event = {'httpMethod': 'POST', 'path': '/orders', 'body': json.dumps(body, default=float)}
+    return json.loads(app.lambda_handler(event, None)['body'])['orderId']
+
+
+def run_mode(mode, args, app, process_order, samples):
+    """Simular la carga de polling con o sin caché; retorna métricas"""
+    clock = SimulatedClock()
+    app.time = clock
+    app.order_cache.clear()
+    app.ORDER_CACHE_TTL = args.ttl if mode == 'cache' else 0
+    app.ORDER_CACHE_SETTLED_TTL = args.settled_ttl if mode == 'cache' else 0
+    meter = ReadMeter(app.table.meta.client)
+    # Misma secuencia de tiempos y pagos fallidos en ambos modos
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+
+    truth = {}
+    events = []
+    sequence = 0
+
+    def schedule(at, kind, *data):
+        nonlocal sequence
+        sequence += 1
+        heapq.heappush(events, (at, sequence, kind, data))
+
+    for i in range(args.orders):
+        schedule(i * args.arrival_interval, 'create', samples[i % len(samples)])
+
+    stats = {'polls': 0, 'notModified': 0, 'stale': 0, 'consistentPolls': 0}
+    while events:
+        clock.now, _, kind, data = heapq.heappop(events)
+        if kind == 'create':
+            order_id = create_order(app, data[0])
+            truth[order_id] = 'PENDING'
+            delay = rng.uniform(1.0, 5.0)
+            schedule(clock.now + delay, 'step', order_id, 0, 0)
+            for poller in range(args.pollers):
+                schedule(clock.now + rng.uniform(0, args.poll_interval), 'poll', order_id, None, None, clock.now)
+        elif kind == 'step':
+            order_id, step, retry_count = data
+            try:
+                result = process_order.lambda_handler(
+                    {'orderId': order_id, 'action': STEPS[step], 'retryCount': retry_count}, None)
+            except Exception:
+                truth[order_id] = 'PAYMENT_FAILED'
+                schedule(clock.now + RETRY_DELAY, 'step', order_id, step, retry_count + 1)
+                continue
+            truth[order_id] = result['order']['status'] + (':notified' if step == 2 else '')
+            if step + 1 < len(STEPS):
+                schedule(clock.now + rng.uniform(0.5, 4.0), 'step', order_id, step + 1, 0)
+        elif kind == 'poll':
+            # Cada poller recuerda el ETag y el estado de su última respuesta 200
+            order_id, etag, seen, created = data
+            consistent = rng.random() < args.consistent_rate
+            event = {
+                'httpMethod': 'GET',
+                'path': f'/orders/{order_id}',
+                'queryStringParameters': {'consistent': 'true'} if consistent else None,
+                'headers': {'If-None-Match': etag} if etag else {}
+            }
+            response = app.lambda_handler(event, None)
+            stats['polls'] += 1
+            stats['consistentPolls'] += consistent
+            if response['statusCode'] == 304:
+                stats['notModified'] += 1
+            else:
+                order = json.loads(response['body'])
+                seen = order['status'] + (':notified' if order.get('notificationSentDate') else '')
+                etag = response['headers']['ETag']
+            if seen != truth[order_id]:
+                stats['stale'] += 1
+            if clock.now + args.poll_interval <= created + args.poll_duration:
+                schedule(clock.now + args.poll_interval, 'poll', order_id, etag, seen, created)
+
+    stats.update({'reads': meter.reads, 'rcus': meter.rcus})
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GET /orders/{id} con y sin caché bajo polling')
+    parser.add_argument('--orders', type=int, default=200, help='Órdenes creadas durante la simulación')
+    parser.add_argument('--arrival-interval', type=float, default=0.5, help='Segundos entre órdenes nuevas')
+    parser.add_argument('--pollers', type=int, default=2, help='Pollers por orden')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='Segundos entre polls de un poller')
+    parser.add_argument('--poll-duration', type=float, default=60.0, help='Segundos que cada orden es consultada')
+    parser.add_argument('--consistent-rate', type=float, default=0.05, help='Fracción de polls con consistent=true')
+    parser.add_argument('--ttl', type=float, default=2.0, help='ORDER_CACHE_TTL')
+    parser.add_argument('--settled-ttl', type=float, default=60.0, help='ORDER_CACHE_SETTLED_TTL')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    local_stack.configure_environment()
+
+    with mock_aws():
+        local_stack.create_resources()
+        app = local_stack.load_lambda('app-server')
+        process_order = local_stack.load_lambda('process-order')
+        with open(local_stack.SAMPLE_ORDERS, encoding='utf-8') as f:
+            samples = json.load(f)
+        # Los logs de las Lambdas no se muestran durante la simulación
+        with contextlib.redirect_stdout(io.StringIO()):
+            reports = {mode: run_mode(mode, args, app, process_order, samples) for mode in ('no-cache', 'cache')}
+
+    print('=' * 78)
+    print(f"{'modo':<9} {'polls':>7} {'304':>7} {'GetItem':>8} {'RCUs':>9} {'RCU/poll':>9} "
+          f"{'consist.':>8} {'desact.':>8}")
+    for mode, r in reports.items():
+        print(f"{mode:<9} {r['polls']:>7} {r['notModified']:>7} {r['reads']:>8} {r['rcus']:>9.1f} "
+              f"{r['rcus'] / r['polls']:>9.3f} {r['consistentPolls']:>8} "
+              f"{r['stale'] / r['polls'] * 100:>7.2f}%")
+    print('-' * 78)
+    base, cached = reports['no-cache'], reports['cache']
+    saved = 1 - cached['rcus'] / base['rcus'] if base['rcus'] else 0
+    print(f"RCUs ahorradas: {base['rcus'] - cached['rcus']:.1f} ({saved * 100:.1f}%)  "
+          f"TTL {args.ttl:g}s / asentadas {args.settled_ttl:g}s")
+    print('desact. = respuestas con un estado distinto al de la tabla en ese momento')
+    print('=' * 78)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Compara latencia y costo del workflow Standard (tres Tasks) con el modo
+pipeline del state machine Express (una invocación de process-order)
+
+Ejecuta ambas definiciones de resources-stack.yaml contra moto y mide el
+tiempo de cada invocación. Como moto no tiene latencia de red, el tiempo
+dentro de las llamadas a AWS se reemplaza por una latencia fija por llamada
+y se suma, por invocación, el overhead de invoke (y de cold start con la
+probabilidad indicada) y, por transición de estado, la latencia del tipo de
+workflow. Los reintentos no esperan su backoff en ninguno de los dos modos.
+
+Uso: python scripts/compare-workflow-modes.py [--orders 500] [--cold-start-rate 0.05]
+Requiere: pip install boto3 moto pyyaml
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+from moto import mock_aws
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import local_stack  # noqa: E402
+
+# Precios us-east-1 (USD)
+STANDARD_PRICE_PER_TRANSITION = 0.000025
+EXPRESS_PRICE_PER_REQUEST = 1.00 / 1_000_000
+EXPRESS_PRICE_PER_GB_SECOND = 0.00001667
+EXPRESS_BILLED_MEMORY_GB = 64 / 1024
+EXPRESS_BILLING_INCREMENT_MS = 100
+LAMBDA_PRICE_PER_REQUEST = 0.20 / 1_000_000
+LAMBDA_PRICE_PER_GB_SECOND = 0.0000166667
+LAMBDA_MEMORY_GB = 128 / 1024
+
+MODES = {
+    'standard': 'OrderProcessingStateMachine',
+    'express': 'OrderProcessingExpressStateMachine'
+}
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    ordered = sorted(values)
+    index = max(0, int(round(pct / 100 * len(ordered))) - 1)
+    return ordered[index]
+
+
+class TimedTask:
+    """
+    Task de Lambda que registra la duración modelada de cada invocación
+    (código de la Lambda + latencia por llamada a AWS; aparte, overhead de invoke y cold start)
+    """
+
+    def __init__(self, handler, counter, args, rng):
+        self.invoke = local_stack.lambda_task(handler)
+        self.counter = counter
+        self.args = args
+        self.rng = rng
+        self.durations = []
+        self.overheads = []
+
+    def reset(self):
+        self.durations = []
+        self.overheads = []
+
+    def __call__(self, payload):
+        calls_before = self.counter.total()
+        aws_seconds_before = self.counter.seconds
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                return self.invoke(payload)
+        finally:
+            # Se descuenta el tiempo de moto: solo queda el código de la Lambda
+            elapsed_ms = (time.perf_counter() - start - (self.counter.seconds - aws_seconds_before)) * 1000
+            aws_calls = self.counter.total() - calls_before
+            self.durations.append(elapsed_ms + aws_calls * self.args.aws_call_ms)
+            overhead = self.args.invoke_overhead_ms
+            if self.rng.random() < self.args.cold_start_rate:
+                overhead += self.args.cold_start_ms
+            self.overheads.append(overhead)
+
+
+def run_mode(mode, args, process_order, counter):
+    """Procesar todas las órdenes con un modo; retorna métricas por orden"""
+    definition = local_stack.load_state_machine_definition(MODES[mode])
+    task = TimedTask(process_order.lambda_handler, counter, args,
+                     random.Random(f'{args.seed}:cold:{mode}'))
+    machine = local_stack.StateMachine(definition, {'ProcessOrderFunction': task})
+    transition_ms = args.standard_transition_ms if mode == 'standard' else args.express_transition_ms
+
+    orders = local_stack.load_sample_orders(args.orders, prefix=f'{mode}-')
+    for order in orders:
+        process_order.table.put_item(Item=order)
+
+    # Misma secuencia de pagos fallidos en ambos modos
+    random.seed(args.seed)
+    results = []
+    for order in orders:
+        task.reset()
+        counter.reset()
+        transitions_before = machine.transitions
+        status, _, history = machine.run({'orderId': order['orderId']})
+        # Cada reintento de un Task también se factura como transición
+        tasks_entered = sum(1 for name, _ in history if definition['States'][name]['Type'] == 'Task')
+        transitions = machine.transitions - transitions_before + len(task.durations) - tasks_entered
+        lambda_ms = sum(task.durations)
+        results.append({
+            'status': status,
+            'latencyMs': lambda_ms + sum(task.overheads) + transitions * transition_ms,
+            'invocations': len(task.durations),
+            'transitions': transitions,
+            'lambdaMs': lambda_ms,
+            'billedLambdaMs': sum(max(1, round(ms)) for ms in task.durations),
+            'dynamodbCalls': counter.total('dynamodb')
+        })
+    return results
+
+
+def cost_per_order(mode, result):
+    """Costo de Step Functions + Lambda de una orden"""
+    lambda_cost = (result['invocations'] * LAMBDA_PRICE_PER_REQUEST
+                   + result['billedLambdaMs'] / 1000 * LAMBDA_MEMORY_GB * LAMBDA_PRICE_PER_GB_SECOND)
+    if mode == 'standard':
+        workflow_cost = result['transitions'] * STANDARD_PRICE_PER_TRANSITION
+    else:
+        increments = -(-result['latencyMs'] // EXPRESS_BILLING_INCREMENT_MS)
+        billed_seconds = increments * EXPRESS_BILLING_INCREMENT_MS / 1000
+        workflow_cost = (EXPRESS_PRICE_PER_REQUEST
+                         + billed_seconds * EXPRESS_BILLED_MEMORY_GB * EXPRESS_PRICE_PER_GB_SECOND)
+    return workflow_cost, lambda_cost
+
+
+def print_report(reports):
+    print('=' * 78)
+    print(f"{'modo':<9} {'ok':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'inv/ord':>8} {'trans/ord':>9} {'ddb/ord':>8} {'USD/1M órdenes':>15}")
+    for mode, results in reports.items():
+        latencies = [r['latencyMs'] for r in results]
+        ok = sum(1 for r in results if r['status'] == 'SUCCEEDED')
+        costs = [sum(cost_per_order(mode, r)) for r in results]
+        n = len(results)
+        print(f"{mode:<9} {ok:>5} {percentile(latencies, 50):>8.1f} {percentile(latencies, 95):>8.1f} "
+              f"{percentile(latencies, 99):>8.1f} {sum(r['invocations'] for r in results) / n:>8.2f} "
+              f"{sum(r['transitions'] for r in results) / n:>9.2f} "
+              f"{sum(r['dynamodbCalls'] for r in results) / n:>8.2f} {sum(costs) / n * 1_000_000:>15.2f}")
+    print('-' * 78)
+    for mode, results in reports.items():
+        workflow, lambda_cost = (sum(parts) for parts in zip(*(cost_per_order(mode, r) for r in results)))
+        n = len(results)
+        print(f"{mode:<9} Step Functions: {workflow / n * 1_000_000:>8.2f} USD/1M   "
+              f"Lambda: {lambda_cost / n * 1_000_000:>8.2f} USD/1M")
+    print('=' * 78)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Workflow Standard de tres pasos vs pipeline Express')
+    parser.add_argument('--orders', type=int, default=500, help='Órdenes por modo')
+    parser.add_argument('--seed', type=int, default=7, help='Semilla para pagos fallidos y cold starts')
+    parser.add_argument('--aws-call-ms', type=float, default=8.0, help='Latencia por llamada a DynamoDB/SNS')
+    parser.add_argument('--invoke-overhead-ms', type=float, default=20.0, help='Overhead de invocar la Lambda')
+    parser.add_argument('--cold-start-ms', type=float, default=400.0, help='Duración de un cold start')
+    parser.add_argument('--cold-start-rate', type=float, default=0.05, help='Probabilidad de cold start por invocación')
+    parser.add_argument('--standard-transition-ms', type=float, default=40.0, help='Latencia por transición (Standard)')
+    parser.add_argument('--express-transition-ms', type=float, default=10.0, help='Latencia por transición (Express)')
+    args = parser.parse_args()
+
+    local_stack.configure_environment()
+
+    with mock_aws():
+        local_stack.create_resources()
+        process_order = local_stack.load_lambda('process-order')
+        # El intérprete no espera backoff en Standard: tampoco dentro del pipeline
+        process_order.PIPELINE_RETRY_DELAY = 0
+        counter = local_stack.CallCounter(process_order.table.meta.client, process_order.sns)
+        reports = {mode: run_mode(mode, args, process_order, counter) for mode in MODES}
+
+    print_report(reports)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Cuenta las llamadas a DynamoDB por orden en el workflow de process-order
+
+Ejecuta la máquina de estados de resources-stack.yaml contra moto para un
+lote de órdenes y reporta cuántas llamadas (get_item/update_item) hace cada
+orden, separando las que completaron sin reintentos.
+
+Uso: python scripts/count-dynamodb-calls.py [--orders 200] [--seed 7]
+Requiere: pip install boto3 moto pyyaml
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+from collections import Counter
+
+from moto import mock_aws
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import local_stack  # noqa: E402
+
+# Antes del cambio: get_item + update_item en cada uno de los tres pasos
+BASELINE_CALLS_PER_ORDER = 6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Llamadas a DynamoDB por orden en el workflow')
+    parser.add_argument('--orders', type=int, default=200, help='Número de órdenes a procesar')
+    parser.add_argument('--seed', type=int, default=7, help='Semilla para la simulación de pagos')
+    parser.add_argument('--data', default=local_stack.SAMPLE_ORDERS)
+    args = parser.parse_args()
+
+    local_stack.configure_environment()
+    random.seed(args.seed)
+
+    with mock_aws():
+        local_stack.create_resources()
+        process_order = local_stack.load_lambda('process-order')
+        counter = local_stack.CallCounter(process_order.table.meta.client, process_order.sns)
+
+        for order in local_stack.load_sample_orders(args.orders, args.data):
+            process_order.table.put_item(Item=order)
+
+        machine = local_stack.StateMachine(
+            local_stack.load_state_machine_definition(),
+            {'ProcessOrderFunction': local_stack.lambda_task(process_order.lambda_handler)}
+        )
+
+        per_order = []
+        statuses = Counter()
+        calls_by_operation = Counter()
+        for order in local_stack.load_sample_orders(args.orders, args.data):
+            counter.reset()
+            # Los logs de la Lambda no se muestran durante la ejecución
+            with contextlib.redirect_stdout(io.StringIO()):
+                status, _, _ = machine.run({'orderId': order['orderId']})
+            dynamodb_calls = {k: v for k, v in counter.calls.items() if k.startswith('dynamodb:')}
+            # Sin reintentos: cada paso actualizó la orden una sola vez
+            clean = status == 'SUCCEEDED' and dynamodb_calls.get('dynamodb:UpdateItem', 0) <= 3
+            per_order.append((sum(dynamodb_calls.values()), clean))
+            statuses[status] += 1
+            calls_by_operation.update(dynamodb_calls)
+
+    totals = [calls for calls, _ in per_order]
+    clean_totals = [calls for calls, clean in per_order if clean]
+
+    print('=' * 60)
+    print(f'Órdenes procesadas: {len(per_order)}  ({dict(statuses)})')
+    print(f'Llamadas DynamoDB por orden (todas):       {sum(totals) / len(totals):.2f}')
+    if clean_totals:
+        print(f'Llamadas DynamoDB por orden (sin retries): {sum(clean_totals) / len(clean_totals):.2f}'
+              f'  (antes: {BASELINE_CALLS_PER_ORDER})')
+    print('Por operación:')
+    for name, count in sorted(calls_by_operation.items()):
+        print(f'  {name:<25} {count:>6}  ({count / len(per_order):.2f}/orden)')
+    print('=' * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Inyecta fallas en los pasos de pago y envío del workflow de process-order
+y verifica que los reintentos sean idempotentes
+
+Ejecuta la máquina de estados de resources-stack.yaml contra moto. Durante
+ProcessPayment y ArrangeShipment, cada UpdateItem falla con la probabilidad
+indicada, de dos formas:
+  - before: la escritura no llega a DynamoDB (throttling)
+  - after:  la escritura se aplica pero la respuesta se pierde (timeout)
+
+Reporta las llamadas a DynamoDB por orden y falla (exit 1) si alguna orden
+supera la cota que impone el Retry de la definición, si una orden pagada
+vuelve a PAYMENT_FAILED o si una orden se cobra más de una vez.
+
+Uso: python scripts/inject-failures.py [--orders 200] [--failure-rate 0.3] [--mode both]
+Requiere: pip install boto3 moto pyyaml
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+from collections import Counter
+
+from botocore.exceptions import ClientError, ReadTimeoutError
+from moto import mock_aws
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import local_stack  # noqa: E402
+
+INJECTED_STEPS = ('process_payment', 'arrange_shipment')
+
+# Peor caso de un intento: get_item (solo en reintentos) + update_item
+CALLS_PER_ATTEMPT = 2
+
+
+class FailureInjector:
+    """Hooks de botocore que hacen fallar UpdateItem antes o después de aplicarse"""
+
+    def __init__(self, client, rate, modes, rng):
+        self.rate = rate
+        self.modes = modes
+        self.rng = rng
+        self.action = None
+        self.injected = Counter()
+        self.charges = 0
+        self.flips = 0
+        self._pending_after = False
+        client.meta.events.register('before-call.dynamodb.UpdateItem', self._before)
+        client.meta.events.register('after-call.dynamodb.UpdateItem', self._after)
+
+    def reset(self):
+        self.charges = 0
+        self.flips = 0
+
+    def _before(self, **kwargs):
+        self._pending_after = False
+        if self.action not in INJECTED_STEPS or self.rng.random() >= self.rate:
+            return
+        mode = self.rng.choice(self.modes)
+        self.injected[f'{self.action}:{mode}'] += 1
+        if mode == 'before':
+            raise ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException',
+                                         'Message': 'Injected failure'}}, 'UpdateItem')
+        self._pending_after = True
+
+    def _after(self, http_response, parsed, **kwargs):
+        if http_response.status_code == 200:
+            status = parsed.get('Attributes', {}).get('status', {}).get('S')
+            if status == 'PAYMENT_PROCESSED':
+                self.charges += 1
+            elif status == 'PAYMENT_FAILED' and self.charges:
+                # Una orden ya cobrada no puede volver a fallar
+                self.flips += 1
+        if self._pending_after:
+            self._pending_after = False
+            raise ReadTimeoutError(endpoint_url='https://dynamodb.us-east-1.amazonaws.com')
+
+
+class CountingRandom:
+    """Envuelve el módulo random de la Lambda para contar simulaciones de pago"""
+
+    def __init__(self):
+        self.payments = 0
+
+    def random(self):
+        self.payments += 1
+        return random.random()
+
+    def __getattr__(self, name):
+        return getattr(random, name)
+
+
+def call_bound(definition):
+    """Máximo de llamadas a DynamoDB por orden según el Retry de cada Task"""
+    bound = 0
+    for state in definition['States'].values():
+        if state['Type'] != 'Task':
+            continue
+        retries = sum(retrier.get('MaxAttempts', 3) for retrier in state.get('Retry', []))
+        bound += (retries + 1) * CALLS_PER_ATTEMPT if retries else 1
+    return bound
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inyección de fallas en pago y envío')
+    parser.add_argument('--orders', type=int, default=200, help='Número de órdenes a procesar')
+    parser.add_argument('--failure-rate', type=float, default=0.3, help='Probabilidad de falla por UpdateItem')
+    parser.add_argument('--mode', choices=['before', 'after', 'both'], default='both',
+                        help='Falla antes de aplicar la escritura, después o ambas')
+    parser.add_argument('--seed', type=int, default=7, help='Semilla para pagos y fallas')
+    args = parser.parse_args()
+
+    local_stack.configure_environment()
+    random.seed(args.seed)
+
+    with mock_aws():
+        local_stack.create_resources()
+        process_order = local_stack.load_lambda('process-order')
+        counter = local_stack.CallCounter(process_order.table.meta.client)
+        injector = FailureInjector(process_order.table.meta.client, args.failure_rate,
+                                   ['before', 'after'] if args.mode == 'both' else [args.mode],
+                                   random.Random(f'{args.seed}:inject'))
+        payments = CountingRandom()
+        process_order.random = payments
+
+        invoke = local_stack.lambda_task(process_order.lambda_handler)
+        skipped = Counter()
+
+        def task(payload):
+            injector.action = payload.get('action')
+            result = invoke(payload)
+            if result.get('alreadyProcessed'):
+                skipped[payload['action']] += 1
+            return result
+
+        definition = local_stack.load_state_machine_definition()
+        machine = local_stack.StateMachine(definition, {'ProcessOrderFunction': task})
+        bound = call_bound(definition)
+
+        orders = local_stack.load_sample_orders(args.orders)
+        for order in orders:
+            process_order.table.put_item(Item=order)
+
+        per_order = []
+        statuses = Counter()
+        for order in orders:
+            counter.reset()
+            injector.reset()
+            payments_before = payments.payments
+            with contextlib.redirect_stdout(io.StringIO()):
+                status, _, _ = machine.run({'orderId': order['orderId']})
+            statuses[status] += 1
+            per_order.append({
+                'calls': counter.total('dynamodb'),
+                'payments': payments.payments - payments_before,
+                'charges': injector.charges,
+                'flips': injector.flips
+            })
+
+    calls = [o['calls'] for o in per_order]
+    over_bound = sum(1 for c in calls if c > bound)
+    double_charged = sum(1 for o in per_order if o['charges'] > 1)
+    flips = sum(o['flips'] for o in per_order)
+
+    print('=' * 60)
+    print(f'Órdenes procesadas: {len(per_order)}  ({dict(statuses)})')
+    print(f"Fallas inyectadas: {sum(injector.injected.values())}  ({dict(sorted(injector.injected.items()))})")
+    print(f'Reintentos resueltos sin repetir el paso: {dict(skipped)}')
+    print(f'Llamadas DynamoDB por orden: promedio {sum(calls) / len(calls):.2f}, '
+          f'máximo {max(calls)} (cota {bound})')
+    print(f"Simulaciones de pago por orden: máximo {max(o['payments'] for o in per_order)}")
+    print(f'Órdenes cobradas más de una vez: {double_charged}')
+    print(f'Órdenes pagadas que volvieron a PAYMENT_FAILED: {flips}')
+    print('=' * 60)
+
+    if over_bound or double_charged or flips:
+        print(f'✗ {over_bound} órdenes sobre la cota, {double_charged} cobros dobles, {flips} regresiones')
+        return 1
+    print('✓ Reintentos idempotentes con llamadas acotadas por orden')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de punta a punta: POST /orders → SQS → Step Functions → process-order
+
+Reproduce órdenes generadas (data/generate-orders.py, JSON o NDJSON) contra
+el handler del app-server a un ritmo fijo y procesa la cadena completa con
+stand-ins locales sobre moto:
+  - ejecuciones: --concurrency threads que toman de a un mensaje de
+    order-processing-queue y ejecutan el state machine Standard de
+    resources-stack.yaml (lo que haría el disparador SQS → StartExecution
+    con ese límite de ejecuciones en curso)
+  - notificaciones en modo batch: un thread que simula el event source
+    mapping de order-notifications-queue (tamaño de lote o ventana)
+
+Al terminar lee cada orden y calcula, con las fechas que escriben los
+handlers (orderDate, paymentDate, shipmentDate, notificationSentDate), los
+percentiles de cada etapa y de punta a punta, además del throughput.
+Cada llamada a AWS espera --aws-call-ms y cada invocación de Lambda
+--invoke-ms antes de ejecutarse (moto no tiene latencia de red); los
+reintentos del workflow esperan su IntervalSeconds * BackoffRate.
+Todo corre en un proceso: moto consume CPU por llamada y limita el
+throughput máximo (del orden de 15 órdenes/s); a ritmos mayores las
+colas crecen por el harness y no por el pipeline.
+
+Uso: python scripts/load-test-pipeline.py [data/shards/*.ndjson] [--orders 500] [--rate 10]
+Requiere: pip install boto3 moto pyyaml
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+
+import boto3
+from moto import mock_aws
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import local_stack  # noqa: E402
+
+# Campos del body de POST /orders (el resto lo asigna el app-server)
+REQUEST_FIELDS = ('customerId', 'customerName', 'customerEmail', 'items', 'totalAmount',
+                  'shippingAddress', 'paymentMethod')
+
+STAGES = [
+    ('cola → pago', 'orderDate', 'paymentDate'),
+    ('pago → envío', 'paymentDate', 'shipmentDate'),
+    ('envío → notificación', 'shipmentDate', 'notificationSentDate'),
+    ('punta a punta', 'orderDate', 'notificationSentDate')
+]
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano"""
+    ordered = sorted(values)
+    index = max(0, int(round(pct / 100 * len(ordered))) - 1)
+    return ordered[index]
+
+
+def add_latency(seconds, *clients):
+    """Esperar `seconds` antes de cada llamada a la API (latencia de red simulada)"""
+    for client in clients:
+        service = client.meta.service_model.service_name
+        client.meta.events.register(f'before-call.{service}.*', lambda **kwargs: time.sleep(seconds))
+
+
+def read_orders(paths):
+    """Órdenes de archivos JSON (arreglo) o NDJSON"""
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            content = f.read()
+        if content.lstrip().startswith('['):
+            yield from json.loads(content, parse_float=Decimal)
+        else:
+            yield from (json.loads(line, parse_float=Decimal) for line in content.splitlines() if line.strip())
+
+
+def parse_date(value):
+    return datetime.fromisoformat(value.rstrip('Z'))
+
+
+class LoadTest:
+    def __init__(self, args, app, process_order, resources):
+        self.args = args
+        self.app = app
+        self.process_order = process_order
+        self.resources = resources
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.posted = []
+        self.api_latencies = []
+        self.post_errors = 0
+        self.executions = {'SUCCEEDED': 0, 'FAILED': 0}
+        self.failures = Counter()
+        self.notifications = 0
+
+        invoke = local_stack.lambda_task(process_order.lambda_handler)
+
+        def task(payload):
+            time.sleep(args.invoke_ms / 1000)
+            return invoke(payload)
+
+        self.machine = local_stack.StateMachine(
+            local_stack.load_state_machine_definition(),
+            {'ProcessOrderFunction': task},
+            sleep=lambda seconds: time.sleep(seconds * args.retry_scale)
+        )
+
+    def produce(self, bodies):
+        """POST /orders a ritmo fijo (--rate órdenes por segundo)"""
+        start = time.perf_counter()
+        for i, body in enumerate(bodies):
+            delay = start + i / self.args.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            event = {'httpMethod': 'POST', 'path': '/orders', 'body': json.dumps(body, default=str)}
+            sent = time.perf_counter()
+            response = self.app.lambda_handler(event, None)
+            latency = time.perf_counter() - sent
+            with self.lock:
+                if response['statusCode'] == 201:
+                    self.posted.append(json.loads(response['body'])['orderId'])
+                    self.api_latencies.append(latency)
+                else:
+                    self.post_errors += 1
+
+    def start_executions(self):
+        """Stand-in del disparador SQS → Step Functions (una ejecución en curso por thread)"""
+        sqs = boto3.client('sqs', region_name=local_stack.REGION)
+        add_latency(self.args.aws_call_ms / 1000, sqs)
+        queue_url = self.resources['queueUrl']
+        while not self.stop.is_set():
+            messages = sqs.receive_message(QueueUrl=queue_url, MaxNumberOfMessages=1).get('Messages', [])
+            if not messages:
+                time.sleep(0.05)
+                continue
+            for message in messages:
+                status, output, _ = self.machine.run({'orderId': json.loads(message['Body'])['orderId']})
+                sqs.delete_message(QueueUrl=queue_url, ReceiptHandle=message['ReceiptHandle'])
+                with self.lock:
+                    self.executions[status] += 1
+                    if status == 'FAILED':
+                        self.failures[f"{output.get('Error')}: {output.get('Cause')}"] += 1
+
+    def flush_notifications(self):
+        """Stand-in del event source mapping de order-notifications-queue (modo batch)"""
+        queue_url = self.resources['notificationQueueUrl']
+        pending = []
+        window_start = None
+        while not self.stop.is_set():
+            records = local_stack.receive_records(queue_url, self.args.batch_size - len(pending))
+            if records and window_start is None:
+                window_start = time.perf_counter()
+            pending.extend(records)
+            window_closed = window_start is not None and time.perf_counter() - window_start >= self.args.flush_interval
+            if pending and (len(pending) >= self.args.batch_size or window_closed):
+                response = self.process_order.lambda_handler({'Records': pending}, None)
+                failed = {f['itemIdentifier'] for f in response['batchItemFailures']}
+                local_stack.delete_records(queue_url, [r for r in pending if r['messageId'] not in failed])
+                with self.lock:
+                    self.notifications += len(pending) - len(failed)
+                pending = []
+                window_start = None
+            elif not records:
+                time.sleep(0.05)
+
+    def finished(self, total):
+        with self.lock:
+            executed = sum(self.executions.values())
+            done = executed >= total
+            if self.args.notification_mode == 'batch':
+                done = done and self.notifications >= self.executions['SUCCEEDED']
+            return done
+
+    def run(self, bodies):
+        threads = [threading.Thread(target=self.start_executions, daemon=True) for _ in range(self.args.concurrency)]
+        if self.args.notification_mode == 'batch':
+            threads.append(threading.Thread(target=self.flush_notifications, daemon=True))
+        for thread in threads:
+            thread.start()
+
+        start = time.perf_counter()
+        self.produce(bodies)
+        ingest_seconds = time.perf_counter() - start
+        deadline = time.perf_counter() + self.args.timeout
+        while not self.finished(len(self.posted)) and time.perf_counter() < deadline:
+            time.sleep(0.1)
+        self.stop.set()
+        for thread in threads:
+            thread.join()
+        return ingest_seconds, time.perf_counter() - start
+
+
+def report(test, orders, ingest_seconds, total_seconds):
+    completed = [o for o in orders if o.get('notificationSentDate')]
+    print('=' * 78)
+    print(f"Órdenes enviadas: {len(test.posted)} en {ingest_seconds:.1f}s "
+          f"({len(test.posted) / ingest_seconds:.1f}/s), errores de API: {test.post_errors}")
+    print(f"Ejecuciones: {test.executions}  notificadas: {len(completed)}  "
+          f"tiempo total: {total_seconds:.1f}s")
+    for cause, count in test.failures.most_common():
+        print(f"  ✗ {count} × {cause}")
+    if completed:
+        first = min(parse_date(o['orderDate']) for o in completed)
+        last = max(parse_date(o['notificationSentDate']) for o in completed)
+        span = (last - first).total_seconds()
+        print(f"Throughput de punta a punta: {len(completed) / span if span else 0:.1f} órdenes/s")
+    print('-' * 78)
+    print(f"{'etapa (ms)':<22} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'máx':>9}")
+    rows = [('POST /orders', [s * 1000 for s in test.api_latencies])]
+    for name, start_field, end_field in STAGES:
+        rows.append((name, [
+            (parse_date(o[end_field]) - parse_date(o[start_field])).total_seconds() * 1000
+            for o in completed if o.get(start_field) and o.get(end_field)
+        ]))
+    for name, values in rows:
+        if values:
+            print(f"{name:<22} {len(values):>6} {percentile(values, 50):>9.1f} {percentile(values, 95):>9.1f} "
+                  f"{percentile(values, 99):>9.1f} {max(values):>9.1f}")
+    print('=' * 78)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga de punta a punta del pipeline de órdenes')
+    parser.add_argument('inputs', nargs='*', default=[local_stack.SAMPLE_ORDERS],
+                        help='Órdenes generadas (JSON o NDJSON); se repiten hasta --orders')
+    parser.add_argument('--orders', type=int, default=500, help='Órdenes a enviar')
+    parser.add_argument('--rate', type=float, default=10.0, help='Órdenes por segundo')
+    parser.add_argument('--concurrency', type=int, default=8, help='Ejecuciones de Step Functions en curso')
+    parser.add_argument('--notification-mode', choices=['direct', 'batch'], default='direct')
+    parser.add_argument('--batch-size', type=int, default=100, help='BatchSize de la cola de notificaciones')
+    parser.add_argument('--flush-interval', type=float, default=5.0, help='Ventana de la cola de notificaciones')
+    parser.add_argument('--aws-call-ms', type=float, default=5.0, help='Latencia por llamada a AWS')
+    parser.add_argument('--invoke-ms', type=float, default=20.0, help='Overhead por invocación de Lambda')
+    parser.add_argument('--retry-scale', type=float, default=1.0,
+                        help='Factor sobre la espera de los Retry del workflow (0 = sin espera)')
+    parser.add_argument('--timeout', type=float, default=300.0, help='Espera máxima tras enviar la última orden')
+    args = parser.parse_args()
+
+    bodies = [{k: order[k] for k in REQUEST_FIELDS if k in order}
+              for order in itertools.islice(itertools.cycle(list(read_orders(args.inputs))), args.orders)]
+
+    local_stack.configure_environment()
+    with mock_aws():
+        resources = local_stack.create_resources()
+        app = local_stack.load_lambda('app-server')
+        process_order = local_stack.load_lambda('process-order')
+        process_order.NOTIFICATION_MODE = args.notification_mode
+        add_latency(args.aws_call_ms / 1000, app.table.meta.client, app.sqs,
+                    process_order.table.meta.client, process_order.sns, process_order.sqs)
+
+        test = LoadTest(args, app, process_order, resources)
+        print(f"Enviando {len(bodies)} órdenes a {args.rate:g}/s "
+              f"({args.concurrency} ejecuciones en paralelo, notificaciones {args.notification_mode})...")
+        # Los logs de las Lambdas no se muestran durante la prueba
+        with contextlib.redirect_stdout(io.StringIO()):
+            ingest_seconds, total_seconds = test.run(bodies)
+            orders = [process_order.table.get_item(Key={'orderId': order_id}, ConsistentRead=True)['Item']
+                      for order_id in test.posted]
+
+    report(test, orders, ingest_seconds, total_seconds)
+    # Un pago que agota sus reintentos es un resultado válido; una orden sin terminar no
+    notified = sum(1 for o in orders if o.get('notificationSentDate'))
+    if sum(test.executions.values()) < len(test.posted) or notified < test.executions['SUCCEEDED']:
+        print(f"✗ Órdenes sin terminar tras {args.timeout:g}s")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,312 @@
+"""
+Entorno local para los harness de rendimiento (scripts/*.py)
+
+Levanta con moto los recursos de resources-stack.yaml (tabla Orders con
+CustomerIndex, colas SQS y topic SNS), carga las Lambdas desde lambdas/ y
+ejecuta la máquina de estados definida en el template con un intérprete
+mínimo (Task, Pass, Fail, Succeed; Parameters, ResultPath, Retry y Catch;
+del objeto de contexto solo $$.State.RetryCount).
+
+Requiere: pip install boto3 moto pyyaml
+"""
+import importlib.util
+import json
+import os
+import sys
+import time
+from collections import Counter
+from decimal import Decimal
+
+import boto3
+import yaml
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDAS_DIR = os.path.join(BASE_DIR, 'lambdas')
+RESOURCES_TEMPLATE = os.path.join(BASE_DIR, 'cloudformation', 'resources-stack.yaml')
+
+SAMPLE_ORDERS = os.path.join(BASE_DIR, 'data', 'orders-50.json')
+
+REGION = 'us-east-1'
+TABLE_NAME = 'Orders'
+QUEUE_NAME = 'order-processing-queue'
+NOTIFICATION_QUEUE_NAME = 'order-notifications-queue'
+TOPIC_NAME = 'order-notifications'
+
+
+def configure_environment():
+    """Credenciales ficticias para que boto3 nunca llegue a AWS real"""
+    os.environ['AWS_DEFAULT_REGION'] = REGION
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+
+def create_resources():
+    """
+    Crear tabla, colas y topic en moto (llamar dentro de mock_aws)
+    Exporta QUEUE_URL, NOTIFICATION_QUEUE_URL y SNS_TOPIC_ARN como lo hace el template
+    """
+    dynamodb = boto3.client('dynamodb', region_name=REGION)
+    dynamodb.create_table(
+        TableName=TABLE_NAME,
+        AttributeDefinitions=[
+            {'AttributeName': 'orderId', 'AttributeType': 'S'},
+            {'AttributeName': 'customerId', 'AttributeType': 'S'},
+            {'AttributeName': 'orderDate', 'AttributeType': 'S'}
+        ],
+        KeySchema=[{'AttributeName': 'orderId', 'KeyType': 'HASH'}],
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'CustomerIndex',
+            'KeySchema': [
+                {'AttributeName': 'customerId', 'KeyType': 'HASH'},
+                {'AttributeName': 'orderDate', 'KeyType': 'RANGE'}
+            ],
+            'Projection': {'ProjectionType': 'ALL'}
+        }],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    sqs = boto3.client('sqs', region_name=REGION)
+    queue_url = sqs.create_queue(QueueName=QUEUE_NAME)['QueueUrl']
+    notification_queue_url = sqs.create_queue(QueueName=NOTIFICATION_QUEUE_NAME)['QueueUrl']
+    topic_arn = boto3.client('sns', region_name=REGION).create_topic(Name=TOPIC_NAME)['TopicArn']
+
+    os.environ['QUEUE_URL'] = queue_url
+    os.environ['NOTIFICATION_QUEUE_URL'] = notification_queue_url
+    os.environ['SNS_TOPIC_ARN'] = topic_arn
+    return {'queueUrl': queue_url, 'notificationQueueUrl': notification_queue_url, 'topicArn': topic_arn}
+
+
+def load_sample_orders(count, path=SAMPLE_ORDERS, prefix=''):
+    """Tomar órdenes del dataset de muestra y reasignar IDs para tener `count`"""
+    with open(path, encoding='utf-8') as f:
+        samples = json.load(f, parse_float=Decimal)
+    orders = []
+    for i in range(count):
+        order = dict(samples[i % len(samples)])
+        order['orderId'] = f"{prefix}{order['orderId']}-{i:06d}"
+        order['status'] = 'PENDING'
+        orders.append(order)
+    return orders
+
+
+def load_lambda(name):
+    """Importar lambdas/<name>/index.py (los directorios llevan guion)"""
+    path = os.path.join(LAMBDAS_DIR, name, 'index.py')
+    module_name = name.replace('-', '_')
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def lambda_task(handler):
+    """
+    Adaptar un handler como Task: el payload y el resultado pasan por JSON,
+    igual que entre Step Functions y Lambda (p. ej. un Decimal no serializable falla aquí)
+    """
+    def invoke(payload):
+        return json.loads(json.dumps(handler(json.loads(json.dumps(payload)), None)))
+    return invoke
+
+
+def receive_records(queue_url, count):
+    """
+    Recibir hasta `count` mensajes de SQS con el formato de Records que
+    entrega el event source mapping a la Lambda
+    """
+    sqs = boto3.client('sqs', region_name=REGION)
+    records = []
+    while len(records) < count:
+        messages = sqs.receive_message(
+            QueueUrl=queue_url, MaxNumberOfMessages=min(10, count - len(records))
+        ).get('Messages', [])
+        if not messages:
+            break
+        records.extend({
+            'messageId': message['MessageId'],
+            'receiptHandle': message['ReceiptHandle'],
+            'body': message['Body'],
+            'eventSource': 'aws:sqs'
+        } for message in messages)
+    return records
+
+
+def delete_records(queue_url, records):
+    """Borrar los mensajes procesados (lo que hace el event source mapping al terminar)"""
+    sqs = boto3.client('sqs', region_name=REGION)
+    for i in range(0, len(records), 10):
+        sqs.delete_message_batch(QueueUrl=queue_url, Entries=[
+            {'Id': str(j), 'ReceiptHandle': record['receiptHandle']}
+            for j, record in enumerate(records[i:i + 10])
+        ])
+
+
+class CallCounter:
+    """
+    Cuenta las llamadas a la API de AWS hechas por uno o más clientes boto3
+    y acumula el tiempo pasado dentro de ellas (en moto es tiempo local, no de red)
+    """
+
+    def __init__(self, *clients):
+        self.calls = Counter()
+        self.seconds = 0.0
+        self._started = None
+        for client in clients:
+            service = client.meta.service_model.service_name
+            client.meta.events.register(f'before-call.{service}.*', self._count)
+            client.meta.events.register(f'after-call.{service}.*', self._stop)
+
+    def _count(self, model, **kwargs):
+        self.calls[f'{model.service_model.service_name}:{model.name}'] += 1
+        self._started = time.perf_counter()
+
+    def _stop(self, **kwargs):
+        if self._started is not None:
+            self.seconds += time.perf_counter() - self._started
+            self._started = None
+
+    def total(self, service=None):
+        return sum(n for name, n in self.calls.items() if service is None or name.startswith(f'{service}:'))
+
+    def reset(self):
+        self.calls.clear()
+        self.seconds = 0.0
+
+
+class _CfnLoader(yaml.SafeLoader):
+    """Loader de YAML que acepta las etiquetas intrínsecas de CloudFormation"""
+
+
+def _cfn_tag(loader, tag_suffix, node):
+    if isinstance(node, yaml.ScalarNode):
+        return loader.construct_scalar(node)
+    if isinstance(node, yaml.SequenceNode):
+        return loader.construct_sequence(node)
+    return loader.construct_mapping(node)
+
+
+_CfnLoader.add_multi_constructor('!', _cfn_tag)
+
+
+def load_state_machine_definition(resource_name='OrderProcessingStateMachine', template=RESOURCES_TEMPLATE):
+    """Leer la definición ASL del template reemplazando ${Recurso.Arn} por el nombre del recurso"""
+    with open(template, encoding='utf-8') as f:
+        resources = yaml.load(f, Loader=_CfnLoader)['Resources']
+    definition = resources[resource_name]['Properties']['DefinitionString']
+    for name in resources:
+        definition = definition.replace(f'${{{name}.Arn}}', name)
+    return json.loads(definition)
+
+
+def _get_path(data, path):
+    if path == '$':
+        return data
+    for part in path[2:].split('.'):
+        data = data[part]
+    return data
+
+
+def _set_path(data, path, value):
+    if path == '$':
+        return value
+    data = dict(data)
+    target = data
+    parts = path[2:].split('.')
+    for part in parts[:-1]:
+        target[part] = dict(target.get(part, {}))
+        target = target[part]
+    target[parts[-1]] = value
+    return data
+
+
+def _resolve_parameters(template, data, context=None):
+    resolved = {}
+    for key, value in template.items():
+        if key.endswith('.$'):
+            # $$. referencia el objeto de contexto en lugar de la entrada
+            resolved[key[:-2]] = _get_path(context, value[1:]) if value.startswith('$$.') else _get_path(data, value)
+        elif isinstance(value, dict):
+            resolved[key] = _resolve_parameters(value, data, context)
+        else:
+            resolved[key] = value
+    return resolved
+
+
+def _matches(error_equals, error):
+    # Los errores de una Lambda llegan a Step Functions como el nombre de la excepción
+    return 'States.ALL' in error_equals or 'States.TaskFailed' in error_equals or type(error).__name__ in error_equals
+
+
+class StateMachine:
+    """
+    Intérprete local de la definición ASL
+
+    tasks mapea el Resource de cada Task a una función (payload) -> resultado.
+    Por defecto los reintentos no esperan IntervalSeconds: el harness mide
+    trabajo, no backoff. Con sleep(segundos) se espera IntervalSeconds * BackoffRate^n.
+    """
+
+    def __init__(self, definition, tasks, sleep=None):
+        self.definition = definition
+        self.tasks = tasks
+        self.sleep = sleep
+        self.transitions = 0
+
+    def run(self, data):
+        """Ejecutar hasta un estado final; retorna (status, output, history)"""
+        history = []
+        state_name = self.definition['StartAt']
+        while True:
+            state = self.definition['States'][state_name]
+            self.transitions += 1
+            state_type = state['Type']
+            history.append((state_name, time.perf_counter()))
+
+            if state_type == 'Succeed':
+                return 'SUCCEEDED', data, history
+            if state_type == 'Fail':
+                return 'FAILED', {'Error': state.get('Error'), 'Cause': state.get('Cause')}, history
+
+            if state_type == 'Pass':
+                result = state.get('Result', data)
+            elif state_type == 'Task':
+                try:
+                    result = self._invoke_with_retry(state, data)
+                except Exception as error:
+                    catcher = next((c for c in state.get('Catch', []) if _matches(c['ErrorEquals'], error)), None)
+                    if catcher is None:
+                        return 'FAILED', {'Error': type(error).__name__, 'Cause': str(error)}, history
+                    error_output = {'Error': type(error).__name__, 'Cause': str(error)}
+                    data = _set_path(data, catcher.get('ResultPath', '$'), error_output)
+                    state_name = catcher['Next']
+                    continue
+            else:
+                raise ValueError(f'Unsupported state type: {state_type}')
+
+            if 'ResultPath' in state:
+                data = data if state['ResultPath'] is None else _set_path(data, state['ResultPath'], result)
+            else:
+                data = result
+
+            if state.get('End'):
+                return 'SUCCEEDED', data, history
+            state_name = state['Next']
+
+    def _invoke_with_retry(self, state, data):
+        attempts = Counter()
+        while True:
+            # Los Parameters se resuelven en cada intento: $$.State.RetryCount cambia
+            context = {'State': {'RetryCount': sum(attempts.values())}}
+            payload = _resolve_parameters(state['Parameters'], data, context) if 'Parameters' in state else data
+            try:
+                return self.tasks[state['Resource']](payload)
+            except Exception as error:
+                retrier = next((r for r in state.get('Retry', []) if _matches(r['ErrorEquals'], error)), None)
+                if retrier is None:
+                    raise
+                key = id(retrier)
+                attempts[key] += 1
+                if attempts[key] > retrier.get('MaxAttempts', 3):
+                    raise
+                if self.sleep:
+                    self.sleep(retrier.get('IntervalSeconds', 1) * retrier.get('BackoffRate', 2.0) ** (attempts[key] - 1))
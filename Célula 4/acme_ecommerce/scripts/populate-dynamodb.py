@@ -1,56 +1,264 @@
 #!/usr/bin/env python3
 """
-Script para poblar DynamoDB con datos de muestra
+Script para poblar DynamoDB con órdenes
+
+Lee las órdenes en streaming (arreglo JSON o NDJSON, uno o más archivos) y
+las escribe con varios workers en paralelo usando BatchWriteItem de a 25.
+Los UnprocessedItems y los errores de throttling se reintentan con backoff
+exponencial; --rate limita las filas por segundo de todos los workers.
+
+Uso:
+  python3 scripts/populate-dynamodb.py                      # data/orders-50.json
+  python3 scripts/populate-dynamodb.py data/shards/*.ndjson --workers 8 --rate 2000
 """
+import argparse
 import json
-import boto3
+import os
+import queue
+import random
+import sys
+import threading
+import time
 from decimal import Decimal
 
-def convert_floats_to_decimal(obj):
-    """Convertir floats a Decimal para DynamoDB"""
-    if isinstance(obj, list):
-        return [convert_floats_to_decimal(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {key: convert_floats_to_decimal(value) for key, value in obj.items()}
-    elif isinstance(obj, float):
-        return Decimal(str(obj))
-    else:
-        return obj
+import boto3
+from botocore.exceptions import ClientError
 
-def main():
-    # Inicializar cliente DynamoDB
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table('Orders')
-    
-    # Cargar datos
-    with open('data/orders-50.json', 'r', encoding='utf-8') as f:
-        orders = json.load(f)
-    
-    print(f"Cargando {len(orders)} órdenes a DynamoDB...")
-    
-    # Insertar cada orden
-    success_count = 0
-    error_count = 0
-    
-    for order in orders:
+DEFAULT_INPUT = 'data/orders-50.json'
+TABLE_NAME = 'Orders'
+
+# Límite de BatchWriteItem
+BATCH_SIZE = 25
+READ_CHUNK_SIZE = 1024 * 1024
+
+MAX_RETRIES = 8
+BACKOFF_BASE = 0.05
+BACKOFF_MAX = 5.0
+
+THROTTLING_ERRORS = ('ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded')
+
+
+def iter_json_array(f):
+    """Iterar los elementos de un arreglo JSON sin cargar el archivo completo"""
+    decoder = json.JSONDecoder(parse_float=Decimal)
+    buffer = f.read(READ_CHUNK_SIZE)
+    pos = len(buffer) - len(buffer.lstrip())
+    if buffer[pos:pos + 1] != '[':
+        raise ValueError('Expected a JSON array')
+    pos += 1
+    eof = False
+    while True:
+        # Saltar espacios y separadores hasta el próximo elemento
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
         try:
-            # Convertir floats a Decimal
-            order_converted = convert_floats_to_decimal(order)
-            
-            # Insertar en DynamoDB
-            table.put_item(Item=order_converted)
-            success_count += 1
-            print(f"✓ Insertada orden {order['orderId']}")
+            if pos >= len(buffer):
+                raise json.JSONDecodeError('Need more data', buffer, pos)
+            item, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise ValueError('Truncated JSON array')
+            chunk = f.read(READ_CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+
+
+def iter_ndjson(f):
+    """Iterar un archivo NDJSON (una orden por línea)"""
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line, parse_float=Decimal)
+
+
+def iter_orders(paths):
+    """Órdenes de todos los archivos; el formato se detecta por el primer carácter"""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            first = f.read(1)
+            while first.isspace():
+                first = f.read(1)
+            f.seek(0)
+            yield from (iter_json_array(f) if first == '[' else iter_ndjson(f))
+
+
+class RateLimiter:
+    """Token bucket compartido entre workers (filas por segundo)"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        # Capacidad mínima de un lote completo: con --rate < 25 el lote nunca cabría
+        self.capacity = max(rate, BATCH_SIZE)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, count):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= count:
+                    self.tokens -= count
+                    return
+                wait = (count - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Stats:
+    def __init__(self):
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+        self.duplicates = 0
+        self.lock = threading.Lock()
+
+    def add(self, written=0, failed=0, retries=0, duplicates=0):
+        with self.lock:
+            self.written += written
+            self.failed += failed
+            self.retries += retries
+            self.duplicates += duplicates
+
+
+def backoff(attempt):
+    """Backoff exponencial con jitter completo"""
+    time.sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)))
+
+
+def write_batch(client, table_name, items, limiter, stats):
+    """Escribir hasta 25 órdenes reintentando UnprocessedItems y throttling"""
+    requests = [{'PutRequest': {'Item': item}} for item in items]
+    limiter.acquire(len(requests))
+    attempt = 0
+    while requests:
+        try:
+            response = client.batch_write_item(RequestItems={table_name: requests})
+        except ClientError as e:
+            if e.response['Error']['Code'] not in THROTTLING_ERRORS or attempt >= MAX_RETRIES:
+                print(f"✗ Error escribiendo lote: {str(e)}")
+                stats.add(failed=len(requests))
+                return
+            stats.add(retries=1)
+            backoff(attempt)
+            attempt += 1
+            continue
         except Exception as e:
-            error_count += 1
-            print(f"✗ Error insertando orden {order['orderId']}: {str(e)}")
-    
+            # Errores de conexión/timeout de botocore no son ClientError
+            print(f"✗ Error escribiendo lote: {str(e)}")
+            stats.add(failed=len(requests))
+            return
+
+        unprocessed = response.get('UnprocessedItems', {}).get(table_name, [])
+        stats.add(written=len(requests) - len(unprocessed))
+        requests = unprocessed
+        if requests:
+            if attempt >= MAX_RETRIES:
+                print(f"✗ {len(requests)} órdenes sin procesar tras {MAX_RETRIES} reintentos")
+                stats.add(failed=len(requests))
+                return
+            stats.add(retries=1)
+            backoff(attempt)
+            attempt += 1
+
+
+def worker(batches, table_name, limiter, stats):
+    # Un resource por thread: los resources de boto3 no son thread-safe
+    client = boto3.session.Session().resource('dynamodb').meta.client
+    while True:
+        items = batches.get()
+        try:
+            if items is None:
+                return
+            write_batch(client, table_name, items, limiter, stats)
+        except Exception as e:
+            # Un error inesperado no debe matar el thread: el productor quedaría
+            # bloqueado para siempre en la cola acotada
+            print(f"✗ Error inesperado escribiendo lote: {str(e)}")
+            stats.add(failed=len(items))
+        finally:
+            batches.task_done()
+
+
+def load(paths, table_name, workers, rate, progress_interval):
+    limiter = RateLimiter(rate)
+    stats = Stats()
+    # Cola acotada: la lectura no se adelanta más de unos lotes a la escritura
+    batches = queue.Queue(maxsize=workers * 4)
+    threads = [
+        threading.Thread(target=worker, args=(batches, table_name, limiter, stats), daemon=True)
+        for _ in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    start = time.perf_counter()
+    last_report = start
+    read = 0
+    batch = {}
+    for order in iter_orders(paths):
+        # Conteo para la vista de lista de GET /orders (que no transfiere items)
+        order.setdefault('itemCount', len(order.get('items', [])))
+        # BatchWriteItem rechaza claves repetidas en un mismo lote: queda la última
+        if order['orderId'] in batch:
+            print(f"  Orden duplicada en el lote, se reemplaza: {order['orderId']}")
+            stats.add(duplicates=1)
+        batch[order['orderId']] = order
+        read += 1
+        if len(batch) == BATCH_SIZE:
+            batches.put(list(batch.values()))
+            batch = {}
+
+        now = time.perf_counter()
+        if now - last_report >= progress_interval:
+            print(f"  {stats.written} escritas, {read} leídas ({stats.written / (now - start):.0f} filas/s)")
+            last_report = now
+    if batch:
+        batches.put(list(batch.values()))
+
+    for _ in threads:
+        batches.put(None)
+    for thread in threads:
+        thread.join()
+    return read, stats, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cargar órdenes (JSON o NDJSON) en DynamoDB')
+    parser.add_argument('inputs', nargs='*', default=[DEFAULT_INPUT], help='Archivos JSON (arreglo) o NDJSON')
+    parser.add_argument('--table', default=TABLE_NAME, help='Tabla destino')
+    parser.add_argument('--workers', type=int, default=4, help='Threads escribiendo en paralelo')
+    parser.add_argument('--rate', type=float, default=0, help='Máximo de filas por segundo (0 = sin límite)')
+    parser.add_argument('--progress-interval', type=float, default=5.0, help='Segundos entre reportes de progreso')
+    args = parser.parse_args()
+
+    missing = [path for path in args.inputs if not os.path.exists(path)]
+    if missing:
+        parser.error(f"No existe: {', '.join(missing)}")
+
+    print(f"Cargando órdenes desde {len(args.inputs)} archivo(s) a {args.table} "
+          f"({args.workers} workers{f', máximo {args.rate:.0f} filas/s' if args.rate else ''})...")
+
+    read, stats, elapsed = load(args.inputs, args.table, args.workers, args.rate, args.progress_interval)
+
     print(f"\n{'='*50}")
     print(f"Resumen:")
-    print(f"  Exitosas: {success_count}")
-    print(f"  Errores: {error_count}")
-    print(f"  Total: {len(orders)}")
+    print(f"  Exitosas: {stats.written}")
+    print(f"  Errores: {stats.failed}")
+    print(f"  Duplicadas (reemplazadas): {stats.duplicates}")
+    print(f"  Total: {read}")
+    print(f"  Reintentos: {stats.retries}")
+    print(f"  Tiempo: {elapsed:.1f}s ({stats.written / elapsed if elapsed else 0:.0f} filas/s)")
     print(f"{'='*50}")
+    return 1 if stats.failed else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -152,6 +152,42 @@ curl -X GET "${API_URL}/orders/order-nonexistent" \
   -H "Content-Type: application/json" \
   -w "\nStatus: %{http_code}\n\n"
 
+sleep 1
+
+# Test 9: Ingesta masiva (la segunda orden es inválida: estado INVALID, respuesta 207)
+echo -e "${GREEN}[Test 9] Crear órdenes en lote${NC}"
+curl -X POST "${API_URL}/orders/batch" \
+  -H "Content-Type: application/json" \
+  -d '{
+    "orders": [
+      {
+        "customerId": "cust-test-003",
+        "customerName": "Lote Test",
+        "customerEmail": "lote.test@example.com",
+        "items": [{"productId": "prod-301", "name": "Cable USB-C", "quantity": 3, "price": 9.99}],
+        "totalAmount": 29.97
+      },
+      {
+        "customerName": "Lote Incompleto"
+      }
+    ]
+  }' \
+  -w "\nStatus: %{http_code}\n\n"
+
+sleep 1
+
+# Test 10: Poll condicional (con el ETag de la respuesta anterior debe retornar 304)
+if [ ! -z "$ORDER_ID" ]; then
+    echo -e "${GREEN}[Test 10] Poll condicional con If-None-Match: ${ORDER_ID}${NC}"
+    ETAG=$(curl -s -D - -o /dev/null "${API_URL}/orders/${ORDER_ID}" | grep -i '^etag:' | cut -d' ' -f2 | tr -d '\r')
+    echo -e "ETag: ${BLUE}${ETAG}${NC}"
+    curl -s -o /dev/null -X GET "${API_URL}/orders/${ORDER_ID}" \
+      -H "If-None-Match: ${ETAG}" \
+      -w "Status: %{http_code}\n\n"
+else
+    echo -e "${RED}[Test 10] Saltado - No se pudo obtener ORDER_ID${NC}"
+fi
+
 echo -e "${BLUE}========================================${NC}"
 echo -e "${BLUE}Pruebas completadas${NC}"
 echo -e "${BLUE}========================================${NC}"
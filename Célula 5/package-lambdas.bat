@@ -10,9 +10,14 @@ REM Package Image Uploader
 echo Packaging image_uploader...
 powershell Compress-Archive -Path src\lambda\image_uploader.py -DestinationPath dist\lambda\image_uploader.zip -Force
 
+REM Package Generate Upload URL and Confirm Upload (direct upload to S3)
+echo Packaging generate_upload_url and confirm_upload...
+powershell Compress-Archive -Path src\lambda\generate_upload_url.py -DestinationPath dist\lambda\generate_upload_url.zip -Force
+powershell Compress-Archive -Path src\lambda\confirm_upload.py -DestinationPath dist\lambda\confirm_upload.zip -Force
+
 REM Package Profanity Filter
 echo Packaging profanity_filter...
-powershell Compress-Archive -Path src\lambda\profanity_filter.py -DestinationPath dist\lambda\profanity_filter.zip -Force
+powershell Compress-Archive -Path src\lambda\profanity_filter.py,src\lambda\profanity_words.txt,src\lambda\blocked_image_hashes.txt -DestinationPath dist\lambda\profanity_filter.zip -Force
 
 REM Package Image Retrieval
 echo Packaging image_retrieval...
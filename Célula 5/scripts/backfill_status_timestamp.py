@@ -0,0 +1,59 @@
+"""
+Completa status_timestamp (status#upload_timestamp) en los screenshots
+guardados antes de UserStatusIndex. Sin este atributo un item no aparece en
+las consultas por status de image_retrieval.
+
+Idempotente: solo escribe items sin status_timestamp.
+
+Uso: python scripts/backfill_status_timestamp.py --table screenshot-system-metadata [--dry-run]
+"""
+import argparse
+import boto3
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+
+def backfill(table_name, dry_run=False):
+    table = boto3.resource('dynamodb').Table(table_name)
+    scan = {
+        'FilterExpression': Attr('status_timestamp').not_exists() & Attr('upload_timestamp').exists(),
+        'ProjectionExpression': 'screenshot_id, #status, upload_timestamp',
+        'ExpressionAttributeNames': {'#status': 'status'}
+    }
+
+    updated = 0
+    while True:
+        response = table.scan(**scan)
+        for item in response.get('Items', []):
+            status_timestamp = f"{item['status']}#{item['upload_timestamp']}"
+            if dry_run:
+                print(f"{item['screenshot_id']}: {status_timestamp}")
+                updated += 1
+                continue
+            try:
+                # El status pudo cambiar desde el scan: la Lambda ya escribió la clave
+                table.update_item(
+                    Key={'screenshot_id': item['screenshot_id']},
+                    UpdateExpression='SET status_timestamp = :status_timestamp',
+                    ConditionExpression='attribute_not_exists(status_timestamp) AND #status = :status',
+                    ExpressionAttributeNames={'#status': 'status'},
+                    ExpressionAttributeValues={':status_timestamp': status_timestamp, ':status': item['status']}
+                )
+                updated += 1
+            except ClientError as error:
+                if error.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    print(f"{'Pendientes' if dry_run else 'Actualizados'}: {updated}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Backfill de status_timestamp para UserStatusIndex")
+    parser.add_argument('--table', default='screenshot-system-metadata', help="Tabla de metadata")
+    parser.add_argument('--dry-run', action='store_true', help="Listar sin escribir")
+    args = parser.parse_args()
+
+    backfill(args.table, args.dry_run)
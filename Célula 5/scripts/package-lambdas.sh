@@ -14,10 +14,17 @@ cd src/lambda
 zip -r ../../dist/lambda/image_uploader.zip image_uploader.py
 cd ../..
 
+# Empaquetar Generate Upload URL y Confirm Upload (subida directa a S3)
+echo "Empaquetando generate_upload_url y confirm_upload..."
+cd src/lambda
+zip -r ../../dist/lambda/generate_upload_url.zip generate_upload_url.py
+zip -r ../../dist/lambda/confirm_upload.zip confirm_upload.py
+cd ../..
+
 # Empaquetar Profanity Filter
 echo "Empaquetando profanity_filter..."
 cd src/lambda
-zip -r ../../dist/lambda/profanity_filter.zip profanity_filter.py
+zip -r ../../dist/lambda/profanity_filter.zip profanity_filter.py profanity_words.txt blocked_image_hashes.txt
 cd ../..
 
 # Empaquetar Image Retrieval
@@ -4,78 +4,124 @@ import uuid
 import json
 import io
 from datetime import datetime
+from urllib.parse import unquote_plus
 from PIL import Image  # Esto funcionará gracias a tu Layer
 
 # Clientes de AWS
 s3 = boto3.client('s3')
 dynamodb = boto3.resource('dynamodb')
 
+# Lados máximos de los thumbnails (px), p. ej. "128,256,512"
+THUMBNAIL_SIZES = sorted({int(size) for size in os.environ.get('THUMBNAIL_SIZES', '128,256,512').split(',')},
+                         reverse=True)
+WEBP_QUALITY = int(os.environ.get('WEBP_QUALITY', '80'))
+
 def handler(event, context):
     print("Iniciando procesamiento de evento S3...")
     
-    # 1. Obtener información del evento (qué archivo se subió)
-    try:
-        record = event['Records'][0]
-        src_bucket = record['s3']['bucket']['name']
-        src_key = record['s3']['object']['key'] # Ejemplo: PLAYER1/foto.png
-        
-        # Evitar bucles infinitos (si por error se sube al mismo bucket)
-        if "thumbnails/" in src_key:
-            return {'status': 'skipped', 'reason': 'Es un thumbnail'}
-
-        print(f"Procesando archivo: {src_key} del bucket: {src_bucket}")
-
-        # 2. Descargar la imagen a memoria (sin guardarla en disco)
-        response = s3.get_object(Bucket=src_bucket, Key=src_key)
-        image_content = response['Body'].read()
+    # Un evento de S3 puede traer varios archivos: procesar todos
+    failed = []
+    for record in event['Records']:
+        try:
+            process_record(record)
+        except Exception as e:
+            print(f"Error procesando imagen: {str(e)}")
+            failed.append(record['s3']['object']['key'])
+    
+    # Reintento del evento completo: el item y los thumbnails se sobrescriben, no se duplican
+    if failed:
+        raise RuntimeError(f"{len(failed)} de {len(event['Records'])} imágenes fallaron: {failed}")
+    
+    return {
+        'statusCode': 200,
+        'body': json.dumps('Procesamiento exitoso')
+    }
 
-        # 3. Procesamiento con Pillow
-        with Image.open(io.BytesIO(image_content)) as img:
-            # Generar Thumbnail (128x128 max)
-            img.thumbnail((128, 128))
-            
-            # Guardar en buffer de memoria
-            buffer = io.BytesIO()
-            img_format = img.format if img.format else 'PNG'
-            img.save(buffer, format=img_format)
-            buffer.seek(0)
-            
-            # 4. Subir al bucket de PROCESADOS
-            dest_bucket = os.environ['PROCESSED_BUCKET']
-            dest_key = f"thumbnails/{src_key}"
-            
-            s3.put_object(
-                Bucket=dest_bucket,
-                Key=dest_key,
-                Body=buffer,
-                ContentType=f'image/{img_format.lower()}'
-            )
-            print(f"Thumbnail subido a: {dest_bucket}/{dest_key}")
+def process_record(record):
+    # 1. Obtener información del evento (qué archivo se subió)
+    src_bucket = record['s3']['bucket']['name']
+    src_key = unquote_plus(record['s3']['object']['key'])  # Ejemplo: PLAYER1/foto.png
+    
+    # Evitar bucles infinitos (si por error se sube al mismo bucket)
+    if "thumbnails/" in src_key:
+        print(f"Omitido {src_key}: es un thumbnail")
+        return
+    
+    print(f"Procesando archivo: {src_key} del bucket: {src_bucket}")
+    
+    # 2. Descargar la imagen a memoria (sin guardarla en disco)
+    response = s3.get_object(Bucket=src_bucket, Key=src_key)
+    image_content = response['Body'].read()
+    
+    # 3. Procesamiento con Pillow: una sola decodificación para todos los tamaños
+    with Image.open(io.BytesIO(image_content)) as img:
+        width, height = img.size
+        thumbnails = create_thumbnails(img)
+    
+    # 4. Subir al bucket de PROCESADOS
+    dest_bucket = os.environ['PROCESSED_BUCKET']
+    sizes = {}
+    for size, data, (thumb_width, thumb_height) in thumbnails:
+        # Clave completa (con extensión): foto.png y foto.jpg no comparten thumbnails
+        dest_key = f"thumbnails/{src_key}/{size}.webp"
+        s3.put_object(
+            Bucket=dest_bucket,
+            Key=dest_key,
+            Body=data,
+            ContentType='image/webp'
+        )
+        sizes[str(size)] = {'key': dest_key, 'width': thumb_width, 'height': thumb_height, 'bytes': len(data)}
+        print(f"Thumbnail {size}px ({len(data)} bytes) subido a: {dest_bucket}/{dest_key}")
+    
+    # 5. Guardar Metadatos en DynamoDB
+    table_name = os.environ['METADATA_TABLE']
+    table = dynamodb.Table(table_name)
+    
+    # Intentar adivinar el ID del jugador desde la carpeta (PLAYER1/foto.png)
+    player_id = src_key.split('/')[0] if '/' in src_key else 'unknown'
+    smallest = sizes[str(THUMBNAIL_SIZES[-1])]
+    
+    item = {
+        # Mismo ID para el mismo archivo: un reintento sobrescribe el item
+        'screenshotId': str(uuid.uuid5(uuid.NAMESPACE_URL, f"s3://{src_bucket}/{src_key}")),
+        'playerId': player_id,
+        'timestamp': datetime.utcnow().isoformat(),
+        'status': 'PROCESSED',
+        'originalPath': f"s3://{src_bucket}/{src_key}",
+        'processedPath': f"s3://{dest_bucket}/{smallest['key']}",
+        'width': width,
+        'height': height,
+        'bytes': len(image_content),
+        # La galería elige el thumbnail según el tamaño en pantalla
+        'thumbnailBucket': dest_bucket,
+        'thumbnails': sizes
+    }
+    
+    table.put_item(Item=item)
+    print("Metadatos guardados en DynamoDB")
 
-        # 5. Guardar Metadatos en DynamoDB
-        table_name = os.environ['METADATA_TABLE']
-        table = dynamodb.Table(table_name)
-        
-        # Intentar adivinar el ID del jugador desde la carpeta (PLAYER1/foto.png)
-        player_id = src_key.split('/')[0] if '/' in src_key else 'unknown'
-        
-        item = {
-            'screenshotId': str(uuid.uuid4()),
-            'playerId': player_id,
-            'timestamp': datetime.utcnow().isoformat(),
-            'status': 'PROCESSED',
-            'originalPath': f"s3://{src_bucket}/{src_key}",
-            'processedPath': f"s3://{dest_bucket}/{dest_key}"
-        }
+def create_thumbnails(img):
+    """
+    Thumbnails WebP de THUMBNAIL_SIZES a partir de una sola decodificación
+    draft() decodifica los JPEG directamente a 1/2, 1/4 o 1/8 de escala cuando
+    alcanza para el tamaño más grande; cada tamaño se reduce desde el anterior
+    con reduce() (promedio por bloques) antes del filtro final
+    Retorna: lista de (lado máximo, bytes WebP, (ancho, alto)), de mayor a menor
+    """
+    largest = THUMBNAIL_SIZES[0]
+    img.draft('RGB', (largest, largest))
+    
+    # WebP admite RGB y RGBA; se conserva la transparencia
+    has_alpha = 'A' in img.getbands() or 'transparency' in img.info
+    current = img.convert('RGBA' if has_alpha else 'RGB')
+    
+    thumbnails = []
+    for size in THUMBNAIL_SIZES:
+        # En su lugar: el siguiente tamaño parte de este, no de la imagen completa
+        current.thumbnail((size, size), Image.LANCZOS, reducing_gap=2.0)
         
-        table.put_item(Item=item)
-        print("Metadatos guardados en DynamoDB")
-
-        return {
-            'statusCode': 200,
-            'body': json.dumps('Procesamiento exitoso')
-        }
-
-    except Exception as e:
-        print(f"Error procesando imagen: {str(e)}")
-        raise e
\ No newline at end of file
+        buffer = io.BytesIO()
+        current.save(buffer, format='WEBP', quality=WEBP_QUALITY, method=4)
+        thumbnails.append((size, buffer.getvalue(), current.size))
+    
+    return thumbnails
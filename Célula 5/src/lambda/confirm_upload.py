@@ -1,12 +1,16 @@
 """
 Lambda Function: Confirm Upload
 Confirma que la imagen fue subida y dispara el proceso de filtrado
+Se ejecuta con el evento s3:ObjectCreated del bucket raw (prefijo raw/),
+sin una segunda llamada del cliente a la API
 """
 import json
 import boto3
 import os
+from botocore.exceptions import ClientError
+from decimal import Decimal
+from urllib.parse import unquote_plus
 
-s3_client = boto3.client('s3')
 dynamodb = boto3.resource('dynamodb')
 sns_client = boto3.client('sns')
 
@@ -15,79 +19,87 @@ METADATA_TABLE = os.environ['METADATA_TABLE']
 SNS_TOPIC_ARN = os.environ['SNS_TOPIC_ARN']
 
 def lambda_handler(event, context):
-    try:
-        # Parse request body
-        body = json.loads(event['body'])
-        user_id = event['requestContext']['authorizer']['claims']['sub']
-        
-        # Validate required fields
-        if 'screenshot_id' not in body:
-            return response(400, {'error': 'Missing screenshot_id'})
-        
-        screenshot_id = body['screenshot_id']
-        
-        # Get metadata from DynamoDB
-        table = dynamodb.Table(METADATA_TABLE)
-        item_response = table.get_item(Key={'screenshot_id': screenshot_id})
-        
-        if 'Item' not in item_response:
-            return response(404, {'error': 'Screenshot not found'})
-        
-        item = item_response['Item']
-        
-        # Verify user owns this screenshot
-        if item['user_id'] != user_id:
-            return response(403, {'error': 'Unauthorized'})
+    confirmed = 0
+    for record in event['Records']:
+        bucket = record['s3']['bucket']['name']
+        s3_key = unquote_plus(record['s3']['object']['key'])
+        file_size = record['s3']['object'].get('size', 0)
+        version_id = record['s3']['object'].get('versionId')
         
-        # Verify file exists in S3
-        s3_key = item['raw_s3_key']
-        try:
-            s3_response = s3_client.head_object(Bucket=RAW_BUCKET, Key=s3_key)
-            file_size = s3_response['ContentLength']
-        except:
-            return response(400, {'error': 'File not uploaded to S3'})
+        # raw/{user_id}/{screenshot_id}.{extension}
+        parts = s3_key.split('/')
+        if bucket != RAW_BUCKET or len(parts) != 3 or parts[0] != 'raw':
+            print(f"Ignoring unexpected key: {s3_key}")
+            continue
+        user_id = parts[1]
+        screenshot_id = parts[2].rsplit('.', 1)[0]
         
-        # Update metadata
-        table.update_item(
+        if confirm_upload(screenshot_id, user_id, bucket, s3_key, file_size, version_id):
+            confirmed += 1
+    
+    return {'statusCode': 200, 'body': f'{confirmed} uploads confirmed'}
+
+def confirm_upload(screenshot_id, user_id, bucket, s3_key, file_size, version_id=None):
+    """
+    PENDING_UPLOAD -> PROCESSING y notificación al profanity filter
+    La condición hace idempotente la entrega repetida del evento de S3; la
+    versión registrada es la que se modera (un segundo PUT con la misma URL
+    crea otra versión que no se confirma)
+    Si publish falla, el reintento del evento encuentra la misma versión en
+    PROCESSING y vuelve a publicar (el profanity filter es idempotente)
+    Retorna: True si la subida se confirmó en esta invocación
+    """
+    table = dynamodb.Table(METADATA_TABLE)
+    
+    # upload_timestamp arma la clave de UserStatusIndex (status#upload_timestamp)
+    item = table.get_item(
+        Key={'screenshot_id': screenshot_id},
+        ProjectionExpression='upload_timestamp'
+    ).get('Item')
+    if not item:
+        print(f"Screenshot {screenshot_id} not found (unknown key), skipping")
+        return False
+    
+    try:
+        previous = table.update_item(
             Key={'screenshot_id': screenshot_id},
-            UpdateExpression='SET #status = :status, file_size = :size',
+            UpdateExpression='SET #status = :status, status_timestamp = :status_timestamp, '
+                             'file_size = :size, raw_version_id = :version',
+            ConditionExpression='(#status = :pending OR (#status = :processing AND raw_version_id = :version)) '
+                                'AND user_id = :user_id AND raw_s3_key = :key',
             ExpressionAttributeNames={'#status': 'status'},
             ExpressionAttributeValues={
                 ':status': 'PROCESSING',
-                ':size': file_size
-            }
-        )
-        
-        # Send SNS notification for profanity filtering
-        sns_client.publish(
-            TopicArn=SNS_TOPIC_ARN,
-            Message=json.dumps({
-                'screenshot_id': screenshot_id,
-                'user_id': user_id,
-                's3_key': s3_key,
-                'bucket': RAW_BUCKET
-            }),
-            Subject='New Screenshot for Profanity Filter'
-        )
-        
-        return response(200, {
-            'message': 'Upload confirmed, processing started',
+                ':status_timestamp': f"PROCESSING#{item['upload_timestamp']}",
+                ':size': Decimal(file_size),
+                ':version': version_id,
+                ':pending': 'PENDING_UPLOAD',
+                ':processing': 'PROCESSING',
+                ':user_id': user_id,
+                ':key': s3_key
+            },
+            ReturnValues='UPDATED_OLD'
+        )['Attributes']
+    except ClientError as error:
+        if error.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+        print(f"Screenshot {screenshot_id} not pending upload (already moderated, other version or unknown key), skipping")
+        return False
+    
+    if previous['status'] == 'PROCESSING':
+        print(f"Screenshot {screenshot_id} already confirmed, publishing again (event retry)")
+    
+    # Send SNS notification for profanity filtering
+    sns_client.publish(
+        TopicArn=SNS_TOPIC_ARN,
+        Message=json.dumps({
             'screenshot_id': screenshot_id,
-            'status': 'PROCESSING'
-        })
-        
-    except Exception as e:
-        print(f"Error: {str(e)}")
-        return response(500, {'error': 'Internal server error', 'details': str(e)})
-
-def response(status_code, body):
-    return {
-        'statusCode': status_code,
-        'headers': {
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-            'Access-Control-Allow-Methods': 'POST,OPTIONS'
-        },
-        'body': json.dumps(body)
-    }
+            'user_id': user_id,
+            's3_key': s3_key,
+            'bucket': bucket
+        }),
+        Subject='New Screenshot for Profanity Filter'
+    )
+    
+    print(f"Upload confirmed: {screenshot_id} ({file_size} bytes)")
+    return True
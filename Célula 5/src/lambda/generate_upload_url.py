@@ -1,21 +1,40 @@
 """
 Lambda Function: Generate Upload URL
 Genera URLs pre-firmadas para subir imágenes directamente a S3
+Flujo principal de carga: la imagen no pasa por API Gateway ni por la Lambda;
+confirm_upload se dispara con el evento de S3 al terminar la subida
 """
 import json
+import math
 import boto3
 import uuid
 import os
 from datetime import datetime
+from botocore.config import Config
 
-s3_client = boto3.client('s3')
+# SigV4: en us-east-1 el default firma con SigV2, que no incluye Content-Length
+# y deja el límite de tamaño sin aplicar
+s3_client = boto3.client('s3', config=Config(signature_version='s3v4'))
 dynamodb = boto3.resource('dynamodb')
 
 RAW_BUCKET = os.environ['RAW_BUCKET']
 METADATA_TABLE = os.environ['METADATA_TABLE']
 
-ALLOWED_EXTENSIONS = ['jpg', 'jpeg', 'png', 'gif', 'webp']
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+CONTENT_TYPES = {
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'webp': 'image/webp'
+}
+ALLOWED_EXTENSIONS = list(CONTENT_TYPES)
+MAX_FILE_SIZE = 15 * 1024 * 1024  # 15MB, máximo de Rekognition para imágenes en S3
+MIN_FILE_SIZE = 1024  # 1KB
+
+# Sobre este tamaño la subida es multipart (partes en paralelo y reintentos por parte)
+MULTIPART_THRESHOLD = int(os.environ.get('MULTIPART_THRESHOLD', str(8 * 1024 * 1024)))
+PART_SIZE = 5 * 1024 * 1024  # Mínimo de S3 para todas las partes menos la última
+URL_EXPIRATION = 300  # URLs válidas por 5 minutos
 
 def lambda_handler(event, context):
     try:
@@ -24,41 +43,37 @@ def lambda_handler(event, context):
         user_id = event['requestContext']['authorizer']['claims']['sub']
         
         # Validate required fields
-        if 'filename' not in body:
-            return response(400, {'error': 'Missing filename'})
+        if 'filename' not in body or 'file_size' not in body:
+            return response(400, {'error': 'Missing required fields: filename and file_size'})
         
         filename = body['filename']
         game_title = body.get('game_title', 'Unknown')
         description = body.get('description', '')
-        content_type = body.get('content_type', 'image/png')
         
         # Validate file extension
         extension = filename.split('.')[-1].lower()
         if extension not in ALLOWED_EXTENSIONS:
             return response(400, {'error': f'Invalid file type. Allowed: {ALLOWED_EXTENSIONS}'})
         
+        # El tipo se deriva de la extensión: el cliente no puede elegir otro
+        content_type = CONTENT_TYPES[extension]
+        
+        # Validate file size (la URL firmada exige exactamente este tamaño)
+        try:
+            file_size = int(body['file_size'])
+        except (TypeError, ValueError):
+            return response(400, {'error': 'Invalid file_size'})
+        if file_size < MIN_FILE_SIZE:
+            return response(400, {'error': f'File too small. Min size: {MIN_FILE_SIZE} bytes'})
+        if file_size > MAX_FILE_SIZE:
+            return response(400, {'error': f'File too large. Max size: {MAX_FILE_SIZE / (1024*1024):.1f}MB'})
+        
         # Generate unique ID
         screenshot_id = str(uuid.uuid4())
         timestamp = datetime.utcnow().isoformat()
         s3_key = f"raw/{user_id}/{screenshot_id}.{extension}"
         
-        # Generate pre-signed URL for upload
-        presigned_url = s3_client.generate_presigned_url(
-            'put_object',
-            Params={
-                'Bucket': RAW_BUCKET,
-                'Key': s3_key,
-                'ContentType': content_type,
-                'Metadata': {
-                    'user_id': user_id,
-                    'screenshot_id': screenshot_id,
-                    'upload_timestamp': timestamp
-                }
-            },
-            ExpiresIn=300  # URL válida por 5 minutos
-        )
-        
-        # Store initial metadata in DynamoDB
+        # Store initial metadata in DynamoDB (antes de la subida: el evento de S3 la busca)
         table = dynamodb.Table(METADATA_TABLE)
         table.put_item(
             Item={
@@ -69,22 +84,98 @@ def lambda_handler(event, context):
                 'description': description,
                 'upload_timestamp': timestamp,
                 'status': 'PENDING_UPLOAD',
+                # Clave de UserStatusIndex: consultas por usuario y status sin filtrar
+                'status_timestamp': f'PENDING_UPLOAD#{timestamp}',
                 'raw_s3_key': s3_key,
+                'file_size': file_size,
                 'extension': extension
             }
         )
         
+        if file_size > MULTIPART_THRESHOLD:
+            upload = multipart_upload(s3_key, content_type, file_size)
+        else:
+            upload = single_upload(s3_key, content_type, file_size)
+        
         return response(200, {
             'screenshot_id': screenshot_id,
-            'upload_url': presigned_url,
             's3_key': s3_key,
-            'expires_in': 300
+            'expires_in': URL_EXPIRATION,
+            **upload
         })
-        
+    
     except Exception as e:
         print(f"Error: {str(e)}")
         return response(500, {'error': 'Internal server error', 'details': str(e)})
 
+def single_upload(s3_key, content_type, file_size):
+    """
+    Un PUT pre-firmado: Content-Type y Content-Length van en la firma,
+    S3 rechaza (403) otro tipo u otro tamaño
+    """
+    presigned_url = s3_client.generate_presigned_url(
+        'put_object',
+        Params={
+            'Bucket': RAW_BUCKET,
+            'Key': s3_key,
+            'ContentType': content_type,
+            'ContentLength': file_size
+        },
+        ExpiresIn=URL_EXPIRATION
+    )
+    
+    return {
+        'upload_type': 'single',
+        'upload_url': presigned_url,
+        'headers': {'Content-Type': content_type}
+    }
+
+def multipart_upload(s3_key, content_type, file_size):
+    """
+    Subida multipart: una URL por parte con su Content-Length firmado y una
+    URL para completar. El Content-Type queda fijado al crear la subida
+    """
+    upload_id = s3_client.create_multipart_upload(
+        Bucket=RAW_BUCKET,
+        Key=s3_key,
+        ContentType=content_type
+    )['UploadId']
+    
+    parts = []
+    part_count = math.ceil(file_size / PART_SIZE)
+    for part_number in range(1, part_count + 1):
+        part_size = min(PART_SIZE, file_size - (part_number - 1) * PART_SIZE)
+        parts.append({
+            'part_number': part_number,
+            'size': part_size,
+            'upload_url': s3_client.generate_presigned_url(
+                'upload_part',
+                Params={
+                    'Bucket': RAW_BUCKET,
+                    'Key': s3_key,
+                    'UploadId': upload_id,
+                    'PartNumber': part_number,
+                    'ContentLength': part_size
+                },
+                ExpiresIn=URL_EXPIRATION
+            )
+        })
+    
+    complete_url = s3_client.generate_presigned_url(
+        'complete_multipart_upload',
+        Params={'Bucket': RAW_BUCKET, 'Key': s3_key, 'UploadId': upload_id},
+        ExpiresIn=URL_EXPIRATION
+    )
+    
+    return {
+        'upload_type': 'multipart',
+        'upload_id': upload_id,
+        'part_size': PART_SIZE,
+        'parts': parts,
+        # POST con <CompleteMultipartUpload> y el ETag de cada parte
+        'complete_url': complete_url
+    }
+
 def response(status_code, body):
     return {
         'statusCode': status_code,
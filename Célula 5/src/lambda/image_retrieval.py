@@ -4,23 +4,52 @@ Recupera capturas de pantalla del usuario con URLs firmadas
 Versión mejorada con GSI para queries eficientes y soporte CloudFront
 """
 import json
+import base64
 import boto3
 import os
-from datetime import datetime, timedelta
+import time
+from botocore.signers import CloudFrontSigner
+from datetime import datetime, timedelta, timezone
 from boto3.dynamodb.conditions import Key
+from urllib.parse import quote
+
+try:
+    # Layer de cryptography (ver DEPLOYMENT.md), para firmar URLs de CloudFront
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+except ImportError:
+    serialization = None
 
 dynamodb = boto3.resource('dynamodb')
 s3_client = boto3.client('s3')
+secrets_client = boto3.client('secretsmanager')
 
 METADATA_TABLE = os.environ['METADATA_TABLE']
 PROCESSED_BUCKET = os.environ['PROCESSED_BUCKET']
 CLOUDFRONT_DOMAIN = os.environ.get('CLOUDFRONT_DOMAIN', '')
+# Llave pública del key group de la distribución y su llave privada (PEM) en Secrets Manager
+CLOUDFRONT_KEY_PAIR_ID = os.environ.get('CLOUDFRONT_KEY_PAIR_ID', '')
+CLOUDFRONT_PRIVATE_KEY_SECRET = os.environ.get('CLOUDFRONT_PRIVATE_KEY_SECRET', '')
 
 # Configuración
 DEFAULT_LIMIT = 50
 MAX_LIMIT = 100
 URL_EXPIRATION = 3600  # 1 hora
 
+# Las URLs firmadas en una misma ventana vencen juntas y se reutilizan entre
+# invocaciones del contenedor; siempre quedan al menos URL_EXPIRATION de validez
+URL_CACHE_WINDOW = int(os.environ.get('URL_CACHE_WINDOW', '900'))
+URL_CACHE_MAX_ENTRIES = 10000
+url_cache = {}
+cloudfront_signer = None
+
+if CLOUDFRONT_KEY_PAIR_ID and serialization is None:
+    print("cryptography not available, serving S3 presigned URLs instead of CloudFront")
+
+# GSIs de la tabla de metadata (ver infrastructure-stack.yaml)
+USER_INDEX = 'UserIdIndex'  # user_id + upload_timestamp
+USER_STATUS_INDEX = 'UserStatusIndex'  # user_id + status_timestamp (status#upload_timestamp)
+
 def lambda_handler(event, context):
     try:
         # Get user ID from authorizer
@@ -30,20 +59,24 @@ def lambda_handler(event, context):
         params = event.get('queryStringParameters', {}) or {}
         status_filter = params.get('status', 'APPROVED')
         limit = min(int(params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT)
+        if limit < 1:
+            raise ValueError('limit must be a positive integer')
         
         # Determine query method based on path
         path = event.get('path', '')
+        next_cursor = None
         
         if '/all' in path:
             # Admin endpoint - get all screenshots (requires admin role check)
             screenshots = get_all_screenshots(status_filter, limit)
         else:
-            # User endpoint - get user's screenshots
-            screenshots = get_user_screenshots(user_id, status_filter, limit)
+            # User endpoint - get user's screenshots (una página; cursor para la siguiente)
+            screenshots, next_cursor = get_user_screenshots(user_id, status_filter, limit, params.get('cursor'))
         
         return response_success(200, {
             'count': len(screenshots),
-            'screenshots': screenshots
+            'screenshots': screenshots,
+            'next_cursor': next_cursor
         })
         
     except ValueError as e:
@@ -55,45 +88,56 @@ def lambda_handler(event, context):
         traceback.print_exc()
         return response_success(500, {'error': 'Internal server error'})
 
-def get_user_screenshots(user_id, status_filter, limit):
+def get_user_screenshots(user_id, status_filter, limit, cursor=None):
     """
-    Obtiene screenshots de un usuario específico usando GSI
+    Obtiene una página de screenshots de un usuario, más recientes primero
+    Con status consulta UserStatusIndex: el status es parte de la clave, así cada
+    página trae hasta `limit` screenshots de ese status sin importar cuántos
+    tenga el usuario en otros estados
+    Retorna: (screenshots, cursor de la página siguiente o None)
     """
     table = dynamodb.Table(METADATA_TABLE)
     
-    try:
-        # Query usando GSI user-index (más eficiente que scan)
-        response = table.query(
-            IndexName='user-index',
-            KeyConditionExpression=Key('user_id').eq(user_id),
-            ScanIndexForward=False,  # Orden descendente por timestamp
-            Limit=limit
+    query = {'ScanIndexForward': False, 'Limit': limit}  # Orden descendente por timestamp
+    if status_filter:
+        query['IndexName'] = USER_STATUS_INDEX
+        query['KeyConditionExpression'] = (
+            Key('user_id').eq(user_id) & Key('status_timestamp').begins_with(f'{status_filter}#')
         )
-        
-        items = response.get('Items', [])
-        
-        # Filtrar por status si se especifica
-        if status_filter:
-            items = [item for item in items if item.get('status') == status_filter]
-        
-    except Exception as e:
-        print(f"GSI query failed, falling back to scan: {str(e)}")
-        # Fallback a scan si GSI no existe
-        response = table.scan(
-            FilterExpression=Key('user_id').eq(user_id),
-            Limit=limit
-        )
-        items = response.get('Items', [])
-        items = [item for item in items if item.get('status') == status_filter]
-        items.sort(key=lambda x: x.get('upload_timestamp', 0), reverse=True)
+    else:
+        query['IndexName'] = USER_INDEX
+        query['KeyConditionExpression'] = Key('user_id').eq(user_id)
+    if cursor:
+        query['ExclusiveStartKey'] = decode_cursor(cursor, user_id)
+    
+    response = table.query(**query)
     
     # Formatear screenshots
     screenshots = []
-    for item in items:
+    for item in response.get('Items', []):
         screenshot = format_screenshot_item(item)
         screenshots.append(screenshot)
     
-    return screenshots
+    return screenshots, encode_cursor(response.get('LastEvaluatedKey'))
+
+def encode_cursor(last_evaluated_key):
+    """LastEvaluatedKey como cursor opaco para el query string"""
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode()).decode()
+
+def decode_cursor(cursor, user_id):
+    """
+    ExclusiveStartKey a partir del cursor de la página anterior
+    Un cursor inválido o de otro usuario es un error del cliente (400)
+    """
+    try:
+        start_key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError('Invalid cursor')
+    if not isinstance(start_key, dict) or start_key.get('user_id') != user_id:
+        raise ValueError('Invalid cursor')
+    return start_key
 
 def get_all_screenshots(status_filter, limit):
     """
@@ -138,7 +182,7 @@ def format_screenshot_item(item):
         'game_title': item.get('game_title', 'Unknown'),
         'description': item.get('description', ''),
         'filename': item.get('filename', ''),
-        'upload_timestamp': int(item.get('upload_timestamp', 0)),
+        'upload_timestamp': item.get('upload_timestamp', ''),
         'status': item['status'],
         'file_size': int(item.get('file_size', 0)),
         'extension': item.get('extension', '')
@@ -150,7 +194,12 @@ def format_screenshot_item(item):
     
     # Generate signed URL if approved
     if item['status'] == 'APPROVED' and 'processed_s3_key' in item:
-        url = generate_signed_url(item['processed_s3_key'])
+        # Aprobación sin copia: la imagen se sirve desde el bucket raw, en la versión moderada
+        url = generate_signed_url(
+            item['processed_s3_key'],
+            item.get('processed_bucket', PROCESSED_BUCKET),
+            item.get('processed_version_id')
+        )
         if url:
             screenshot['url'] = url
     
@@ -160,32 +209,63 @@ def format_screenshot_item(item):
     
     return screenshot
 
-def generate_signed_url(s3_key):
+def generate_signed_url(s3_key, bucket=PROCESSED_BUCKET, version_id=None):
     """
     Genera URL firmada para acceso temporal a la imagen
-    Usa CloudFront si está disponible, sino S3 presigned URL
+    Usa CloudFront firmado si está configurado, sino S3 presigned URL
+    Las URLs se guardan por (objeto, ventana): recargar la galería no vuelve a firmar
     """
+    now = time.time()
+    window = int(now // URL_CACHE_WINDOW)
+    cache_key = (bucket, s3_key, version_id, window)
+    if cache_key in url_cache:
+        return url_cache[cache_key]
+    
+    # Fin de la ventana + URL_EXPIRATION: la misma URL sirve toda la ventana
+    expires = (window + 1) * URL_CACHE_WINDOW + URL_EXPIRATION
     try:
-        # Usar CloudFront si está configurado
-        if CLOUDFRONT_DOMAIN:
-            url = f"https://{CLOUDFRONT_DOMAIN}/{s3_key}"
-            print(f"Generated CloudFront URL for {s3_key}")
-            return url
+        signer = get_cloudfront_signer()
+        if signer:
+            url = f"https://{CLOUDFRONT_DOMAIN}/{quote(s3_key)}"
+            if version_id:
+                url += f"?versionId={quote(version_id, safe='')}"
+            url = signer.generate_presigned_url(url, date_less_than=datetime.fromtimestamp(expires, timezone.utc))
         else:
             # Generar URL firmada de S3
+            params = {'Bucket': bucket, 'Key': s3_key}
+            if version_id:
+                params['VersionId'] = version_id
             url = s3_client.generate_presigned_url(
                 'get_object',
-                Params={
-                    'Bucket': PROCESSED_BUCKET,
-                    'Key': s3_key
-                },
-                ExpiresIn=URL_EXPIRATION
+                Params=params,
+                ExpiresIn=int(expires - now)
             )
-            print(f"Generated S3 presigned URL for {s3_key}")
-            return url
     except Exception as e:
         print(f"Error generating signed URL for {s3_key}: {str(e)}")
         return None
+    
+    # Las entradas de ventanas anteriores ya no se piden
+    oldest = next(iter(url_cache), None)
+    if len(url_cache) >= URL_CACHE_MAX_ENTRIES or (oldest and oldest[3] != window):
+        url_cache.clear()
+    url_cache[cache_key] = url
+    return url
+
+def get_cloudfront_signer():
+    """
+    CloudFrontSigner con la llave privada leída una vez por contenedor
+    Retorna None sin CloudFront, sin key pair o sin cryptography (se usa S3)
+    """
+    global cloudfront_signer
+    if cloudfront_signer is None and CLOUDFRONT_DOMAIN and CLOUDFRONT_KEY_PAIR_ID and serialization:
+        pem = secrets_client.get_secret_value(SecretId=CLOUDFRONT_PRIVATE_KEY_SECRET)['SecretString']
+        private_key = serialization.load_pem_private_key(pem.encode(), password=None)
+        # CloudFront exige RSA-SHA1 para las URLs firmadas
+        cloudfront_signer = CloudFrontSigner(
+            CLOUDFRONT_KEY_PAIR_ID,
+            lambda message: private_key.sign(message, padding.PKCS1v15(), hashes.SHA1())
+        )
+    return cloudfront_signer
 
 def response_success(status_code, body):
     return {
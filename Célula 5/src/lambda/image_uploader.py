@@ -2,13 +2,14 @@
 Lambda Function: Image Uploader
 Procesa la carga de capturas de pantalla, valida formato y almacena en S3
 Versión mejorada con validaciones robustas y mejor manejo de errores
+Flujo legado (POST /upload con la imagen en base64): los clientes nuevos usan
+POST /request-upload (generate_upload_url) y suben directo a S3
 """
 import json
 import boto3
 import base64
 import uuid
 from datetime import datetime
-from decimal import Decimal
 import os
 
 s3_client = boto3.client('s3')
@@ -66,7 +67,8 @@ def lambda_handler(event, context):
         
         # Generate unique ID
         screenshot_id = str(uuid.uuid4())
-        timestamp = int(datetime.utcnow().timestamp())
+        # ISO 8601 como en generate_upload_url: clave de rango (S) de UserIdIndex y UserStatusIndex
+        timestamp = datetime.utcnow().isoformat()
         s3_key = f"raw/{user_id}/{screenshot_id}.{extension}"
         
         # Upload to S3 Raw Bucket
@@ -91,8 +93,9 @@ def lambda_handler(event, context):
                 'filename': filename,
                 'game_title': game_title,
                 'description': description,
-                'upload_timestamp': Decimal(str(timestamp)),
+                'upload_timestamp': timestamp,
                 'status': 'PENDING',
+                'status_timestamp': f'PENDING#{timestamp}',
                 'raw_s3_key': s3_key,
                 'file_size': file_size,
                 'extension': extension
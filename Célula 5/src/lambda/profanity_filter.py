@@ -3,132 +3,424 @@ Lambda Function: Profanity Filter
 Analiza capturas de pantalla para detectar contenido inapropiado usando AWS Rekognition
 Versión mejorada con detección de contenido visual y texto en imágenes
 """
+import io
 import json
 import boto3
 import os
+import re
+import threading
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from decimal import Decimal
 
-s3_client = boto3.client('s3')
-rekognition_client = boto3.client('rekognition')
-dynamodb = boto3.resource('dynamodb')
-sns_client = boto3.client('sns')
+try:
+    from PIL import Image  # Layer de Pillow (ver DEPLOYMENT.md)
+except ImportError:
+    Image = None
+
+# Registros de un lote de SQS procesados a la vez
+RECORD_CONCURRENCY = int(os.environ.get('RECORD_CONCURRENCY', '10'))
+
+# Conexiones suficientes para los registros en curso (el default de botocore es 10)
+client_config = Config(max_pool_connections=3 * RECORD_CONCURRENCY, retries={'mode': 'standard'})
+
+s3_client = boto3.client('s3', config=client_config)
+rekognition_client = boto3.client('rekognition', config=client_config)
+dynamodb = boto3.resource('dynamodb', config=client_config)
+sns_client = boto3.client('sns', config=client_config)
 
 RAW_BUCKET = os.environ['RAW_BUCKET']
 PROCESSED_BUCKET = os.environ['PROCESSED_BUCKET']
 METADATA_TABLE = os.environ['METADATA_TABLE']
 NOTIFICATION_TOPIC_ARN = os.environ['NOTIFICATION_TOPIC_ARN']
 
-# Lista de palabras prohibidas (ejemplo básico)
-PROFANITY_LIST = [
-    # Groserías comunes
-    'fuck', 'shit', 'damn', 'bitch', 'ass', 'bastard', 'crap',
-    'piss', 'dick', 'cock', 'pussy', 'whore', 'slut',
+# Lista de palabras prohibidas: archivo empaquetado con la Lambda o s3://bucket/key
+PROFANITY_WORDLIST = os.environ.get(
+    'PROFANITY_WORDLIST',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profanity_words.txt')
+)
+
+# Hashes perceptuales (dHash de 64 bits en hex) de imágenes ya rechazadas
+BLOCKED_IMAGE_HASHES = os.environ.get(
+    'BLOCKED_IMAGE_HASHES',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'blocked_image_hashes.txt')
+)
+# Bits distintos tolerados: recompresión o reescalado cambian pocos bits
+BLOCKLIST_MAX_DISTANCE = int(os.environ.get('BLOCKLIST_MAX_DISTANCE', '6'))
+
+# early-reject: cortar en la primera etapa que rechaza (menos llamadas a Rekognition)
+# full-report: correr todas las verificaciones en paralelo y reportar todas las razones
+MODERATION_POLICY = os.environ.get('MODERATION_POLICY', 'early-reject')
+
+# tag: aprobar es un cambio de estado en DynamoDB y un tag en el objeto raw;
+#      la imagen se sirve desde la clave original (sin copia ni segundo almacenamiento)
+# copy: copiar la imagen aprobada a PROCESSED_BUCKET bajo processed/
+APPROVAL_MODE = os.environ.get('APPROVAL_MODE', 'tag')
+MODERATION_TAG = 'moderation'
+
+MAX_FILE_SIZE = 15 * 1024 * 1024  # 15MB, mismo límite que generate_upload_url
+
+# Modo copy: sobre este tamaño la copia es multipart (UploadPartCopy en paralelo)
+MULTIPART_COPY_THRESHOLD = int(os.environ.get('MULTIPART_COPY_THRESHOLD', str(8 * 1024 * 1024)))
+copy_config = TransferConfig(
+    multipart_threshold=MULTIPART_COPY_THRESHOLD,
+    multipart_chunksize=5 * 1024 * 1024,
+    max_concurrency=4
+)
+
+# s3: Rekognition lee la imagen del bucket (S3Object), la Lambda no la descarga
+# bytes: descargar la imagen y enviarla en cada llamada (buckets en otra región)
+REKOGNITION_IMAGE_SOURCE = os.environ.get('REKOGNITION_IMAGE_SOURCE', 's3')
+
+# Límite de Rekognition para imágenes enviadas como Bytes (con S3Object es 15MB)
+REKOGNITION_MAX_IMAGE_BYTES = 5 * 1024 * 1024
+
+# Errores de Rekognition al leer un S3Object que se resuelven enviando los bytes
+S3_OBJECT_FALLBACK_ERRORS = ('InvalidS3ObjectException', 'AccessDeniedException')
+
+# Leetspeak: cada carácter se reemplaza por una letra (las posiciones no cambian)
+LEET_TABLE = str.maketrans({'0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '@': 'a', '$': 's'})
+# Token candidato a leetspeak; solo se traduce si tiene alguna letra (455 o 500 no cambian)
+LEET_TOKEN = re.compile(r'[\w@$]+')
+
+def load_list(source):
+    """Leer una lista local o de S3 (una entrada por línea, # para comentarios)"""
+    if source.startswith('s3://'):
+        bucket, key = source[5:].split('/', 1)
+        content = s3_client.get_object(Bucket=bucket, Key=key)['Body'].read().decode('utf-8')
+    else:
+        with open(source, encoding='utf-8') as f:
+            content = f.read()
+    words = []
+    for line in content.splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            words.append(line.lower())
+    return words
+
+def normalize_text(text):
+    """Minúsculas y leetspeak a letras (a$$ -> ass, h4ck -> hack); los números quedan igual"""
+    return LEET_TOKEN.sub(
+        lambda token: token.group().translate(LEET_TABLE) if any(char.isalpha() for char in token.group())
+        else token.group(),
+        text.lower()
+    )
+
+def trie_pattern(words):
+    """
+    Regex equivalente a la alternación de `words`, agrupada por prefijos comunes:
+    el motor descarta una rama por carácter en lugar de probar cada palabra
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{pattern})?' if '' in node else pattern
+    
+    return build(trie)
+
+class ProfanityMatcher:
+    """
+    Matcher compilado una sola vez: palabra completa (no marca "class" por "ass"),
+    o prefijo para las entradas terminadas en *. Reporta todas las coincidencias
+    en una sola pasada sobre el texto
+    """
+    
+    def __init__(self, words):
+        # Forma normalizada -> entrada original (la que se reporta)
+        self.exact = {}
+        self.prefixes = {}
+        for word in words:
+            if word.endswith('*'):
+                self.prefixes[normalize_text(word[:-1])] = word[:-1]
+            else:
+                self.exact[normalize_text(word)] = word
+        alternatives = []
+        if self.exact:
+            alternatives.append(trie_pattern(self.exact) + r'(?!\w)')
+        if self.prefixes:
+            alternatives.append(trie_pattern(self.prefixes) + r'\w*')
+        self.pattern = re.compile(r'(?<!\w)(?:' + '|'.join(alternatives) + ')') if alternatives else None
+    
+    def find_all(self, text):
+        """Entradas de la lista encontradas en el texto, sin repetir y en orden de aparición"""
+        if self.pattern is None:
+            return []
+        hits = []
+        for match in self.pattern.finditer(normalize_text(text)):
+            word = self.entry_for(match.group())
+            if word not in hits:
+                hits.append(word)
+        return hits
+    
+    def entry_for(self, token):
+        """Entrada de la lista para un token encontrado (el prefijo más largo si no es exacta)"""
+        if token in self.exact:
+            return self.exact[token]
+        for end in range(len(token), 0, -1):
+            if token[:end] in self.prefixes:
+                return self.prefixes[token[:end]]
+        return token
+
+PROFANITY_LIST = load_list(PROFANITY_WORDLIST)
+profanity_matcher = ProfanityMatcher(PROFANITY_LIST)
+
+blocked_hashes = [int(entry, 16) for entry in load_list(BLOCKED_IMAGE_HASHES)]
+
+class ScreenshotImage:
+    """
+    Imagen a moderar: referencia al objeto en S3 y, solo si hace falta, sus bytes
+    Los bytes se descargan una vez y se comparten entre las verificaciones paralelas
+    Rekognition lee el S3Object mientras sea accesible, aunque haya bytes en memoria
+    Con version_id se modera la versión confirmada aunque la clave se sobrescriba después
+    """
+    
+    def __init__(self, bucket, key, image_bytes=None, size=None, version_id=None):
+        self.bucket = bucket
+        self.key = key
+        self.version_id = version_id
+        self._bytes = image_bytes
+        # Modo bytes (image_bytes dado) o S3Object inaccesible: enviar los bytes
+        self._use_s3_object = image_bytes is None
+        self._size = size
+        self._lock = threading.Lock()
+    
+    @property
+    def bytes(self):
+        with self._lock:
+            if self._bytes is None:
+                print(f"Downloading s3://{self.bucket}/{self.key}")
+                self._bytes = s3_client.get_object(**self.object_params())['Body'].read()
+            return self._bytes
+    
+    @property
+    def size(self):
+        if self._bytes is not None:
+            return len(self._bytes)
+        if self._size is None:
+            self._size = s3_client.head_object(**self.object_params())['ContentLength']
+        return self._size
     
-    # Contenido inapropiado
-    'badword1', 'badword2', 'offensive', 'inappropriate',
-    'nsfw', 'adult', 'porn', 'sex', 'nude', 'naked',
+    def object_params(self):
+        params = {'Bucket': self.bucket, 'Key': self.key}
+        if self.version_id:
+            params['VersionId'] = self.version_id
+        return params
     
-    # Violencia
-    'violence', 'gore', 'blood', 'hate', 'kill', 'murder', 'death',
+    def hash_bytes(self):
+        """
+        Bytes para el hash perceptual, sin guardarlos: se liberan al terminar el
+        hash y no pasan las llamadas a Rekognition a modo Bytes
+        La lectura se acota a MAX_FILE_SIZE (check_image_size corre en paralelo)
+        """
+        if self._bytes is not None:
+            return self._bytes
+        return s3_client.get_object(Range=f"bytes=0-{MAX_FILE_SIZE - 1}",
+                                    **self.object_params())['Body'].read()
     
-    # Trampas y spam
-    'spam', 'hack', 'cheat', 'exploit', 'bot', 'aimbot', 'wallhack'
-]
+    def rekognition_call(self, method, **kwargs):
+        """Llamar a la API de Rekognition con el S3Object, o con los bytes si no hay acceso"""
+        if self._use_s3_object:
+            s3_object = {'Bucket': self.bucket, 'Name': self.key}
+            if self.version_id:
+                s3_object['Version'] = self.version_id
+            try:
+                return method(Image={'S3Object': s3_object}, **kwargs)
+            except ClientError as error:
+                if error.response['Error']['Code'] not in S3_OBJECT_FALLBACK_ERRORS:
+                    raise
+                self._use_s3_object = False
+                print(f"Rekognition could not read S3Object ({error.response['Error']['Code']}), sending bytes")
+        # Sin moderar no se aprueba: el registro falla y se reintenta (luego la DLQ)
+        if self.size > REKOGNITION_MAX_IMAGE_BYTES:
+            raise ValueError(f"Image too large for Rekognition Bytes ({self.size / (1024*1024):.1f}MB > 5MB)")
+        return method(Image={'Bytes': self.bytes}, **kwargs)
 
 # Configuración de Rekognition
 MIN_CONFIDENCE_MODERATION = 50.0  # Umbral para detectar contenido
 REJECT_CONFIDENCE_THRESHOLD = 55.0  # Umbral para rechazar (bajado para capturar smoking)
 
+record_executor = ThreadPoolExecutor(max_workers=RECORD_CONCURRENCY)
+
+# Las verificaciones de una etapa se hacen en paralelo (el cliente es thread-safe):
+# hasta 3 llamadas a Rekognition por cada registro en curso
+rekognition_executor = ThreadPoolExecutor(max_workers=3 * RECORD_CONCURRENCY)
+
 def lambda_handler(event, context):
-    try:
-        # Parse SNS message
-        for record in event['Records']:
-            message = json.loads(record['Sns']['Message'])
-            screenshot_id = message['screenshot_id']
-            user_id = message['user_id']
-            s3_key = message['s3_key']
-            bucket = message['bucket']
-            
-            print(f"Processing screenshot: {screenshot_id}")
-            
-            # Get image from S3
-            response = s3_client.get_object(Bucket=bucket, Key=s3_key)
-            image_bytes = response['Body'].read()
-            
-            # Get metadata from DynamoDB
-            table = dynamodb.Table(METADATA_TABLE)
-            item = table.get_item(Key={'screenshot_id': screenshot_id})['Item']
-            
-            # Perform comprehensive content check
-            is_appropriate, rejection_reasons = check_content(item, image_bytes, bucket, s3_key)
-            
-            if is_appropriate:
-                # Move to processed bucket
-                processed_key = s3_key.replace('raw/', 'processed/')
-                s3_client.copy_object(
-                    Bucket=PROCESSED_BUCKET,
-                    CopySource={'Bucket': bucket, 'Key': s3_key},
-                    Key=processed_key
-                )
-                
-                # Update metadata
-                table.update_item(
-                    Key={'screenshot_id': screenshot_id},
-                    UpdateExpression='SET #status = :status, processed_s3_key = :key, processed_timestamp = :timestamp',
-                    ExpressionAttributeNames={'#status': 'status'},
-                    ExpressionAttributeValues={
-                        ':status': 'APPROVED',
-                        ':key': processed_key,
-                        ':timestamp': Decimal(str(int(datetime.utcnow().timestamp())))
-                    }
-                )
-                
-                status_message = 'Screenshot approved and ready for viewing'
-            else:
-                # Update metadata as rejected
-                table.update_item(
-                    Key={'screenshot_id': screenshot_id},
-                    UpdateExpression='SET #status = :status, rejection_reasons = :reasons, processed_timestamp = :timestamp',
-                    ExpressionAttributeNames={'#status': 'status'},
-                    ExpressionAttributeValues={
-                        ':status': 'REJECTED',
-                        ':reasons': rejection_reasons,
-                        ':timestamp': Decimal(str(int(datetime.utcnow().timestamp())))
-                    }
-                )
-                
-                status_message = f'Screenshot rejected: {", ".join(rejection_reasons)}'
-            
-            # Send notification to user
-            sns_client.publish(
-                TopicArn=NOTIFICATION_TOPIC_ARN,
-                Message=json.dumps({
-                    'user_id': user_id,
-                    'screenshot_id': screenshot_id,
-                    'status': 'APPROVED' if is_appropriate else 'REJECTED',
-                    'message': status_message
-                }),
-                Subject='Screenshot Processing Complete'
-            )
-            
-            print(f"Screenshot {screenshot_id}: {'APPROVED' if is_appropriate else 'REJECTED'}")
+    """
+    Lote de SQS (cola suscrita al Filter Topic): los registros se procesan en
+    paralelo y solo los fallidos se reportan en batchItemFailures para reintentarse
+    Con un evento de SNS directo un fallo hace fallar la invocación (reintento asíncrono)
+    """
+    records = event['Records']
+    futures = [(record, record_executor.submit(process_record, record)) for record in records]
+    
+    failed = []
+    for record, future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Error processing record {record.get('messageId', '')}: {str(e)}")
+            failed.append(record)
+    
+    if any(record.get('eventSource') == 'aws:sqs' for record in records):
+        return {'batchItemFailures': [{'itemIdentifier': record['messageId']} for record in failed]}
+    
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(records)} screenshots failed")
+    return {'statusCode': 200, 'body': 'Processing complete'}
+
+def parse_message(record):
+    """Mensaje de confirm_upload desde un registro de SQS o SNS"""
+    if 'Sns' in record:
+        return json.loads(record['Sns']['Message'])
+    body = json.loads(record['body'])
+    # Sin RawMessageDelivery el cuerpo es el sobre de SNS
+    if 'TopicArn' in body and 'Message' in body:
+        return json.loads(body['Message'])
+    return body
+
+def process_record(record):
+    """Moderar un screenshot, guardar el resultado y notificar al usuario"""
+    message = parse_message(record)
+    screenshot_id = message['screenshot_id']
+    user_id = message['user_id']
+    s3_key = message['s3_key']
+    bucket = message['bucket']
+    
+    print(f"Processing screenshot: {screenshot_id}")
+    
+    # Get metadata from DynamoDB
+    table = dynamodb.Table(METADATA_TABLE)
+    item = table.get_item(Key={'screenshot_id': screenshot_id})['Item']
+    
+    # Versión registrada por confirm_upload (la URL firmada sigue vigente unos minutos)
+    version_id = item.get('raw_version_id')
+    source = {'Bucket': bucket, 'Key': s3_key}
+    if version_id:
+        source['VersionId'] = version_id
+    
+    # Por defecto Rekognition lee la imagen de S3; solo se descarga en modo bytes
+    image_bytes = None
+    if REKOGNITION_IMAGE_SOURCE == 'bytes':
+        image_bytes = s3_client.get_object(**source)['Body'].read()
+    
+    # Perform comprehensive content check
+    is_appropriate, rejection_reasons = check_content(item, image_bytes, bucket, s3_key)
+    
+    if is_appropriate:
+        # Ubicación desde la que image_retrieval sirve la imagen
+        if APPROVAL_MODE == 'copy':
+            location = copy_to_processed(source, s3_key.replace('raw/', 'processed/'), item.get('file_size'))
+        else:
+            location = tag_moderation(source, 'approved')
         
-        return {'statusCode': 200, 'body': 'Processing complete'}
+        # Update metadata
+        table.update_item(
+            Key={'screenshot_id': screenshot_id},
+            UpdateExpression='SET #status = :status, status_timestamp = :status_timestamp, '
+                             'processed_timestamp = :timestamp, '
+                             + ', '.join(f'{name} = :{name}' for name in location),
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':status': 'APPROVED',
+                ':status_timestamp': f"APPROVED#{item['upload_timestamp']}",
+                ':timestamp': Decimal(str(int(datetime.utcnow().timestamp()))),
+                **{f':{name}': value for name, value in location.items()}
+            }
+        )
         
-    except Exception as e:
-        print(f"Error: {str(e)}")
-        return {'statusCode': 500, 'body': str(e)}
+        status_message = 'Screenshot approved and ready for viewing'
+    else:
+        # El lifecycle del bucket raw expira los objetos rechazados
+        if APPROVAL_MODE != 'copy':
+            tag_moderation(source, 'rejected')
+        
+        # Update metadata as rejected
+        table.update_item(
+            Key={'screenshot_id': screenshot_id},
+            UpdateExpression='SET #status = :status, status_timestamp = :status_timestamp, '
+                             'rejection_reasons = :reasons, processed_timestamp = :timestamp',
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues={
+                ':status': 'REJECTED',
+                ':status_timestamp': f"REJECTED#{item['upload_timestamp']}",
+                ':reasons': rejection_reasons,
+                ':timestamp': Decimal(str(int(datetime.utcnow().timestamp())))
+            }
+        )
+        
+        status_message = f'Screenshot rejected: {", ".join(rejection_reasons)}'
+    
+    # Send notification to user
+    sns_client.publish(
+        TopicArn=NOTIFICATION_TOPIC_ARN,
+        Message=json.dumps({
+            'user_id': user_id,
+            'screenshot_id': screenshot_id,
+            'status': 'APPROVED' if is_appropriate else 'REJECTED',
+            'message': status_message
+        }),
+        Subject='Screenshot Processing Complete'
+    )
+    
+    print(f"Screenshot {screenshot_id}: {'APPROVED' if is_appropriate else 'REJECTED'}")
 
-def verify_is_video_game(image_bytes):
+def tag_moderation(source, result):
+    """
+    Marcar la versión moderada con el resultado (tag moderation)
+    Aprobar no copia la imagen: la bucket policy de CloudFront y el rol de
+    image_retrieval solo leen objetos con moderation=approved
+    Retorna: ubicación a servir (bucket, clave y versión originales)
+    """
+    s3_client.put_object_tagging(
+        **source,
+        Tagging={'TagSet': [{'Key': MODERATION_TAG, 'Value': result}]}
+    )
+    
+    location = {'processed_bucket': source['Bucket'], 'processed_s3_key': source['Key']}
+    # Servir la versión moderada aunque la clave reciba otro PUT
+    if 'VersionId' in source:
+        location['processed_version_id'] = source['VersionId']
+    return location
+
+def copy_to_processed(source, processed_key, size=None):
+    """
+    Copiar la imagen aprobada a PROCESSED_BUCKET (APPROVAL_MODE=copy)
+    Hasta MULTIPART_COPY_THRESHOLD una sola CopyObject; las imágenes más grandes
+    se copian por partes en paralelo (boto3 usa UploadPartCopy)
+    """
+    if size and size > MULTIPART_COPY_THRESHOLD:
+        s3_client.copy(source, PROCESSED_BUCKET, processed_key, Config=copy_config)
+    else:
+        s3_client.copy_object(
+            Bucket=PROCESSED_BUCKET,
+            CopySource=source,
+            Key=processed_key
+        )
+    
+    return {'processed_bucket': PROCESSED_BUCKET, 'processed_s3_key': processed_key}
+
+def verify_is_video_game(image):
     """
     Verifica si la imagen es un screenshot de videojuego
     Retorna: True si es videojuego, False si es foto real
     """
     try:
         # Usar DetectLabels para identificar el contenido
-        labels_response = rekognition_client.detect_labels(
-            Image={'Bytes': image_bytes},
+        labels_response = image.rekognition_call(
+            rekognition_client.detect_labels,
             MaxLabels=50,
             MinConfidence=30.0
         )
@@ -189,99 +481,174 @@ def verify_is_video_game(image_bytes):
         # Si falla la detección, ser permisivo
         return True
 
-def check_content(metadata, image_bytes, bucket, s3_key):
+def check_content(metadata, image_bytes, bucket, s3_key, policy=None):
     """
-    Verifica si el contenido es apropiado usando AWS Rekognition
+    Verifica si el contenido es apropiado por etapas, de la más barata a la más cara:
+      1. local: texto de la metadata, tamaño y blocklist de hashes (sin llamadas a AWS)
+      2. visual: DetectLabels y DetectModerationLabels en paralelo
+      3. texto: DetectText
+    Con early-reject una etapa solo corre si las anteriores no rechazaron;
+    con full-report todas corren en paralelo (una sola ronda de llamadas)
+    Con image_bytes=None Rekognition lee el objeto de S3 y la imagen solo se
+    descarga si una verificación necesita los bytes
     Retorna: (is_appropriate: bool, rejection_reasons: list)
     """
+    policy = policy or MODERATION_POLICY
+    image = ScreenshotImage(bucket, s3_key, image_bytes, metadata.get('file_size'),
+                            metadata.get('raw_version_id'))
+    stages = [
+        ('local', [
+            lambda: check_metadata_text(metadata),
+            lambda: check_image_size(image),
+            lambda: check_image_blocklist(image)
+        ]),
+        ('visual', [
+            lambda: check_video_game(image),
+            lambda: check_moderation_labels(image)
+        ]),
+        ('text', [
+            lambda: check_image_text(image)
+        ])
+    ]
+    
     rejection_reasons = []
+    pending = []
+    for stage, checks in stages:
+        if policy == 'full-report':
+            pending.extend(rekognition_executor.submit(check) for check in checks)
+            continue
+        
+        futures = [rekognition_executor.submit(check) for check in checks]
+        for future in futures:
+            rejection_reasons.extend(future.result())
+        if rejection_reasons:
+            print(f"Rejected at stage '{stage}', skipping remaining checks")
+            break
     
-    # 1. Verificar que sea un videojuego (PRIMER FILTRO)
-    is_video_game = verify_is_video_game(image_bytes)
-    if not is_video_game:
-        rejection_reasons.append("Not a video game screenshot - real photo detected")
-        print("Image rejected: Not a video game screenshot")
-        # No retornar aquí, seguir verificando por si acaso
+    for future in pending:
+        rejection_reasons.extend(future.result())
     
-    print(f"Video game verification: {'PASSED' if is_video_game else 'FAILED'}")
+    is_appropriate = len(rejection_reasons) == 0
     
-    # 2. Check text fields for profanity
-    text_to_check = f"{metadata.get('description', '')} {metadata.get('game_title', '')}".lower()
+    return is_appropriate, rejection_reasons
+
+def check_metadata_text(metadata):
+    """Palabras prohibidas en la descripción y el título del juego"""
+    rejection_reasons = []
+    text_to_check = f"{metadata.get('description', '')} {metadata.get('game_title', '')}"
     
-    for word in PROFANITY_LIST:
-        if word in text_to_check:
-            print(f"Profanity in metadata detected: {word}")
-            rejection_reasons.append(f"Inappropriate text in description: {word}")
+    for word in profanity_matcher.find_all(text_to_check):
+        print(f"Profanity in metadata detected: {word}")
+        rejection_reasons.append(f"Inappropriate text in description: {word}")
     
-    # 2. AWS Rekognition - Detect Moderation Labels (contenido inapropiado)
+    return rejection_reasons
+
+def check_image_size(image):
+    """Imagen vacía o sobre el límite de subida (file_size de la metadata, sin descargar)"""
+    size = image.size
+    if not size:
+        return ["Empty image"]
+    if size > MAX_FILE_SIZE:
+        return [f"Image too large: {size / (1024*1024):.1f}MB"]
+    return []
+
+def image_hash(image_bytes):
+    """
+    dHash de 64 bits: compara cada píxel con su vecino en una versión 9x8 en
+    grises, por lo que resiste recompresión y reescalado
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    image.draft('L', (64, 64))  # JPEG: decodificar ya reducido
+    pixels = list(image.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+def check_image_blocklist(image):
+    """Imagen igual o casi igual a una ya rechazada (hash perceptual)"""
+    if not blocked_hashes:
+        return []
+    if Image is None:
+        print("Pillow not available, skipping image blocklist")
+        return []
     try:
-        # Primero intentar con threshold bajo para ver TODO lo que detecta
-        moderation_response_all = rekognition_client.detect_moderation_labels(
-            Image={'Bytes': image_bytes},
-            MinConfidence=0.0  # Ver TODO
-        )
-        
-        all_labels = moderation_response_all.get('ModerationLabels', [])
-        print(f"ALL moderation labels detected (any confidence): {json.dumps(all_labels, default=str)}")
-        
-        # Ahora filtrar por el threshold configurado
-        moderation_response = rekognition_client.detect_moderation_labels(
-            Image={'Bytes': image_bytes},
-            MinConfidence=MIN_CONFIDENCE_MODERATION
-        )
-        
-        moderation_labels = moderation_response.get('ModerationLabels', [])
-        print(f"Moderation labels found (>{MIN_CONFIDENCE_MODERATION}% confidence): {len(moderation_labels)}")
-        
-        for label in moderation_labels:
-            confidence = label['Confidence']
-            label_name = label['Name']
-            parent_name = label.get('ParentName', '')
-            
-            print(f"Moderation label: {label_name} ({parent_name}) - Confidence: {confidence:.2f}%")
-            
-            # Rechazar si supera el umbral
-            if confidence >= REJECT_CONFIDENCE_THRESHOLD:
-                reason = f"Inappropriate visual content: {label_name}"
-                if parent_name:
-                    reason += f" ({parent_name})"
-                reason += f" - {confidence:.1f}% confidence"
-                rejection_reasons.append(reason)
-        
-        # Log all moderation labels for debugging
-        if moderation_labels:
-            print(f"All moderation labels detected: {json.dumps(moderation_labels, default=str)}")
-            
-    except Exception as moderation_error:
-        print(f"DetectModerationLabels error: {str(moderation_error)}")
-        # Continuar sin detección de moderación visual
+        image_bits = image_hash(image.hash_bytes())
+    except Exception as hash_error:
+        print(f"Could not hash image: {str(hash_error)}")
+        return []
     
-    # 3. AWS Rekognition - Detect Text (texto en la imagen)
-    # NOTA: Requiere permiso rekognition:DetectText (pendiente de aprobación de seguridad)
-    try:
-        text_response = rekognition_client.detect_text(
-            Image={'Bytes': image_bytes}
-        )
+    for blocked in blocked_hashes:
+        distance = (image_bits ^ blocked).bit_count()
+        if distance <= BLOCKLIST_MAX_DISTANCE:
+            print(f"Image matches blocklist hash {blocked:016x} (distance {distance})")
+            return ["Image matches a previously blocked image"]
+    return []
+
+def check_video_game(image):
+    """Rechazo si DetectLabels indica una foto real y no un videojuego"""
+    is_video_game = verify_is_video_game(image)
+    print(f"Video game verification: {'PASSED' if is_video_game else 'FAILED'}")
+    if not is_video_game:
+        print("Image rejected: Not a video game screenshot")
+        return ["Not a video game screenshot - real photo detected"]
+    return []
+
+def check_moderation_labels(image):
+    """
+    AWS Rekognition - Detect Moderation Labels (contenido inapropiado)
+    Una sola llamada; Rekognition filtra por MIN_CONFIDENCE_MODERATION y el umbral
+    de rechazo se aplica localmente
+    Un error de Rekognition se propaga: el registro falla en lugar de aprobarse
+    Retorna: lista de razones de rechazo
+    """
+    rejection_reasons = []
+    moderation_response = image.rekognition_call(
+        rekognition_client.detect_moderation_labels,
+        MinConfidence=MIN_CONFIDENCE_MODERATION
+    )
+    
+    moderation_labels = moderation_response.get('ModerationLabels', [])
+    print(f"Moderation labels found (>{MIN_CONFIDENCE_MODERATION}% confidence): "
+          f"{json.dumps(moderation_labels, default=str)}")
+    
+    for label in moderation_labels:
+        confidence = label['Confidence']
+        label_name = label['Name']
+        parent_name = label.get('ParentName', '')
         
-        detected_texts = []
-        for text_detection in text_response.get('TextDetections', []):
-            if text_detection['Type'] == 'LINE' and text_detection['Confidence'] > 80:
-                detected_text = text_detection['DetectedText'].lower()
-                detected_texts.append(detected_text)
-                print(f"Text detected in image: {detected_text}")
+        print(f"Moderation label: {label_name} ({parent_name}) - Confidence: {confidence:.2f}%")
         
-        # Verificar palabras prohibidas en el texto detectado
-        for detected_text in detected_texts:
-            for profanity in PROFANITY_LIST:
-                if profanity in detected_text:
-                    rejection_reasons.append(f"Offensive text in image: '{profanity}'")
-                    print(f"Profanity in image text: {profanity}")
-                    break
-                    
-    except Exception as text_error:
-        print(f"DetectText not available (permission pending): {str(text_error)}")
-        # Continuar sin detección de texto
+        # Rechazar si supera el umbral
+        if confidence >= REJECT_CONFIDENCE_THRESHOLD:
+            reason = f"Inappropriate visual content: {label_name}"
+            if parent_name:
+                reason += f" ({parent_name})"
+            reason += f" - {confidence:.1f}% confidence"
+            rejection_reasons.append(reason)
     
-    is_appropriate = len(rejection_reasons) == 0
+    return rejection_reasons
+
+def check_image_text(image):
+    """
+    AWS Rekognition - Detect Text (texto en la imagen)
+    Un error de Rekognition se propaga: el registro falla en lugar de aprobarse
+    Retorna: lista de razones de rechazo
+    """
+    rejection_reasons = []
+    text_response = image.rekognition_call(rekognition_client.detect_text)
     
-    return is_appropriate, rejection_reasons
+    detected_texts = []
+    for text_detection in text_response.get('TextDetections', []):
+        if text_detection['Type'] == 'LINE' and text_detection['Confidence'] > 80:
+            detected_text = text_detection['DetectedText'].lower()
+            detected_texts.append(detected_text)
+            print(f"Text detected in image: {detected_text}")
+    
+    # Verificar palabras prohibidas en todas las líneas de una sola pasada
+    for profanity in profanity_matcher.find_all('\n'.join(detected_texts)):
+        rejection_reasons.append(f"Offensive text in image: '{profanity}'")
+        print(f"Profanity in image text: {profanity}")
+    
+    return rejection_reasons
@@ -0,0 +1,157 @@
+"""
+Benchmark del camino de aprobación de profanity_filter (APPROVAL_MODE)
+  - copy: CopyObject a PROCESSED_BUCKET (multipart sobre MULTIPART_COPY_THRESHOLD)
+  - tag:  PutObjectTagging en el objeto raw, sin copia
+
+S3 es simulado: cada llamada suma una latencia fija y la copia además espera
+tamaño / throughput de copia del lado de S3 (las partes multipart en paralelo).
+Se mide solo el camino de aprobación (moderación omitida) y se estima el
+almacenamiento extra por mes para 1000 screenshots aprobados.
+
+Falla (exit 1) si el modo tag copia la imagen o no reduce latencia y almacenamiento.
+
+Uso: python tests/benchmark_approval.py [--sizes-mb 2 12] [--copy-mbps 800] [--request-ms 30]
+"""
+import os
+import sys
+import io
+import json
+import math
+import time
+import argparse
+import contextlib
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['RAW_BUCKET'] = 'test-raw-bucket'
+os.environ['PROCESSED_BUCKET'] = 'test-processed-bucket'
+os.environ['METADATA_TABLE'] = 'test-metadata-table'
+os.environ['NOTIFICATION_TOPIC_ARN'] = 'arn:aws:sns:us-east-1:123456789:test-topic'
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src/lambda'))
+
+import profanity_filter  # noqa: E402
+
+# S3 Standard, USD por GB-mes (us-east-1)
+PRICE_PER_GB_MONTH = 0.023
+
+
+class StubS3:
+    """Latencia por request; la copia espera tamaño / throughput"""
+
+    def __init__(self, size, request_latency, copy_bytes_per_second):
+        self.size = size
+        self.request_latency = request_latency
+        self.copy_bytes_per_second = copy_bytes_per_second
+        self.copied = 0
+
+    def copy_object(self, **kwargs):
+        time.sleep(self.request_latency + self.size / self.copy_bytes_per_second)
+        self.copied += self.size
+        return {}
+
+    def copy(self, source, bucket, key, Config=None, **kwargs):
+        # HeadObject + Create + partes en paralelo (max_concurrency) + Complete
+        part_size = Config.multipart_chunksize
+        rounds = math.ceil(math.ceil(self.size / part_size) / Config.max_concurrency)
+        time.sleep(3 * self.request_latency + rounds * (self.request_latency + part_size / self.copy_bytes_per_second))
+        self.copied += self.size
+
+    def put_object_tagging(self, **kwargs):
+        time.sleep(self.request_latency)
+        return {}
+
+
+class StubTable:
+    def __init__(self, size):
+        self.size = size
+
+    def get_item(self, Key):
+        return {'Item': {'screenshot_id': Key['screenshot_id'], 'description': 'Boss fight',
+                         'game_title': 'Test Game', 'file_size': self.size, 'raw_version_id': 'v1',
+                         'upload_timestamp': '2025-11-26T10:00:00'}}
+
+    def update_item(self, **kwargs):
+        return {}
+
+
+class StubDynamoDB:
+    def __init__(self, size):
+        self.table = StubTable(size)
+
+    def Table(self, name):
+        return self.table
+
+
+class StubSNS:
+    def publish(self, **kwargs):
+        return {'MessageId': 'stub'}
+
+
+def sqs_record(index):
+    message = {'screenshot_id': f'shot-{index}', 'user_id': 'user-1',
+               's3_key': f'raw/user-1/shot-{index}.png', 'bucket': 'test-raw-bucket'}
+    return {'messageId': f'msg-{index}', 'eventSource': 'aws:sqs', 'body': json.dumps(message)}
+
+
+def measure(mode, size, args):
+    s3 = StubS3(size, args.request_ms / 1000, args.copy_mbps * 1e6 / 8)
+    profanity_filter.s3_client = s3
+    profanity_filter.dynamodb = StubDynamoDB(size)
+    profanity_filter.sns_client = StubSNS()
+    profanity_filter.APPROVAL_MODE = mode
+
+    # Solo el camino de aprobación: la moderación siempre aprueba
+    original_check = profanity_filter.check_content
+    profanity_filter.check_content = lambda *a, **kw: (True, [])
+    durations = []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(args.screenshots):
+                start = time.perf_counter()
+                profanity_filter.process_record(sqs_record(i))
+                durations.append(time.perf_counter() - start)
+    finally:
+        profanity_filter.check_content = original_check
+
+    return sum(durations) / len(durations), s3.copied / args.screenshots
+
+
+def run(args):
+    print(f"Latencia por request S3 {args.request_ms:g} ms, copia {args.copy_mbps:g} Mbps, "
+          f"{args.screenshots} screenshots por caso")
+    print("-" * 66)
+    print(f"{'tamaño MB':>10} {'modo':>5} {'aprobación ms':>14} {'MB copiados':>12} {'USD/mes x1000':>14}")
+
+    status = 0
+    for size_mb in args.sizes_mb:
+        size = int(size_mb * 1024 * 1024)
+        results = {}
+        for mode in ('copy', 'tag'):
+            latency, copied = measure(mode, size, args)
+            results[mode] = latency
+            storage = copied * 1000 / 1e9 * PRICE_PER_GB_MONTH
+            print(f"{size_mb:>10g} {mode:>5} {latency * 1000:>14.1f} {copied / 1e6:>12.2f} {storage:>14.3f}")
+            if mode == 'tag' and copied:
+                status = 1
+        if results['tag'] >= results['copy']:
+            status = 1
+
+    print("-" * 66)
+    print("USD/mes x1000 = almacenamiento extra de 1000 aprobados en PROCESSED_BUCKET")
+    if status:
+        print("✗ El modo tag copia la imagen o no reduce la latencia de aprobación")
+    else:
+        print("✓ Aprobar con un tag no copia la imagen ni duplica el almacenamiento")
+    return status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Latencia y almacenamiento del camino de aprobación")
+    parser.add_argument('--sizes-mb', type=float, nargs='+', default=[2.0, 12.0],
+                        help="Tamaños de screenshot (sobre 8 MB la copia es multipart)")
+    parser.add_argument('--copy-mbps', type=float, default=800.0, help="Throughput de copia dentro de S3")
+    parser.add_argument('--request-ms', type=float, default=30.0, help="Latencia por request a S3")
+    parser.add_argument('--screenshots', type=int, default=5, help="Aprobaciones a medir por caso")
+    args = parser.parse_args()
+
+    sys.exit(run(args))
@@ -0,0 +1,155 @@
+"""
+Benchmark de throughput del profanity filter bajo una ráfaga de screenshots
+Compara tres formas de consumir el Filter Topic:
+  - sns:            una invocación por screenshot (suscripción directa)
+  - sqs-secuencial: lotes de SQS procesados registro por registro
+  - sqs-paralelo:   lotes de SQS con los registros en paralelo (RECORD_CONCURRENCY)
+
+S3, DynamoDB, SNS y Rekognition son simulados con latencia fija por llamada.
+Se mide la duración de una invocación de cada modo y se estima el tiempo
+en vaciar la ráfaga con --concurrency ejecuciones simultáneas de la Lambda.
+
+Falla (exit 1) si el modo paralelo no supera al secuencial y a sns, o si un
+fallo de un registro no vuelve solo ese registro en batchItemFailures.
+
+Uso: python tests/benchmark_batch_filter.py [--burst 500] [--batch-size 10] [--concurrency 20]
+"""
+import os
+import sys
+import io
+import json
+import math
+import time
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['RAW_BUCKET'] = 'test-raw-bucket'
+os.environ['PROCESSED_BUCKET'] = 'test-processed-bucket'
+os.environ['METADATA_TABLE'] = 'test-metadata-table'
+os.environ['NOTIFICATION_TOPIC_ARN'] = 'arn:aws:sns:us-east-1:123456789:test-topic'
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src/lambda'))
+
+import profanity_filter  # noqa: E402
+
+
+class Stub:
+    """Cualquier método espera `latency` y retorna la respuesta indicada"""
+
+    def __init__(self, latency, responses=None):
+        self.latency = latency
+        self.responses = responses or {}
+
+    def __getattr__(self, name):
+        def call(**kwargs):
+            time.sleep(self.latency)
+            response = self.responses.get(name, {})
+            return response(kwargs) if callable(response) else response
+        return call
+
+
+class StubDynamoDB:
+    def __init__(self, table):
+        self.table = table
+
+    def Table(self, name):
+        return self.table
+
+
+def get_item(kwargs):
+    screenshot_id = kwargs['Key']['screenshot_id']
+    if screenshot_id == 'broken':
+        raise KeyError('Item')
+    return {'Item': {'screenshot_id': screenshot_id, 'description': 'Boss fight',
+                     'game_title': 'Test Game', 'file_size': 2048, 'upload_timestamp': '2025-11-26T10:00:00'}}
+
+
+def sqs_record(index, screenshot_id=None):
+    screenshot_id = screenshot_id or f'shot-{index}'
+    return {
+        'messageId': f'msg-{index}',
+        'eventSource': 'aws:sqs',
+        'body': json.dumps({'screenshot_id': screenshot_id, 'user_id': 'user-1',
+                            's3_key': f'raw/user-1/{screenshot_id}.png', 'bucket': 'test-raw-bucket'})
+    }
+
+
+def sns_record(index):
+    return {'EventSource': 'aws:sns', 'Sns': {'Message': sqs_record(index)['body']}}
+
+
+def install_stubs(aws_latency, rekognition_latency):
+    table = Stub(aws_latency, {'get_item': get_item})
+    profanity_filter.dynamodb = StubDynamoDB(table)
+    profanity_filter.s3_client = Stub(aws_latency)
+    profanity_filter.sns_client = Stub(aws_latency)
+    profanity_filter.rekognition_client = Stub(rekognition_latency, {
+        'detect_labels': {'Labels': [{'Name': 'Video Gaming', 'Confidence': 95.0}]},
+        'detect_moderation_labels': {'ModerationLabels': []},
+        'detect_text': {'TextDetections': []}
+    })
+
+
+def invocation_time(records, workers, repeat=3):
+    """Duración promedio de una invocación con `workers` registros en paralelo"""
+    profanity_filter.record_executor = ThreadPoolExecutor(max_workers=workers)
+    durations = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            profanity_filter.lambda_handler({'Records': records}, None)
+            durations.append(time.perf_counter() - start)
+    return sum(durations) / len(durations)
+
+
+def run(args):
+    install_stubs(args.aws_ms / 1000, args.rekognition_ms / 1000)
+    batch = [sqs_record(i) for i in range(args.batch_size)]
+    modes = [
+        ('sns', [sns_record(0)], 1, 1),
+        ('sqs-secuencial', batch, args.batch_size, 1),
+        ('sqs-paralelo', batch, args.batch_size, args.batch_size)
+    ]
+
+    print(f"Ráfaga de {args.burst} screenshots, {args.concurrency} ejecuciones simultáneas, "
+          f"Rekognition {args.rekognition_ms:g} ms, otras llamadas {args.aws_ms:g} ms")
+    print("-" * 78)
+    print(f"{'modo':>15} {'invocaciones':>13} {'ms/invocación':>14} {'vaciado s':>10} {'screenshots/s':>14}")
+
+    results = {}
+    for name, records, per_invocation, workers in modes:
+        duration = invocation_time(records, workers)
+        invocations = math.ceil(args.burst / per_invocation)
+        drain = math.ceil(invocations / args.concurrency) * duration
+        results[name] = args.burst / drain
+        print(f"{name:>15} {invocations:>13} {duration * 1000:>14.1f} {drain:>10.1f} {results[name]:>14.1f}")
+    print("-" * 78)
+
+    # Un registro que falla no hace reintentar al resto del lote
+    failing = batch[:3] + [sqs_record(99, 'broken')]
+    with contextlib.redirect_stdout(io.StringIO()):
+        response = profanity_filter.lambda_handler({'Records': failing}, None)
+    print(f"Lote con un registro fallido: {response}")
+
+    if response != {'batchItemFailures': [{'itemIdentifier': 'msg-99'}]}:
+        print("✗ batchItemFailures no contiene solo el registro fallido")
+        return 1
+    if results['sqs-paralelo'] <= max(results['sns'], results['sqs-secuencial']):
+        print("✗ El lote en paralelo no mejora el throughput")
+        return 1
+    print(f"✓ Throughput {results['sqs-paralelo'] / results['sns']:.1f}x sobre una invocación por screenshot")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Throughput del profanity filter con SQS en lotes")
+    parser.add_argument('--burst', type=int, default=500, help="Screenshots en la ráfaga")
+    parser.add_argument('--batch-size', type=int, default=10, help="BatchSize del event source mapping")
+    parser.add_argument('--concurrency', type=int, default=20, help="Ejecuciones simultáneas de la Lambda")
+    parser.add_argument('--rekognition-ms', type=float, default=150.0, help="Latencia por llamada a Rekognition")
+    parser.add_argument('--aws-ms', type=float, default=10.0, help="Latencia de S3, DynamoDB y SNS")
+    args = parser.parse_args()
+
+    sys.exit(run(args))
@@ -0,0 +1,197 @@
+"""
+Benchmark de memoria y latencia de profanity_filter según cómo recibe
+Rekognition la imagen (REKOGNITION_IMAGE_SOURCE)
+  - bytes: la Lambda descarga el screenshot y lo envía en cada llamada
+  - s3:    cada llamada lleva solo la referencia S3Object
+
+S3 y Rekognition son simulados: la descarga y el envío de bytes esperan
+tamaño / ancho de banda y cada llamada a Rekognition suma una latencia fija.
+La memoria es el pico de tracemalloc durante lambda_handler.
+
+Falla (exit 1) si el modo s3 descarga la imagen o no reduce memoria y latencia.
+
+Uso: python tests/benchmark_image_source.py [--size-mb 4] [--bandwidth-mbps 400] [--latency-ms 150]
+"""
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import contextlib
+import threading
+import tracemalloc
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['RAW_BUCKET'] = 'test-raw-bucket'
+os.environ['PROCESSED_BUCKET'] = 'test-processed-bucket'
+os.environ['METADATA_TABLE'] = 'test-metadata-table'
+os.environ['NOTIFICATION_TOPIC_ARN'] = 'arn:aws:sns:us-east-1:123456789:test-topic'
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src/lambda'))
+
+import profanity_filter  # noqa: E402
+
+
+class Network:
+    """Tiempo de transferencia simulado para `size` bytes"""
+
+    def __init__(self, bandwidth_mbps):
+        self.bytes_per_second = bandwidth_mbps * 1e6 / 8
+
+    def transfer(self, size):
+        time.sleep(size / self.bytes_per_second)
+
+
+class StubS3:
+    def __init__(self, network, size):
+        self.network = network
+        self.size = size
+        self.downloads = 0
+
+    def get_object(self, **kwargs):
+        self.downloads += 1
+        network, size = self.network, self.size
+
+        class Body:
+            def read(self):
+                network.transfer(size)
+                return bytes(size)
+        return {'Body': Body(), 'ContentLength': size}
+
+    def head_object(self, **kwargs):
+        return {'ContentLength': self.size}
+
+    def copy_object(self, **kwargs):
+        return {}
+
+    def put_object_tagging(self, **kwargs):
+        return {}
+
+
+class StubRekognition:
+    """Cada llamada espera `latency`; con Bytes además sube el payload"""
+
+    def __init__(self, network, latency):
+        self.network = network
+        self.latency = latency
+        self.uploaded = 0
+        self.lock = threading.Lock()
+
+    def _call(self, kwargs):
+        payload = kwargs['Image'].get('Bytes', b'')
+        with self.lock:
+            self.uploaded += len(payload)
+        self.network.transfer(len(payload))
+        time.sleep(self.latency)
+
+    def detect_labels(self, **kwargs):
+        self._call(kwargs)
+        return {'Labels': [{'Name': 'Video Gaming', 'Confidence': 95.0}]}
+
+    def detect_moderation_labels(self, **kwargs):
+        self._call(kwargs)
+        return {'ModerationLabels': []}
+
+    def detect_text(self, **kwargs):
+        self._call(kwargs)
+        return {'TextDetections': []}
+
+
+class StubTable:
+    def __init__(self, size):
+        self.size = size
+
+    def get_item(self, Key):
+        return {'Item': {'screenshot_id': Key['screenshot_id'], 'description': 'Boss fight',
+                         'game_title': 'Test Game', 'file_size': self.size,
+                         'upload_timestamp': '2025-11-26T10:00:00'}}
+
+    def update_item(self, **kwargs):
+        return {}
+
+
+class StubDynamoDB:
+    def __init__(self, size):
+        self.table = StubTable(size)
+
+    def Table(self, name):
+        return self.table
+
+
+class StubSNS:
+    def publish(self, **kwargs):
+        return {'MessageId': 'stub'}
+
+
+def sns_event(index):
+    message = {'screenshot_id': f'shot-{index}', 'user_id': 'user-1',
+               's3_key': f'raw/user-1/shot-{index}.png', 'bucket': 'test-raw-bucket'}
+    return {'Records': [{'Sns': {'Message': json.dumps(message)}}]}
+
+
+def measure(source, args):
+    size = int(args.size_mb * 1024 * 1024)
+    network = Network(args.bandwidth_mbps)
+    s3 = StubS3(network, size)
+    rekognition = StubRekognition(network, args.latency_ms / 1000)
+    profanity_filter.s3_client = s3
+    profanity_filter.rekognition_client = rekognition
+    profanity_filter.dynamodb = StubDynamoDB(size)
+    profanity_filter.sns_client = StubSNS()
+    profanity_filter.REKOGNITION_IMAGE_SOURCE = source
+
+    durations = []
+    peaks = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(args.screenshots):
+            tracemalloc.start()
+            start = time.perf_counter()
+            profanity_filter.lambda_handler(sns_event(i), None)
+            durations.append(time.perf_counter() - start)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+    return {
+        'latency': sum(durations) / len(durations),
+        'peak': max(peaks),
+        'downloads': s3.downloads / args.screenshots,
+        'uploaded': rekognition.uploaded / args.screenshots
+    }
+
+
+def run(args):
+    print(f"Screenshot de {args.size_mb:g} MB, {args.bandwidth_mbps:g} Mbps, "
+          f"{args.latency_ms:g} ms por llamada a Rekognition, {args.screenshots} screenshots")
+    print("-" * 70)
+    print(f"{'origen':>7} {'latencia ms':>12} {'pico MB':>9} {'descargas':>10} {'MB a Rekognition':>17}")
+
+    results = {}
+    for source in ('bytes', 's3'):
+        r = measure(source, args)
+        results[source] = r
+        print(f"{source:>7} {r['latency'] * 1000:>12.1f} {r['peak'] / 1e6:>9.2f} {r['downloads']:>10.1f} "
+              f"{r['uploaded'] / 1e6:>17.2f}")
+
+    print("-" * 70)
+    before, after = results['bytes'], results['s3']
+    print(f"Latencia: -{(1 - after['latency'] / before['latency']) * 100:.0f}%   "
+          f"Memoria pico: -{(1 - after['peak'] / before['peak']) * 100:.0f}%")
+
+    if after['downloads'] or after['peak'] >= before['peak'] or after['latency'] >= before['latency']:
+        print("✗ El modo s3 descarga la imagen o no mejora memoria y latencia")
+        return 1
+    print("✓ Rekognition lee la imagen de S3, la Lambda no la descarga")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Memoria y latencia con S3Object vs bytes")
+    parser.add_argument('--size-mb', type=float, default=4.0,
+                        help="Tamaño del screenshot (Rekognition acepta hasta 5 MB en Bytes)")
+    parser.add_argument('--bandwidth-mbps', type=float, default=400.0, help="Ancho de banda de la Lambda")
+    parser.add_argument('--latency-ms', type=float, default=150.0, help="Latencia por llamada a Rekognition")
+    parser.add_argument('--screenshots', type=int, default=5, help="Screenshots a procesar por modo")
+    args = parser.parse_args()
+
+    sys.exit(run(args))
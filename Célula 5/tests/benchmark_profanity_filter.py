@@ -0,0 +1,155 @@
+"""
+Benchmark de llamadas a Rekognition en check_content (profanity_filter)
+Compara el flujo anterior (DetectLabels, DetectModerationLabels dos veces y
+DetectText, uno después del otro) con el actual (una llamada de moderación
+filtrada localmente y las tres llamadas en paralelo) usando un Rekognition
+simulado con latencia fija por llamada.
+
+Luego compara las políticas early-reject y full-report por tipo de resultado:
+aprobado, rechazado por la metadata (etapa local) y rechazado por contenido
+visual (etapa visual).
+
+Falla (exit 1) si el flujo actual hace más de 3 llamadas por screenshot, si
+su latencia supera 1.5 round-trips o si early-reject llama a Rekognition
+cuando la metadata ya rechaza.
+
+Uso: python tests/benchmark_profanity_filter.py [--screenshots 20] [--latency-ms 150]
+"""
+import os
+import sys
+import io
+import time
+import argparse
+import contextlib
+import threading
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['RAW_BUCKET'] = 'test-raw-bucket'
+os.environ['PROCESSED_BUCKET'] = 'test-processed-bucket'
+os.environ['METADATA_TABLE'] = 'test-metadata-table'
+os.environ['NOTIFICATION_TOPIC_ARN'] = 'arn:aws:sns:us-east-1:123456789:test-topic'
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src/lambda'))
+
+import profanity_filter  # noqa: E402
+
+# Precio por imagen de las APIs de imagen de Rekognition (primer millón al mes, USD)
+PRICE_PER_CALL = 0.001
+
+
+class StubRekognition:
+    """Rekognition simulado: cada llamada espera `latency` segundos"""
+
+    def __init__(self, latency, moderation_confidence=30.0):
+        self.latency = latency
+        self.moderation_confidence = moderation_confidence
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def _call(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+    def detect_labels(self, **kwargs):
+        self._call()
+        return {'Labels': [{'Name': 'Video Gaming', 'Confidence': 95.0}]}
+
+    def detect_moderation_labels(self, **kwargs):
+        self._call()
+        labels = [{'Name': 'Violence', 'ParentName': '', 'Confidence': self.moderation_confidence}]
+        return {'ModerationLabels': [l for l in labels if l['Confidence'] >= kwargs.get('MinConfidence', 50.0)]}
+
+    def detect_text(self, **kwargs):
+        self._call()
+        return {'TextDetections': [{'Type': 'LINE', 'Confidence': 99.0, 'DetectedText': 'GAME OVER'}]}
+
+
+def legacy_check(client, image_bytes):
+    """Secuencia de llamadas anterior de check_content"""
+    client.detect_labels(Image={'Bytes': image_bytes}, MaxLabels=50, MinConfidence=30.0)
+    client.detect_moderation_labels(Image={'Bytes': image_bytes}, MinConfidence=0.0)
+    client.detect_moderation_labels(Image={'Bytes': image_bytes},
+                                    MinConfidence=profanity_filter.MIN_CONFIDENCE_MODERATION)
+    client.detect_text(Image={'Bytes': image_bytes})
+
+
+def measure(mode, client, screenshots, metadata=None):
+    metadata = metadata or {'description': 'Boss fight', 'game_title': 'Test Game'}
+    image_bytes = b'fake_image_data'
+    durations = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(screenshots):
+            start = time.perf_counter()
+            if mode == 'legacy':
+                legacy_check(client, image_bytes)
+            else:
+                profanity_filter.check_content(metadata, image_bytes, 'test-raw-bucket', 'raw/test.png',
+                                               policy=mode)
+            durations.append(time.perf_counter() - start)
+    return sum(durations) / len(durations)
+
+
+def run_policies(screenshots, latency):
+    """Llamadas y latencia por política y tipo de resultado"""
+    cases = [
+        ('aprobado', {'description': 'Boss fight', 'game_title': 'Test Game'}, 30.0),
+        ('rechazo metadata', {'description': 'Boss fight, you bitch', 'game_title': 'Test Game'}, 30.0),
+        ('rechazo visual', {'description': 'Boss fight', 'game_title': 'Test Game'}, 90.0)
+    ]
+    print(f"{'resultado':>17} {'política':>13} {'llamadas/img':>13} {'latencia ms':>12}")
+
+    local_reject_calls = 0
+    for name, metadata, moderation_confidence in cases:
+        for policy in ('full-report', 'early-reject'):
+            client = StubRekognition(latency, moderation_confidence)
+            profanity_filter.rekognition_client = client
+            avg = measure(policy, client, screenshots, metadata)
+            calls = client.calls / screenshots
+            print(f"{name:>17} {policy:>13} {calls:>13.1f} {avg * 1000:>12.1f}")
+            if name == 'rechazo metadata' and policy == 'early-reject':
+                local_reject_calls = calls
+    return local_reject_calls
+
+
+def run(screenshots, latency):
+    print(f"Latencia simulada por llamada: {latency * 1000:.0f} ms, {screenshots} screenshots")
+    print("-" * 70)
+    print(f"{'flujo':>11} {'llamadas/img':>13} {'latencia ms':>12} {'USD/1000 img':>13}")
+
+    results = {}
+    for mode in ('legacy', 'full-report'):
+        client = StubRekognition(latency)
+        profanity_filter.rekognition_client = client
+        avg = measure(mode, client, screenshots)
+        calls = client.calls / screenshots
+        results[mode] = (calls, avg)
+        print(f"{mode:>11} {calls:>13.1f} {avg * 1000:>12.1f} {calls * PRICE_PER_CALL * 1000:>13.2f}")
+
+    print("-" * 70)
+    legacy_calls, legacy_latency = results['legacy']
+    calls, avg = results['full-report']
+    print(f"Llamadas: -{(1 - calls / legacy_calls) * 100:.0f}%   "
+          f"Latencia: {legacy_latency / avg:.1f}x más rápida ({avg / latency:.2f} round-trips)")
+
+    print("-" * 70)
+    local_reject_calls = run_policies(screenshots, latency)
+    print("-" * 70)
+
+    if calls > 3 or avg > 1.5 * latency:
+        print("✗ El flujo actual supera 3 llamadas o 1.5 round-trips por screenshot")
+        return 1
+    if local_reject_calls:
+        print("✗ early-reject llamó a Rekognition con la metadata ya rechazada")
+        return 1
+    print("✓ Una llamada por API de Rekognition, en paralelo; early-reject corta en la primera etapa")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de llamadas a Rekognition en check_content")
+    parser.add_argument('--screenshots', type=int, default=20, help="Screenshots a verificar por flujo")
+    parser.add_argument('--latency-ms', type=float, default=150.0, help="Latencia simulada por llamada")
+    args = parser.parse_args()
+
+    sys.exit(run(args.screenshots, args.latency_ms / 1000))
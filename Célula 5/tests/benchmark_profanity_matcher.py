@@ -0,0 +1,108 @@
+"""
+Benchmark del matcher de palabras prohibidas (profanity_filter)
+Compara la búsqueda anterior (una subcadena por palabra de la lista, línea por
+línea del OCR) con el regex compilado (una pasada sobre todo el texto) para
+listas de distinto tamaño. Reporta el tiempo por screenshot, el costo de
+compilar la lista en el cold start y los falsos positivos de la búsqueda por
+subcadena sobre texto limpio.
+
+Uso: python tests/benchmark_profanity_matcher.py [--sizes 1000 10000] [--texts 200]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['RAW_BUCKET'] = 'test-raw-bucket'
+os.environ['PROCESSED_BUCKET'] = 'test-processed-bucket'
+os.environ['METADATA_TABLE'] = 'test-metadata-table'
+os.environ['NOTIFICATION_TOPIC_ARN'] = 'arn:aws:sns:us-east-1:123456789:test-topic'
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src/lambda'))
+
+import profanity_filter  # noqa: E402
+
+# Texto típico de HUD/menús de juegos (sin palabras prohibidas)
+CLEAN_WORDS = [
+    'game', 'over', 'level', 'score', 'player', 'health', 'ammo', 'mission', 'complete',
+    'class', 'pass', 'assassin', 'skill', 'robot', 'bottle', 'hello', 'grass', 'scunthorpe',
+    'continue', 'press', 'start', 'inventory', 'quest', 'boss', 'victory', 'defeat', 'map'
+]
+
+
+def legacy_find(words, lines):
+    """Búsqueda anterior: cada palabra como subcadena de cada línea"""
+    hits = []
+    for line in lines:
+        line = line.lower()
+        for word in words:
+            if word in line:
+                hits.append(word)
+                break
+    return hits
+
+
+def synthetic_wordlist(base, size, rng):
+    """Completar la lista real con palabras aleatorias hasta `size`"""
+    words = list(base)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    while len(words) < size:
+        word = ''.join(rng.choice(letters) for _ in range(rng.randint(5, 10)))
+        words.append(word + ('*' if rng.random() < 0.2 else ''))
+    return words
+
+
+def ocr_lines(rng, lines=12):
+    return [' '.join(rng.choice(CLEAN_WORDS) for _ in range(rng.randint(2, 6))) for _ in range(lines)]
+
+
+def timed(function, texts):
+    start = time.perf_counter()
+    results = [function(lines) for lines in texts]
+    return (time.perf_counter() - start) / len(texts), results
+
+
+def run(sizes, text_count, seed):
+    rng = random.Random(seed)
+    texts = [ocr_lines(rng) for _ in range(text_count)]
+    print(f"{text_count} screenshots de ~12 líneas de OCR sin palabras prohibidas")
+    print("-" * 78)
+    print(f"{'palabras':>9} {'compilar ms':>12} {'subcadena µs':>13} {'regex µs':>10} "
+          f"{'aceleración':>12} {'falsos +':>9}")
+
+    status = 0
+    for size in sizes:
+        words = synthetic_wordlist(profanity_filter.PROFANITY_LIST, size, rng)
+        start = time.perf_counter()
+        matcher = profanity_filter.ProfanityMatcher(words)
+        build = time.perf_counter() - start
+
+        plain = [word.rstrip('*') for word in words]
+        legacy_time, legacy_hits = timed(lambda lines: legacy_find(plain, lines), texts)
+        regex_time, regex_hits = timed(lambda lines: matcher.find_all('\n'.join(lines)), texts)
+        false_positives = sum(1 for hits in legacy_hits if hits)
+        print(f"{len(words):>9} {build * 1000:>12.1f} {legacy_time * 1e6:>13.1f} {regex_time * 1e6:>10.1f} "
+              f"{legacy_time / regex_time:>11.1f}x {false_positives:>9}")
+        if any(regex_hits):
+            status = 1
+
+    print("-" * 78)
+    print("falsos + = screenshots limpios que la búsqueda por subcadena rechazaba ('class' por 'ass')")
+    if status:
+        print("✗ El matcher compilado marcó texto limpio")
+    else:
+        print("✓ Sin falsos positivos en el matcher compilado")
+    return status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark del matcher de palabras prohibidas")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[0, 1000, 10000],
+                        help="Tamaños de lista a comparar (0 = la lista empaquetada)")
+    parser.add_argument('--texts', type=int, default=200, help="Screenshots simulados")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    sys.exit(run(args.sizes, args.texts, args.seed))
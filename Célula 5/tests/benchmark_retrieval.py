@@ -0,0 +1,158 @@
+"""
+Benchmark de get_user_screenshots (image_retrieval) con una mezcla de status
+Compara por página pedida (limit=50, status=APPROVED):
+  - query+filtro: query a user_id con Limit y filtro por status en Python (anterior)
+  - scan:         el fallback anterior, scan de la tabla con Limit y filtro
+  - UserStatusIndex: query con status#timestamp en la clave (actual)
+
+DynamoDB es simulado: cada request suma una latencia fija más un costo por
+item leído (los items leídos, no los retornados, son los que se cobran).
+
+Falla (exit 1) si el índice compuesto no llena la página o lee más items
+de los que retorna.
+
+Uso: python tests/benchmark_retrieval.py [--user-screenshots 2000] [--approved-ratio 0.1] [--table-items 100000]
+"""
+import os
+import sys
+import io
+import json
+import time
+import random
+import argparse
+import contextlib
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ['PROCESSED_BUCKET'] = 'test-processed-bucket'
+os.environ['METADATA_TABLE'] = 'test-metadata-table'
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src/lambda'))
+
+import image_retrieval  # noqa: E402
+from boto3.dynamodb.conditions import ConditionExpressionBuilder  # noqa: E402
+
+
+class StubTable:
+    """Query y scan sobre una lista en memoria, contando items leídos"""
+
+    def __init__(self, items, other_items, request_latency, item_latency, rng):
+        self.items = items
+        # Orden de la tabla para scan: los items del usuario repartidos entre los demás
+        self.table_order = other_items + items
+        rng.shuffle(self.table_order)
+        self.request_latency = request_latency
+        self.item_latency = item_latency
+        self.read = 0
+
+    def _wait(self, read):
+        self.read += read
+        time.sleep(self.request_latency + read * self.item_latency)
+
+    def query(self, **kwargs):
+        expression = ConditionExpressionBuilder().build_expression(kwargs['KeyConditionExpression'],
+                                                                  is_key_condition=True)
+        values = list(expression.attribute_value_placeholders.values())
+        prefix = values[1] if len(values) > 1 else ''
+        sort_key = 'status_timestamp' if kwargs['IndexName'] == 'UserStatusIndex' else 'upload_timestamp'
+        items = sorted((item for item in self.items if item[sort_key].startswith(prefix)),
+                       key=lambda item: item[sort_key], reverse=True)
+        if 'ExclusiveStartKey' in kwargs:
+            start = kwargs['ExclusiveStartKey'][sort_key]
+            items = [item for item in items if item[sort_key] < start]
+
+        page = items[:kwargs['Limit']]
+        self._wait(len(page))
+        response = {'Items': page}
+        if len(items) > kwargs['Limit']:
+            last = page[-1]
+            response['LastEvaluatedKey'] = {'screenshot_id': last['screenshot_id'], 'user_id': last['user_id'],
+                                            sort_key: last[sort_key]}
+        return response
+
+    def scan(self, **kwargs):
+        # Limit cuenta items evaluados antes del filtro; la tabla es de todos los usuarios
+        evaluated = self.table_order[:kwargs['Limit']]
+        self._wait(len(evaluated))
+        return {'Items': [item for item in evaluated if item['user_id'] == 'user-1']}
+
+
+class StubDynamoDB:
+    def __init__(self, table):
+        self.table = table
+
+    def Table(self, name):
+        return self.table
+
+
+def screenshots(user_id, count, approved_ratio, rng):
+    items = []
+    for i in range(count):
+        status = 'APPROVED' if rng.random() < approved_ratio else 'REJECTED'
+        timestamp = f'2025-11-26T{i:08d}'
+        items.append({'screenshot_id': f'{user_id}-{i}', 'user_id': user_id, 'status': status,
+                      'upload_timestamp': timestamp, 'status_timestamp': f'{status}#{timestamp}'})
+    return items
+
+
+def legacy_query(table, user_id, status, limit):
+    """get_user_screenshots anterior: Limit antes del filtro por status"""
+    response = table.query(IndexName='UserIdIndex', KeyConditionExpression=image_retrieval.Key('user_id').eq(user_id),
+                           ScanIndexForward=False, Limit=limit)
+    return [item for item in response['Items'] if item['status'] == status]
+
+
+def legacy_scan(table, user_id, status, limit):
+    """Fallback anterior cuando el índice no existía"""
+    items = table.scan(Limit=limit)['Items']
+    return [item for item in items if item['status'] == status]
+
+
+def current(table, user_id, status, limit):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return image_retrieval.get_user_screenshots(user_id, status, limit)[0]
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    items = screenshots('user-1', args.user_screenshots, args.approved_ratio, rng)
+    others = screenshots('user-2', args.table_items - args.user_screenshots, args.approved_ratio, rng)
+    approved = sum(1 for item in items if item['status'] == 'APPROVED')
+    table = StubTable(items, others, args.request_ms / 1000, args.item_us / 1e6, rng)
+    image_retrieval.dynamodb = StubDynamoDB(table)
+    image_retrieval.generate_signed_url = lambda *a, **kw: 'https://example.com/signed'
+
+    print(f"{args.user_screenshots} screenshots del usuario ({approved} aprobados), "
+          f"tabla de {args.table_items} items, limit={args.limit}")
+    print("-" * 66)
+    print(f"{'estrategia':>16} {'retornados':>11} {'items leídos':>13} {'latencia ms':>12}")
+
+    results = {}
+    for name, strategy in (('query+filtro', legacy_query), ('scan', legacy_scan), ('UserStatusIndex', current)):
+        table.read = 0
+        start = time.perf_counter()
+        page = strategy(table, 'user-1', 'APPROVED', args.limit)
+        elapsed = time.perf_counter() - start
+        results[name] = (len(page), table.read)
+        print(f"{name:>16} {len(page):>11} {table.read:>13} {elapsed * 1000:>12.1f}")
+    print("-" * 66)
+
+    returned, read = results['UserStatusIndex']
+    if returned < min(args.limit, approved) or read > returned:
+        print("✗ UserStatusIndex no llena la página o lee items de otros status")
+        return 1
+    print(f"✓ Página completa de {returned} aprobados leyendo solo esos items")
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Páginas por status en get_user_screenshots")
+    parser.add_argument('--user-screenshots', type=int, default=2000, help="Screenshots del usuario")
+    parser.add_argument('--approved-ratio', type=float, default=0.1, help="Fracción aprobada")
+    parser.add_argument('--table-items', type=int, default=100000, help="Items en la tabla (todos los usuarios)")
+    parser.add_argument('--limit', type=int, default=50, help="Tamaño de página")
+    parser.add_argument('--request-ms', type=float, default=8.0, help="Latencia por request a DynamoDB")
+    parser.add_argument('--item-us', type=float, default=20.0, help="Latencia por item leído")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    sys.exit(run(args))
@@ -0,0 +1,103 @@
+"""
+Benchmark de generación de thumbnails (src/index.py)
+Compara por screenshot:
+  - anterior: decodificar la imagen completa por cada tamaño, thumbnail() y
+              guardar en el formato original
+  - actual:   una decodificación con draft(), cada tamaño reducido desde el
+              anterior (reduce + LANCZOS) y codificado en WebP
+
+Usa screenshots sintéticos (gradiente + ruido) en JPEG y PNG. Reporta tiempo
+de CPU y bytes totales de los thumbnails.
+
+Falla (exit 1) si el flujo actual es más lento o genera más bytes.
+
+Uso: python tests/benchmark_thumbnails.py [--width 1920 --height 1080] [--repeat 5]
+"""
+import os
+import sys
+import io
+import time
+import random
+import argparse
+
+os.environ['PROCESSED_BUCKET'] = 'test-processed-bucket'
+os.environ['METADATA_TABLE'] = 'test-metadata-table'
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+from PIL import Image  # noqa: E402
+import index  # noqa: E402
+
+
+def screenshot(width, height, image_format, seed):
+    """Gradiente con ruido: se comprime como una captura real, no como un color plano"""
+    rng = random.Random(seed)
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.frombytes('L', (width, height), bytes(rng.getrandbits(6) for _ in range(width * height)))
+    image = Image.merge('RGB', (gradient, noise, gradient.rotate(180)))
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format, **({'quality': 90} if image_format == 'JPEG' else {}))
+    return buffer.getvalue()
+
+
+def legacy_thumbnails(data, sizes):
+    """Una decodificación completa por tamaño, en el formato original"""
+    total = 0
+    for size in sizes:
+        with Image.open(io.BytesIO(data)) as img:
+            img_format = img.format
+            img.load()
+            img.thumbnail((size, size))
+            buffer = io.BytesIO()
+            img.save(buffer, format=img_format)
+            total += buffer.tell()
+    return total
+
+
+def current_thumbnails(data, sizes):
+    with Image.open(io.BytesIO(data)) as img:
+        return sum(len(encoded) for _, encoded, _ in index.create_thumbnails(img))
+
+
+def timed(function, data, sizes, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        total = function(data, sizes)
+    return (time.process_time() - start) / repeat, total
+
+
+def run(args):
+    sizes = index.THUMBNAIL_SIZES
+    print(f"Screenshot {args.width}x{args.height}, tamaños {sorted(sizes)}, promedio de {args.repeat}")
+    print("-" * 62)
+    print(f"{'formato':>8} {'flujo':>9} {'CPU ms':>8} {'KB thumbnails':>14} {'vs anterior':>12}")
+
+    status = 0
+    for image_format in ('JPEG', 'PNG'):
+        data = screenshot(args.width, args.height, image_format, args.seed)
+        legacy_time, legacy_bytes = timed(legacy_thumbnails, data, sizes, args.repeat)
+        current_time, current_bytes = timed(current_thumbnails, data, sizes, args.repeat)
+        print(f"{image_format:>8} {'anterior':>9} {legacy_time * 1000:>8.1f} {legacy_bytes / 1024:>14.1f} {'':>12}")
+        print(f"{image_format:>8} {'actual':>9} {current_time * 1000:>8.1f} {current_bytes / 1024:>14.1f} "
+              f"{legacy_time / current_time:>11.1f}x")
+        if current_time >= legacy_time or current_bytes >= legacy_bytes:
+            status = 1
+
+    print("-" * 62)
+    if status:
+        print("✗ El flujo actual no reduce CPU o bytes")
+    else:
+        print("✓ Una decodificación y WebP: menos CPU y thumbnails más livianos")
+    return status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark de thumbnails")
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    sys.exit(run(args))
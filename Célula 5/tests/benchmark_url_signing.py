@@ -0,0 +1,142 @@
+"""
+Benchmark del costo de firmar una página de la galería (image_retrieval)
+Compara por página de N screenshots:
+  - s3:         URL pre-firmada de S3 (SigV4) por item
+  - cloudfront: URL firmada de CloudFront (RSA-SHA1, política canned) por item
+cada uno sin caché (anterior / primera carga) y con la caché por contenedor
+(recargas de la galería dentro de la misma ventana).
+
+Las firmas son reales (botocore y cryptography) con credenciales y llave de
+prueba; no hay llamadas a AWS.
+
+Falla (exit 1) si una recarga vuelve a firmar o no es más rápida.
+
+Uso: python tests/benchmark_url_signing.py [--page-size 100] [--pages 20]
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ['PROCESSED_BUCKET'] = 'test-processed-bucket'
+os.environ['METADATA_TABLE'] = 'test-metadata-table'
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src/lambda'))
+
+import boto3  # noqa: E402
+from botocore.config import Config  # noqa: E402
+import image_retrieval  # noqa: E402
+
+
+class CountingS3:
+    """S3 real para pre-firmar; `signed` cuenta también las firmas RSA de CloudFront"""
+
+    def __init__(self):
+        self.client = boto3.client('s3', config=Config(signature_version='s3v4'))
+        self.signed = 0
+
+    def generate_presigned_url(self, *args, **kwargs):
+        self.signed += 1
+        return self.client.generate_presigned_url(*args, **kwargs)
+
+
+class StubSecretsManager:
+    def __init__(self, pem):
+        self.pem = pem
+
+    def get_secret_value(self, SecretId):
+        return {'SecretString': self.pem}
+
+
+def configure(mode, s3):
+    image_retrieval.s3_client = s3
+    image_retrieval.cloudfront_signer = None
+    image_retrieval.url_cache.clear()
+    if mode == 'cloudfront':
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption()).decode()
+        image_retrieval.secrets_client = StubSecretsManager(pem)
+        image_retrieval.CLOUDFRONT_DOMAIN = 'd111111abcdef8.cloudfront.net'
+        image_retrieval.CLOUDFRONT_KEY_PAIR_ID = 'K2JCJMDEHXQW5F'
+        signer = image_retrieval.get_cloudfront_signer()  # La llave se carga una vez por contenedor
+        rsa_signer = signer.rsa_signer
+
+        def counting_rsa_signer(message):
+            s3.signed += 1
+            return rsa_signer(message)
+        signer.rsa_signer = counting_rsa_signer
+    else:
+        image_retrieval.CLOUDFRONT_DOMAIN = ''
+        image_retrieval.CLOUDFRONT_KEY_PAIR_ID = ''
+
+
+def sign_page(page_size):
+    for i in range(page_size):
+        image_retrieval.generate_signed_url(f'raw/user-1/{i:04d}.png', 'test-raw-bucket', f'version-{i}')
+
+
+def measure(mode, cached, args):
+    s3 = CountingS3()
+    configure(mode, s3)
+    if cached:
+        sign_page(args.page_size)  # Primera carga de la galería
+
+    durations = []
+    signed_before = s3.signed
+    for _ in range(args.pages):
+        if not cached:
+            image_retrieval.url_cache.clear()
+        start = time.perf_counter()
+        sign_page(args.page_size)
+        durations.append(time.perf_counter() - start)
+
+    return sum(durations) / len(durations), (s3.signed - signed_before) / args.pages
+
+
+def run(args):
+    modes = ['s3']
+    if image_retrieval.serialization is not None:
+        modes.append('cloudfront')
+    else:
+        print("cryptography no instalado, se omite CloudFront")
+
+    print(f"Páginas de {args.page_size} screenshots, promedio de {args.pages} páginas")
+    print("-" * 58)
+    print(f"{'firma':>11} {'caché':>6} {'ms/página':>10} {'firmas/página':>14} {'µs/item':>9}")
+
+    status = 0
+    for mode in modes:
+        results = {}
+        for cached in (False, True):
+            elapsed, signatures = measure(mode, cached, args)
+            results[cached] = elapsed
+            print(f"{mode:>11} {'sí' if cached else 'no':>6} {elapsed * 1000:>10.2f} {signatures:>14.0f} "
+                  f"{elapsed / args.page_size * 1e6:>9.1f}")
+            if cached and signatures:
+                status = 1
+        if results[True] >= results[False]:
+            status = 1
+    print("-" * 58)
+
+    image_retrieval.CLOUDFRONT_DOMAIN = ''
+    image_retrieval.CLOUDFRONT_KEY_PAIR_ID = ''
+    if status:
+        print("✗ La recarga de la galería volvió a firmar URLs")
+    else:
+        print("✓ Las recargas dentro de la ventana reutilizan las firmas")
+    return status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Costo de firmar una página de la galería")
+    parser.add_argument('--page-size', type=int, default=100, help="Screenshots por página")
+    parser.add_argument('--pages', type=int, default=20, help="Páginas a promediar")
+    args = parser.parse_args()
+
+    sys.exit(run(args))
@@ -6,8 +6,10 @@ import sys
 
 tests = [
     'tests/test_image_uploader.py',
+    'tests/test_upload_url.py',
     'tests/test_profanity_filter.py',
-    'tests/test_image_retrieval.py'
+    'tests/test_image_retrieval.py',
+    'tests/test_thumbnails.py'
 ]
 
 print("="*60)
@@ -3,6 +3,7 @@ Test local para ImageRetrieval Lambda
 Simula el evento de API Gateway
 """
 import json
+import base64
 import sys
 import os
 
@@ -18,49 +19,87 @@ class MockDynamoDB:
         return MockTable(name)
 
 class MockTable:
+    # Screenshots de ejemplo (se filtran y ordenan como lo haría el GSI)
+    items = [
+        {
+            'screenshot_id': 'screenshot-1',
+            'user_id': 'test-user-123',
+            'game_title': 'Game 1',
+            'description': 'Epic moment',
+            'upload_timestamp': '2025-11-26T10:00:00Z',
+            'status': 'APPROVED',
+            'status_timestamp': 'APPROVED#2025-11-26T10:00:00Z',
+            'processed_s3_key': 'processed/test-user-123/screenshot-1.png',
+            'file_size': 1024000
+        },
+        {
+            'screenshot_id': 'screenshot-2',
+            'user_id': 'test-user-123',
+            'game_title': 'Game 2',
+            'description': 'Victory',
+            'upload_timestamp': '2025-11-26T11:00:00Z',
+            'status': 'APPROVED',
+            'status_timestamp': 'APPROVED#2025-11-26T11:00:00Z',
+            'processed_s3_key': 'processed/test-user-123/screenshot-2.png',
+            'file_size': 2048000
+        }
+    ]
+    queries = []
+    
     def __init__(self, name):
         self.name = name
     
-    def scan(self, **kwargs):
-        print(f"[MOCK DynamoDB] Scanning tabla {self.name}")
-        print(f"FilterExpression: {kwargs.get('FilterExpression')}")
+    def query(self, **kwargs):
+        print(f"[MOCK DynamoDB] Query en {kwargs['IndexName']} de tabla {self.name}")
+        MockTable.queries.append(kwargs)
+        expression = ConditionExpressionBuilder().build_expression(kwargs['KeyConditionExpression'],
+                                                                  is_key_condition=True)
+        values = list(expression.attribute_value_placeholders.values())
+        user_id, prefix = values[0], (values[1] if len(values) > 1 else '')
+        sort_key = 'status_timestamp' if kwargs['IndexName'] == 'UserStatusIndex' else 'upload_timestamp'
         
-        # Retornar screenshots de ejemplo
-        return {
-            'Items': [
-                {
-                    'screenshot_id': 'screenshot-1',
-                    'user_id': 'test-user-123',
-                    'game_title': 'Game 1',
-                    'description': 'Epic moment',
-                    'upload_timestamp': '2025-11-26T10:00:00Z',
-                    'status': 'APPROVED',
-                    'processed_s3_key': 'processed/test-user-123/screenshot-1.png',
-                    'file_size': 1024000
-                },
-                {
-                    'screenshot_id': 'screenshot-2',
-                    'user_id': 'test-user-123',
-                    'game_title': 'Game 2',
-                    'description': 'Victory',
-                    'upload_timestamp': '2025-11-26T11:00:00Z',
-                    'status': 'APPROVED',
-                    'processed_s3_key': 'processed/test-user-123/screenshot-2.png',
-                    'file_size': 2048000
-                }
-            ]
-        }
+        items = [item for item in self.items
+                 if item['user_id'] == user_id and item.get(sort_key, '').startswith(prefix)]
+        items.sort(key=lambda item: item[sort_key], reverse=not kwargs.get('ScanIndexForward', True))
+        if 'ExclusiveStartKey' in kwargs:
+            start = kwargs['ExclusiveStartKey']['screenshot_id']
+            items = items[[item['screenshot_id'] for item in items].index(start) + 1:]
+        
+        page = items[:kwargs['Limit']]
+        response = {'Items': page}
+        if len(items) > kwargs['Limit']:
+            last = page[-1]
+            response['LastEvaluatedKey'] = {'screenshot_id': last['screenshot_id'], 'user_id': last['user_id'],
+                                            sort_key: last[sort_key]}
+        return response
+    
+    def scan(self, **kwargs):
+        raise AssertionError('get_user_screenshots no debe hacer scan')
 
 class MockS3:
+    signed = 0
+    
     def generate_presigned_url(self, operation, Params, ExpiresIn):
         print(f"[MOCK S3] Generando URL firmada para: {Params['Key']}")
+        MockS3.signed += 1
         return f"https://mock-s3-url.com/{Params['Key']}?expires={ExpiresIn}"
 
+class MockSecretsManager:
+    def __init__(self, pem):
+        self.pem = pem
+        self.reads = 0
+    
+    def get_secret_value(self, SecretId):
+        self.reads += 1
+        return {'SecretString': self.pem}
+
 import boto3
+from boto3.dynamodb.conditions import ConditionExpressionBuilder
 boto3.client = lambda service: MockS3()
 boto3.resource = lambda service: MockDynamoDB()
 
-from image_retrieval import lambda_handler
+import image_retrieval
+from image_retrieval import lambda_handler, generate_signed_url
 
 def test_retrieval_success():
     """Test de recuperación exitosa"""
@@ -123,15 +162,7 @@ def test_retrieval_empty_results():
     """Test con resultados vacíos"""
     print("\n=== TEST: Resultados Vacíos ===\n")
     
-    # Mock que retorna vacío
-    original_scan = MockTable.scan
-    
-    def scan_empty(self, **kwargs):
-        print(f"[MOCK DynamoDB] Scanning tabla {self.name} (vacío)")
-        return {'Items': []}
-    
-    MockTable.scan = scan_empty
-    
+    # Usuario sin screenshots: el query no retorna items
     event = {
         'requestContext': {
             'authorizer': {
@@ -154,9 +185,123 @@ def test_retrieval_empty_results():
     body = json.loads(response['body'])
     assert body['count'] == 0
     print("\n✅ Test pasado!")
+
+def test_retrieval_status_pages():
+    """Páginas completas del status pedido aunque el usuario tenga muchos rechazados"""
+    print("\n=== TEST: Paginación por status ===\n")
+    
+    original_items = MockTable.items
+    MockTable.items = [
+        {
+            'screenshot_id': f'screenshot-{i}',
+            'user_id': 'test-user-123',
+            'upload_timestamp': f'2025-11-26T10:{i:02d}:00Z',
+            'status': status,
+            'status_timestamp': f'{status}#2025-11-26T10:{i:02d}:00Z',
+            'processed_s3_key': f'processed/test-user-123/screenshot-{i}.png'
+        }
+        for i in range(30)
+        for status in [('APPROVED' if i % 6 == 0 else 'REJECTED')]
+    ]
+    
+    def request(params):
+        event = {
+            'requestContext': {'authorizer': {'claims': {'sub': 'test-user-123'}}},
+            'queryStringParameters': params
+        }
+        response = lambda_handler(event, {})
+        return response['statusCode'], json.loads(response['body'])
+    
+    try:
+        MockTable.queries = []
+        status, first = request({'status': 'APPROVED', 'limit': '3'})
+        assert status == 200, first
+        assert [s['screenshot_id'] for s in first['screenshots']] == ['screenshot-24', 'screenshot-18', 'screenshot-12']
+        assert first['next_cursor']
+        assert MockTable.queries[-1]['IndexName'] == 'UserStatusIndex'
+        
+        status, second = request({'status': 'APPROVED', 'limit': '3', 'cursor': first['next_cursor']})
+        assert status == 200, second
+        assert [s['screenshot_id'] for s in second['screenshots']] == ['screenshot-6', 'screenshot-0']
+        assert second['next_cursor'] is None
+        
+        # Sin status: todos los screenshots por fecha en UserIdIndex
+        status, everything = request({'status': '', 'limit': '5'})
+        assert status == 200, everything
+        assert everything['count'] == 5
+        assert MockTable.queries[-1]['IndexName'] == 'UserIdIndex'
+        
+        # Cursor ilegible o de otro usuario
+        assert request({'cursor': 'not-a-cursor'})[0] == 400
+        _, other = request({'status': 'APPROVED', 'limit': '1'})
+        foreign = json.loads(base64.urlsafe_b64decode(other['next_cursor']))
+        foreign['user_id'] = 'other-user'
+        assert request({'cursor': base64.urlsafe_b64encode(json.dumps(foreign).encode()).decode()})[0] == 400
+    finally:
+        MockTable.items = original_items
+    print("\n✅ Test pasado!")
+
+def test_signed_url_cache():
+    """Una firma por objeto y ventana; CloudFront firmado con la llave leída una vez"""
+    print("\n=== TEST: Caché de URLs firmadas ===\n")
+    
+    image_retrieval.url_cache.clear()
+    MockS3.signed = 0
+    first = generate_signed_url('raw/test-user-123/a.png', 'test-raw-bucket', 'v1')
+    assert generate_signed_url('raw/test-user-123/a.png', 'test-raw-bucket', 'v1') == first
+    assert MockS3.signed == 1
+    expires_in = int(first.split('expires=')[1])
+    assert image_retrieval.URL_EXPIRATION <= expires_in <= image_retrieval.URL_EXPIRATION + image_retrieval.URL_CACHE_WINDOW
+    
+    if image_retrieval.serialization is None:
+        print("cryptography no instalado, se omite CloudFront")
+        print("\n✅ Test pasado!")
+        return
+    
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding, rsa
     
-    # Restaurar mock
-    MockTable.scan = original_scan
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                    serialization.NoEncryption()).decode()
+    secrets = MockSecretsManager(pem)
+    original_secrets = image_retrieval.secrets_client
+    original_time = image_retrieval.time.time
+    image_retrieval.secrets_client = secrets
+    image_retrieval.CLOUDFRONT_DOMAIN = 'd111111abcdef8.cloudfront.net'
+    image_retrieval.CLOUDFRONT_KEY_PAIR_ID = 'K2JCJMDEHXQW5F'
+    image_retrieval.cloudfront_signer = None
+    image_retrieval.url_cache.clear()
+    try:
+        urls = [generate_signed_url(f'raw/test-user-123/{i}.png', 'test-raw-bucket', 'v1') for i in range(3)]
+        assert [generate_signed_url(f'raw/test-user-123/{i}.png', 'test-raw-bucket', 'v1') for i in range(3)] == urls
+        assert secrets.reads == 1
+        
+        url = urls[0]
+        print(f"URL: {url}")
+        assert url.startswith('https://d111111abcdef8.cloudfront.net/raw/test-user-123/0.png?versionId=v1&Expires=')
+        assert 'Key-Pair-Id=K2JCJMDEHXQW5F' in url
+        # La firma corresponde a la política canned de la URL
+        params = dict(part.split('=', 1) for part in url.split('?', 1)[1].split('&'))
+        resource = url.split('&Expires=')[0]
+        policy = ('{"Statement":[{"Resource":"%s","Condition":{"DateLessThan":{"AWS:EpochTime":%s}}}]}'
+                  % (resource, params['Expires']))
+        signature = base64.b64decode(params['Signature'].replace('-', '+').replace('_', '=').replace('~', '/'))
+        private_key.public_key().verify(signature, policy.encode(), padding.PKCS1v15(), hashes.SHA1())
+        
+        # En la ventana siguiente se firma de nuevo, con otro vencimiento
+        image_retrieval.time.time = lambda: original_time() + image_retrieval.URL_CACHE_WINDOW
+        renewed = generate_signed_url('raw/test-user-123/0.png', 'test-raw-bucket', 'v1')
+        assert renewed != url
+        assert len(image_retrieval.url_cache) == 1
+    finally:
+        image_retrieval.time.time = original_time
+        image_retrieval.secrets_client = original_secrets
+        image_retrieval.CLOUDFRONT_DOMAIN = ''
+        image_retrieval.CLOUDFRONT_KEY_PAIR_ID = ''
+        image_retrieval.cloudfront_signer = None
+        image_retrieval.url_cache.clear()
+    print("\n✅ Test pasado!")
 
 if __name__ == '__main__':
     print("🧪 Iniciando tests de ImageRetrieval...\n")
@@ -165,6 +310,8 @@ if __name__ == '__main__':
         test_retrieval_success()
         test_retrieval_no_params()
         test_retrieval_empty_results()
+        test_retrieval_status_pages()
+        test_signed_url_cache()
         
         print("\n" + "="*50)
         print("✅ TODOS LOS TESTS PASARON")
@@ -5,6 +5,7 @@ Simula el evento de SNS
 import json
 import sys
 import os
+from botocore.exceptions import ClientError
 
 # Configurar variables de entorno ANTES de importar
 os.environ['RAW_BUCKET'] = 'test-raw-bucket'
@@ -16,16 +17,37 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src/lambda'))
 
 # Mocks
 class MockS3:
+    def __init__(self):
+        self.downloads = 0
+        self.ranges = []
+        self.copies = []
+        self.tags = []
+    
     def get_object(self, **kwargs):
         print(f"[MOCK S3] Obteniendo de bucket: {kwargs['Bucket']}, key: {kwargs['Key']}")
+        self.downloads += 1
+        self.ranges.append(kwargs.get('Range'))
         # Retornar imagen fake
         class Body:
             def read(self):
                 return b'fake_image_data'
         return {'Body': Body()}
     
+    def head_object(self, **kwargs):
+        return {'ContentLength': len(b'fake_image_data')}
+    
     def copy_object(self, **kwargs):
         print(f"[MOCK S3] Copiando a bucket: {kwargs['Bucket']}, key: {kwargs['Key']}")
+        self.copies.append('copy_object')
+        return {}
+    
+    def copy(self, source, bucket, key, **kwargs):
+        print(f"[MOCK S3] Copia multipart a bucket: {bucket}, key: {key}")
+        self.copies.append('multipart')
+    
+    def put_object_tagging(self, **kwargs):
+        print(f"[MOCK S3] Tag {kwargs['Tagging']['TagSet']} en key: {kwargs['Key']}")
+        self.tags.append((kwargs['Key'], kwargs.get('VersionId'), kwargs['Tagging']['TagSet'][0]['Value']))
         return {}
 
 class MockDynamoDB:
@@ -33,6 +55,8 @@ class MockDynamoDB:
         return MockTable(name)
 
 class MockTable:
+    updates = []
+    
     def __init__(self, name):
         self.name = name
     
@@ -44,6 +68,7 @@ class MockTable:
                 'user_id': 'test-user-123',
                 'description': 'Clean description',
                 'game_title': 'Test Game',
+                'upload_timestamp': '2025-11-26T10:00:00',
                 'status': 'PROCESSING'
             }
         }
@@ -52,6 +77,7 @@ class MockTable:
         print(f"[MOCK DynamoDB] Actualizando item en tabla {self.name}")
         print(f"UpdateExpression: {kwargs.get('UpdateExpression')}")
         print(f"Values: {kwargs.get('ExpressionAttributeValues')}")
+        MockTable.updates.append(kwargs)
         return {}
 
 class MockSNS:
@@ -60,11 +86,43 @@ class MockSNS:
         print(f"Mensaje: {kwargs['Message']}")
         return {'MessageId': 'mock-message-id'}
 
+class MockRekognition:
+    def __init__(self):
+        self.calls = []
+        self.images = []
+        self.moderation_labels = []
+        self.s3_object_error = None
+    
+    def _image(self, kwargs):
+        image = kwargs['Image']
+        if 'S3Object' in image and self.s3_object_error:
+            raise ClientError({'Error': {'Code': self.s3_object_error, 'Message': 'Mock error'}}, 'Detect')
+        self.images.append('S3Object' if 'S3Object' in image else 'Bytes')
+    
+    def detect_labels(self, **kwargs):
+        self._image(kwargs)
+        self.calls.append('detect_labels')
+        return {'Labels': [{'Name': 'Video Gaming', 'Confidence': 95.0}]}
+    
+    def detect_moderation_labels(self, **kwargs):
+        self._image(kwargs)
+        self.calls.append('detect_moderation_labels')
+        min_confidence = kwargs.get('MinConfidence', 50.0)
+        return {'ModerationLabels': [l for l in self.moderation_labels if l['Confidence'] >= min_confidence]}
+    
+    def detect_text(self, **kwargs):
+        self._image(kwargs)
+        self.calls.append('detect_text')
+        return {'TextDetections': []}
+
+mock_rekognition = MockRekognition()
+
 import boto3
-boto3.client = lambda service: MockS3() if service == 's3' else MockSNS()
-boto3.resource = lambda service: MockDynamoDB()
+boto3.client = lambda service, **kwargs: {'s3': MockS3(), 'rekognition': mock_rekognition}.get(service, MockSNS())
+boto3.resource = lambda service, **kwargs: MockDynamoDB()
 
-from profanity_filter import lambda_handler
+import profanity_filter
+from profanity_filter import lambda_handler, check_content, profanity_matcher
 
 def test_filter_approved():
     """Test de contenido aprobado"""
@@ -109,6 +167,7 @@ def test_filter_rejected():
                 'user_id': 'test-user-123',
                 'description': 'This contains badword1',  # Palabra prohibida
                 'game_title': 'Test Game',
+                'upload_timestamp': '2025-11-26T10:00:00',
                 'status': 'PROCESSING'
             }
         }
@@ -143,12 +202,256 @@ def test_filter_rejected():
     # Restaurar mock original
     MockTable.get_item = original_get_item
 
+def test_single_moderation_call():
+    """Una sola llamada a DetectModerationLabels; el umbral se aplica localmente"""
+    print("\n=== TEST: Una llamada por API de Rekognition ===\n")
+    
+    metadata = {'description': 'Clean description', 'game_title': 'Test Game'}
+    mock_rekognition.calls = []
+    mock_rekognition.moderation_labels = [
+        {'Name': 'Smoking', 'ParentName': 'Drugs & Tobacco', 'Confidence': 52.0},
+        {'Name': 'Weapons', 'ParentName': 'Violence', 'Confidence': 20.0}
+    ]
+    
+    is_appropriate, reasons = check_content(metadata, b'fake_image_data', 'test-raw-bucket', 'raw/test.png')
+    
+    print(f"Llamadas: {sorted(mock_rekognition.calls)}")
+    assert sorted(mock_rekognition.calls) == ['detect_labels', 'detect_moderation_labels', 'detect_text']
+    # 52% supera MIN_CONFIDENCE_MODERATION pero no REJECT_CONFIDENCE_THRESHOLD
+    assert is_appropriate, reasons
+    
+    mock_rekognition.moderation_labels = [
+        {'Name': 'Smoking', 'ParentName': 'Drugs & Tobacco', 'Confidence': 80.0}
+    ]
+    is_appropriate, reasons = check_content(metadata, b'fake_image_data', 'test-raw-bucket', 'raw/test.png')
+    assert not is_appropriate
+    assert reasons == ['Inappropriate visual content: Smoking (Drugs & Tobacco) - 80.0% confidence']
+    
+    mock_rekognition.moderation_labels = []
+    print("\n✅ Test pasado!")
+
+def test_profanity_matcher():
+    """Palabras completas, prefijos con * y leetspeak en una sola pasada"""
+    print("\n=== TEST: Matcher de palabras prohibidas ===\n")
+    
+    # Subcadenas dentro de palabras inocentes no se marcan
+    assert profanity_matcher.find_all('First class pass, assassin build') == []
+    assert profanity_matcher.find_all('Robot Wars: Essex edition') == []
+    # Números del HUD (puntaje, vida, munición) no son leetspeak
+    assert profanity_matcher.find_all('Score: 455') == []
+    assert profanity_matcher.find_all('HP 455/500') == []
+    assert profanity_matcher.find_all('Ammo 455') == []
+    assert profanity_matcher.find_all('level 455 complete') == []
+    # Leetspeak y variantes de una entrada con prefijo
+    assert profanity_matcher.find_all('what an a$$') == ['ass']
+    assert profanity_matcher.find_all('a55 and @ss') == ['ass']
+    assert profanity_matcher.find_all('SH1T, fucking noob') == ['shit', 'fuck']
+    assert profanity_matcher.find_all('kill kills killed') == ['kill']
+    assert profanity_matcher.find_all('badword1 here') == ['badword1']
+    
+    metadata = {'description': 'Such a fucking cheater', 'game_title': 'Test Game'}
+    mock_rekognition.calls = []
+    is_appropriate, reasons = check_content(metadata, b'fake_image_data', 'test-raw-bucket', 'raw/test.png')
+    print(f"Razones: {reasons}")
+    assert not is_appropriate
+    assert 'Inappropriate text in description: fuck' in reasons
+    assert 'Inappropriate text in description: cheat' in reasons
+    print("\n✅ Test pasado!")
+
+def test_sqs_batch_partial_failure():
+    """Lote de SQS: solo el registro que falla vuelve en batchItemFailures"""
+    print("\n=== TEST: Lote de SQS con fallo parcial ===\n")
+    
+    def sqs_record(message_id, screenshot_id, envelope=False):
+        message = json.dumps({
+            'screenshot_id': screenshot_id,
+            'user_id': 'test-user-123',
+            's3_key': f'raw/test-user-123/{screenshot_id}.png',
+            'bucket': 'test-raw-bucket'
+        })
+        if envelope:
+            # Suscripción sin RawMessageDelivery: el cuerpo es el sobre de SNS
+            message = json.dumps({'Type': 'Notification', 'TopicArn': 'arn:aws:sns:us-east-1:123456789:filter',
+                                  'Message': message})
+        return {'messageId': message_id, 'eventSource': 'aws:sqs', 'body': message}
+    
+    original_get_item = MockTable.get_item
+    
+    def get_item_or_fail(self, Key):
+        if Key['screenshot_id'] == 'missing-screenshot':
+            raise KeyError('Item')
+        return original_get_item(self, Key)
+    
+    MockTable.get_item = get_item_or_fail
+    try:
+        response = lambda_handler({'Records': [
+            sqs_record('msg-1', 'screenshot-1'),
+            sqs_record('msg-2', 'missing-screenshot'),
+            sqs_record('msg-3', 'screenshot-3', envelope=True)
+        ]}, {})
+    finally:
+        MockTable.get_item = original_get_item
+    
+    print(f"Respuesta: {response}")
+    assert response == {'batchItemFailures': [{'itemIdentifier': 'msg-2'}]}
+    print("\n✅ Test pasado!")
+
+def test_s3_object_reference():
+    """Rekognition lee la imagen de S3; los bytes se descargan una vez solo si falla el S3Object"""
+    print("\n=== TEST: S3Object en lugar de bytes ===\n")
+    
+    metadata = {'description': 'Clean description', 'game_title': 'Test Game', 'file_size': 2048}
+    s3 = profanity_filter.s3_client
+    downloads = s3.downloads
+    mock_rekognition.calls = []
+    mock_rekognition.images = []
+    is_appropriate, reasons = check_content(metadata, None, 'test-raw-bucket', 'raw/test.png')
+    assert is_appropriate, reasons
+    assert mock_rekognition.images == ['S3Object'] * 3
+    assert s3.downloads == downloads
+    
+    mock_rekognition.images = []
+    mock_rekognition.s3_object_error = 'InvalidS3ObjectException'
+    is_appropriate, reasons = check_content(metadata, None, 'test-raw-bucket', 'raw/test.png')
+    mock_rekognition.s3_object_error = None
+    assert is_appropriate, reasons
+    assert mock_rekognition.images == ['Bytes'] * 3
+    assert s3.downloads == downloads + 1
+    
+    # Con blocklist el hash lee una vez (acotado) y Rekognition sigue usando el S3Object
+    original_blocklist = profanity_filter.blocked_hashes
+    profanity_filter.blocked_hashes = [0]
+    mock_rekognition.images = []
+    is_appropriate, reasons = check_content(metadata, None, 'test-raw-bucket', 'raw/test.png')
+    profanity_filter.blocked_hashes = original_blocklist
+    assert is_appropriate, reasons
+    assert mock_rekognition.images == ['S3Object'] * 3
+    assert s3.downloads == downloads + 2
+    assert s3.ranges[-1] == f"bytes=0-{profanity_filter.MAX_FILE_SIZE - 1}"
+    
+    # Sobre 5MB Rekognition no acepta Bytes: falla en lugar de aprobar sin moderar
+    large = dict(metadata, file_size=6 * 1024 * 1024)
+    mock_rekognition.images = []
+    mock_rekognition.s3_object_error = 'AccessDeniedException'
+    try:
+        check_content(large, None, 'test-raw-bucket', 'raw/test.png')
+        assert False, 'Una imagen sin moderar no debe aprobarse'
+    except ValueError as error:
+        print(f"Error esperado: {error}")
+    finally:
+        mock_rekognition.s3_object_error = None
+    assert mock_rekognition.images == []
+    assert s3.downloads == downloads + 2
+    try:
+        check_content(metadata, b'x' * (6 * 1024 * 1024), 'test-raw-bucket', 'raw/test.png', policy='full-report')
+        assert False, 'Una imagen sin moderar no debe aprobarse'
+    except ValueError as error:
+        print(f"Error esperado: {error}")
+    print("\n✅ Test pasado!")
+
+def test_approval_modes():
+    """Modo tag: aprobar solo marca el objeto raw; modo copy: copia, multipart si es grande"""
+    print("\n=== TEST: Aprobación sin copia ===\n")
+    
+    s3 = profanity_filter.s3_client
+    original_get_item = MockTable.get_item
+    
+    def get_item_with_version(self, Key):
+        item = original_get_item(self, Key)['Item']
+        item.update({'raw_version_id': 'v1', 'file_size': 12 * 1024 * 1024})
+        return {'Item': item}
+    
+    event = {'Records': [{'Sns': {'Message': json.dumps({
+        'screenshot_id': 'test-screenshot-789',
+        'user_id': 'test-user-123',
+        's3_key': 'raw/test-user-123/test.png',
+        'bucket': 'test-raw-bucket'
+    })}}]}
+    
+    MockTable.get_item = get_item_with_version
+    try:
+        s3.copies, s3.tags, MockTable.updates = [], [], []
+        lambda_handler(event, {})
+        values = MockTable.updates[-1]['ExpressionAttributeValues']
+        assert s3.copies == []
+        assert s3.tags == [('raw/test-user-123/test.png', 'v1', 'approved')]
+        assert values[':processed_bucket'] == 'test-raw-bucket'
+        assert values[':processed_s3_key'] == 'raw/test-user-123/test.png'
+        assert values[':processed_version_id'] == 'v1'
+        assert values[':status_timestamp'] == 'APPROVED#2025-11-26T10:00:00'
+        
+        profanity_filter.APPROVAL_MODE = 'copy'
+        s3.copies, s3.tags, MockTable.updates = [], [], []
+        lambda_handler(event, {})
+        values = MockTable.updates[-1]['ExpressionAttributeValues']
+        assert s3.copies == ['multipart']
+        assert s3.tags == []
+        assert values[':processed_bucket'] == 'test-processed-bucket'
+        assert values[':processed_s3_key'] == 'processed/test-user-123/test.png'
+        assert ':processed_version_id' not in values
+    finally:
+        MockTable.get_item = original_get_item
+        profanity_filter.APPROVAL_MODE = 'tag'
+    print("\n✅ Test pasado!")
+
+def test_staged_moderation():
+    """early-reject no llama a Rekognition si la etapa local ya rechaza; full-report sí"""
+    print("\n=== TEST: Moderación por etapas ===\n")
+    
+    metadata = {'description': 'This contains badword1', 'game_title': 'Test Game'}
+    mock_rekognition.calls = []
+    is_appropriate, reasons = check_content(metadata, b'fake_image_data', 'test-raw-bucket', 'raw/test.png',
+                                            policy='early-reject')
+    assert not is_appropriate
+    assert mock_rekognition.calls == []
+    
+    is_appropriate, reasons = check_content(metadata, b'fake_image_data', 'test-raw-bucket', 'raw/test.png',
+                                            policy='full-report')
+    assert not is_appropriate
+    assert reasons == ['Inappropriate text in description: badword1']
+    assert sorted(mock_rekognition.calls) == ['detect_labels', 'detect_moderation_labels', 'detect_text']
+    
+    # Blocklist de hashes perceptuales (requiere Pillow)
+    if profanity_filter.Image is None:
+        print("Pillow no instalado, se omite la blocklist")
+    else:
+        from PIL import Image
+        import io
+        
+        image = Image.new('RGB', (320, 180))
+        for x in range(320):
+            for y in range(180):
+                image.putpixel((x, y), (x % 256, y, (x * y) % 256))
+        original = io.BytesIO()
+        image.save(original, format='PNG')
+        # La misma imagen reescalada y recomprimida como JPEG
+        variant = io.BytesIO()
+        image.resize((160, 90)).save(variant, format='JPEG', quality=70)
+        
+        original_blocklist = profanity_filter.blocked_hashes
+        profanity_filter.blocked_hashes = [profanity_filter.image_hash(original.getvalue())]
+        mock_rekognition.calls = []
+        clean = {'description': 'Clean description', 'game_title': 'Test Game'}
+        is_appropriate, reasons = check_content(clean, variant.getvalue(), 'test-raw-bucket', 'raw/test.jpg')
+        profanity_filter.blocked_hashes = original_blocklist
+        
+        print(f"Razones: {reasons}")
+        assert reasons == ['Image matches a previously blocked image']
+        assert mock_rekognition.calls == []
+    print("\n✅ Test pasado!")
+
 if __name__ == '__main__':
     print("🧪 Iniciando tests de ProfanityFilter...\n")
     
     try:
         test_filter_approved()
         test_filter_rejected()
+        test_single_moderation_call()
+        test_profanity_matcher()
+        test_staged_moderation()
+        test_s3_object_reference()
+        test_sqs_batch_partial_failure()
+        test_approval_modes()
         
         print("\n" + "="*50)
         print("✅ TODOS LOS TESTS PASARON")
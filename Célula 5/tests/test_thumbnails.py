@@ -0,0 +1,172 @@
+"""
+Test local para el handler de thumbnails (src/index.py)
+Simula el evento s3:ObjectCreated
+"""
+import io
+import sys
+import os
+
+# Configurar variables de entorno ANTES de importar
+os.environ['PROCESSED_BUCKET'] = 'test-processed-bucket'
+os.environ['METADATA_TABLE'] = 'test-metadata-table'
+os.environ['THUMBNAIL_SIZES'] = '128,256,512'
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src'))
+
+from PIL import Image
+
+# Mocks
+class MockS3:
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+    
+    def get_object(self, Bucket, Key):
+        print(f"[MOCK S3] Obteniendo de bucket: {Bucket}, key: {Key}")
+        data = self.objects[Key]
+        
+        class Body:
+            def read(self):
+                return data
+        return {'Body': Body()}
+    
+    def put_object(self, **kwargs):
+        print(f"[MOCK S3] Subiendo a bucket: {kwargs['Bucket']}, key: {kwargs['Key']}")
+        self.uploads[kwargs['Key']] = kwargs
+        return {}
+
+class MockDynamoDB:
+    def __init__(self):
+        self.items = {}
+    
+    def Table(self, name):
+        return self
+    
+    def put_item(self, Item):
+        print(f"[MOCK DynamoDB] Guardando item: {Item['screenshotId']}")
+        self.items[Item['screenshotId']] = Item
+        return {}
+
+mock_s3 = MockS3()
+mock_dynamodb = MockDynamoDB()
+
+import boto3
+boto3.client = lambda service, **kwargs: mock_s3
+boto3.resource = lambda service, **kwargs: mock_dynamodb
+
+from index import handler
+
+def encoded(image, image_format):
+    buffer = io.BytesIO()
+    image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+def s3_record(key):
+    return {'s3': {'bucket': {'name': 'test-raw-bucket'}, 'object': {'key': key}}}
+
+def test_thumbnails_all_records():
+    """Todos los registros del evento, varios tamaños WebP y dimensiones en el item"""
+    print("\n=== TEST: Thumbnails por registro ===\n")
+    
+    mock_s3.objects['PLAYER1/boss fight.jpg'] = encoded(Image.new('RGB', (1920, 1080), (200, 40, 40)), 'JPEG')
+    mock_s3.objects['PLAYER2/hud.png'] = encoded(Image.new('RGBA', (300, 600), (0, 0, 255, 128)), 'PNG')
+    
+    # La clave llega codificada en el evento (espacio como +)
+    response = handler({'Records': [s3_record('PLAYER1/boss+fight.jpg'), s3_record('PLAYER2/hud.png')]}, {})
+    assert response['statusCode'] == 200
+    
+    items = {item['playerId']: item for item in mock_dynamodb.items.values()}
+    assert set(items) == {'PLAYER1', 'PLAYER2'}
+    
+    jpeg = items['PLAYER1']
+    print(f"Thumbnails: {jpeg['thumbnails']}")
+    assert (jpeg['width'], jpeg['height']) == (1920, 1080)
+    assert sorted(jpeg['thumbnails'], key=int) == ['128', '256', '512']
+    assert (jpeg['thumbnails']['512']['width'], jpeg['thumbnails']['512']['height']) == (512, 288)
+    assert (jpeg['thumbnails']['128']['width'], jpeg['thumbnails']['128']['height']) == (128, 72)
+    assert jpeg['processedPath'] == 's3://test-processed-bucket/thumbnails/PLAYER1/boss fight.jpg/128.webp'
+    
+    for size, thumbnail in jpeg['thumbnails'].items():
+        upload = mock_s3.uploads[thumbnail['key']]
+        assert upload['ContentType'] == 'image/webp'
+        assert len(upload['Body']) == thumbnail['bytes']
+        with Image.open(io.BytesIO(upload['Body'])) as image:
+            assert image.format == 'WEBP'
+            assert image.size == (thumbnail['width'], thumbnail['height'])
+    
+    # Sin agrandar imágenes chicas; la transparencia se conserva
+    png = items['PLAYER2']
+    assert (png['thumbnails']['512']['width'], png['thumbnails']['512']['height']) == (256, 512)
+    with Image.open(io.BytesIO(mock_s3.uploads[png['thumbnails']['128']['key']]['Body'])) as image:
+        assert image.mode == 'RGBA'
+    
+    # Reintento del mismo archivo: se sobrescribe el item
+    handler({'Records': [s3_record('PLAYER2/hud.png')]}, {})
+    assert len(mock_dynamodb.items) == 2
+    print("\n✅ Test pasado!")
+
+def test_thumbnails_skip_and_failure():
+    """Los thumbnails no se reprocesan; un archivo inválido falla sin frenar al resto"""
+    print("\n=== TEST: Omitidos y fallidos ===\n")
+    
+    mock_dynamodb.items = {}
+    mock_s3.objects['PLAYER3/broken.png'] = b'not an image'
+    mock_s3.objects['PLAYER3/ok.png'] = encoded(Image.new('RGB', (800, 600)), 'PNG')
+    
+    try:
+        handler({'Records': [
+            s3_record('thumbnails/PLAYER1/boss+fight.jpg/128.webp'),
+            s3_record('PLAYER3/broken.png'),
+            s3_record('PLAYER3/ok.png')
+        ]}, {})
+        raise AssertionError('Se esperaba un error por el archivo inválido')
+    except RuntimeError as e:
+        print(f"Error esperado: {e}")
+        assert 'PLAYER3/broken.png' in str(e)
+    assert [item['originalPath'] for item in mock_dynamodb.items.values()] == ['s3://test-raw-bucket/PLAYER3/ok.png']
+    print("\n✅ Test pasado!")
+
+def test_thumbnails_same_stem():
+    """Mismo nombre con otra extensión, o carpeta con punto: cada archivo tiene sus thumbnails"""
+    print("\n=== TEST: Claves de thumbnails ===\n")
+    
+    mock_dynamodb.items = {}
+    mock_s3.objects['PLAYER1/foto.png'] = encoded(Image.new('RGB', (400, 300), (255, 0, 0)), 'PNG')
+    mock_s3.objects['PLAYER1/foto.jpg'] = encoded(Image.new('RGB', (300, 400), (0, 255, 0)), 'JPEG')
+    mock_s3.objects['PLAYER1.v2/foto'] = encoded(Image.new('RGB', (200, 200)), 'PNG')
+    
+    handler({'Records': [s3_record('PLAYER1/foto.png'), s3_record('PLAYER1/foto.jpg'),
+                         s3_record('PLAYER1.v2/foto')]}, {})
+    
+    items = {item['originalPath'].replace('s3://test-raw-bucket/', ''): item for item in mock_dynamodb.items.values()}
+    keys = {path: item['thumbnails']['128']['key'] for path, item in items.items()}
+    print(f"Claves: {keys}")
+    assert keys == {
+        'PLAYER1/foto.png': 'thumbnails/PLAYER1/foto.png/128.webp',
+        'PLAYER1/foto.jpg': 'thumbnails/PLAYER1/foto.jpg/128.webp',
+        'PLAYER1.v2/foto': 'thumbnails/PLAYER1.v2/foto/128.webp'
+    }
+    # Cada item apunta a un thumbnail con sus propias dimensiones
+    for path, item in items.items():
+        thumbnail = item['thumbnails']['512']
+        with Image.open(io.BytesIO(mock_s3.uploads[thumbnail['key']]['Body'])) as image:
+            assert image.size == (thumbnail['width'], thumbnail['height'])
+    print("\n✅ Test pasado!")
+
+if __name__ == '__main__':
+    print("🧪 Iniciando tests de thumbnails...\n")
+    
+    try:
+        test_thumbnails_all_records()
+        test_thumbnails_skip_and_failure()
+        test_thumbnails_same_stem()
+        
+        print("\n" + "="*50)
+        print("✅ TODOS LOS TESTS PASARON")
+        print("="*50)
+    except AssertionError as e:
+        print(f"\n❌ TEST FALLÓ: {e}")
+    except Exception as e:
+        print(f"\n❌ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
@@ -0,0 +1,215 @@
+"""
+Test local del flujo de subida directa a S3
+GenerateUploadUrl (API Gateway) y ConfirmUpload (evento s3:ObjectCreated)
+"""
+import json
+import sys
+import os
+from urllib.parse import urlparse, parse_qs
+
+# Configurar variables de entorno ANTES de importar
+os.environ['RAW_BUCKET'] = 'test-raw-bucket'
+os.environ['METADATA_TABLE'] = 'test-metadata-table'
+os.environ['SNS_TOPIC_ARN'] = 'arn:aws:sns:us-east-1:123456789:test-topic'
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+
+# Agregar el path de las lambdas
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../src/lambda'))
+
+import boto3
+from botocore.exceptions import ClientError
+
+def mock_create_multipart_upload(**kwargs):
+    print(f"[MOCK S3] Multipart en {kwargs['Key']} ({kwargs['ContentType']})")
+    return {'UploadId': 'mock-upload-id'}
+
+class MockDynamoDB:
+    def __init__(self):
+        self.items = {}
+    
+    def Table(self, name):
+        return MockTable(self.items)
+
+class MockTable:
+    def __init__(self, items):
+        self.items = items
+    
+    def put_item(self, Item):
+        self.items[Item['screenshot_id']] = dict(Item)
+        return {}
+    
+    def get_item(self, Key, **kwargs):
+        item = self.items.get(Key['screenshot_id'])
+        return {'Item': dict(item)} if item else {}
+    
+    def update_item(self, **kwargs):
+        item = self.items.get(kwargs['Key']['screenshot_id'])
+        values = kwargs['ExpressionAttributeValues']
+        retry = (item is not None and item['status'] == values[':processing']
+                 and item.get('raw_version_id') == values[':version'])
+        if (item is None or (item['status'] != values[':pending'] and not retry)
+                or item['user_id'] != values[':user_id'] or item['raw_s3_key'] != values[':key']):
+            raise ClientError({'Error': {'Code': 'ConditionalCheckFailedException', 'Message': 'Mock'}}, 'UpdateItem')
+        previous = {'status': item['status']}
+        item.update({'status': values[':status'], 'status_timestamp': values[':status_timestamp'],
+                     'file_size': values[':size'], 'raw_version_id': values[':version']})
+        return {'Attributes': previous}
+
+class MockSNS:
+    def __init__(self):
+        self.messages = []
+        self.failures = 0
+    
+    def publish(self, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise ClientError({'Error': {'Code': 'InternalError', 'Message': 'Mock'}}, 'Publish')
+        print(f"[MOCK SNS] Publicando a topic: {kwargs['TopicArn']}")
+        self.messages.append(json.loads(kwargs['Message']))
+        return {'MessageId': 'mock-message-id'}
+
+mock_dynamodb = MockDynamoDB()
+mock_sns = MockSNS()
+real_client = boto3.client
+# El cliente S3 real del módulo firma las URLs sin llamar a AWS (con su propia
+# configuración de firma); solo se simula CreateMultipartUpload
+boto3.client = lambda service, **kwargs: real_client(service, **kwargs) if service == 's3' else mock_sns
+boto3.resource = lambda service, **kwargs: mock_dynamodb
+
+import generate_upload_url
+import confirm_upload
+
+generate_upload_url.s3_client.create_multipart_upload = mock_create_multipart_upload
+
+def request_upload(filename, file_size):
+    event = {
+        'body': json.dumps({'filename': filename, 'file_size': file_size, 'game_title': 'Test Game'}),
+        'requestContext': {'authorizer': {'claims': {'sub': 'test-user-123'}}}
+    }
+    response = generate_upload_url.lambda_handler(event, None)
+    return response['statusCode'], json.loads(response['body'])
+
+def s3_event(key, size, version_id='v1'):
+    return {'Records': [{
+        'eventSource': 'aws:s3',
+        's3': {
+            'bucket': {'name': 'test-raw-bucket'},
+            'object': {'key': key, 'size': size, 'versionId': version_id}
+        }
+    }]}
+
+def test_single_upload():
+    """PUT pre-firmado con tipo y tamaño en la firma"""
+    print("\n=== TEST: URL pre-firmada (PUT) ===\n")
+    
+    status, body = request_upload('screenshot.JPG', 2 * 1024 * 1024)
+    assert status == 200, body
+    assert body['upload_type'] == 'single'
+    assert body['headers'] == {'Content-Type': 'image/jpeg'}
+    signed_headers = parse_qs(urlparse(body['upload_url']).query)['X-Amz-SignedHeaders'][0].split(';')
+    print(f"Headers firmados: {signed_headers}")
+    assert 'content-length' in signed_headers and 'content-type' in signed_headers
+    item = mock_dynamodb.items[body['screenshot_id']]
+    assert item['status'] == 'PENDING_UPLOAD'
+    assert item['status_timestamp'] == f"PENDING_UPLOAD#{item['upload_timestamp']}"
+    print("\n✅ Test pasado!")
+
+def test_multipart_upload():
+    """Sobre MULTIPART_THRESHOLD: una URL por parte y una para completar"""
+    print("\n=== TEST: Subida multipart ===\n")
+    
+    file_size = 12 * 1024 * 1024 + 100
+    status, body = request_upload('screenshot.png', file_size)
+    assert status == 200, body
+    assert body['upload_type'] == 'multipart'
+    assert [part['size'] for part in body['parts']] == [5 * 1024 * 1024, 5 * 1024 * 1024, 2 * 1024 * 1024 + 100]
+    for part in body['parts']:
+        signed_headers = parse_qs(urlparse(part['upload_url']).query)['X-Amz-SignedHeaders'][0].split(';')
+        assert 'content-length' in signed_headers
+    assert 'uploadId=mock-upload-id' in body['complete_url']
+    print("\n✅ Test pasado!")
+
+def test_invalid_requests():
+    """Tipo o tamaño fuera de los límites no reciben URL"""
+    print("\n=== TEST: Solicitudes inválidas ===\n")
+    
+    assert request_upload('malware.exe', 2048)[0] == 400
+    assert request_upload('screenshot.png', 100)[0] == 400
+    assert request_upload('screenshot.png', 16 * 1024 * 1024)[0] == 400
+    assert request_upload('screenshot.png', 'big')[0] == 400
+    print("\n✅ Test pasado!")
+
+def test_confirm_from_s3_event():
+    """El evento de S3 confirma una vez; otra versión o un screenshot ya moderado no vuelven a notificar"""
+    print("\n=== TEST: Confirmación por evento de S3 ===\n")
+    
+    status, body = request_upload('screenshot.png', 4096)
+    screenshot_id = body['screenshot_id']
+    mock_sns.messages = []
+    
+    confirm_upload.lambda_handler(s3_event(body['s3_key'], 4096), None)
+    item = mock_dynamodb.items[screenshot_id]
+    assert item['status'] == 'PROCESSING'
+    assert item['raw_version_id'] == 'v1'
+    assert item['status_timestamp'] == f"PROCESSING#{item['upload_timestamp']}"
+    assert mock_sns.messages == [{'screenshot_id': screenshot_id, 'user_id': 'test-user-123',
+                                  's3_key': body['s3_key'], 'bucket': 'test-raw-bucket'}]
+    
+    # Un segundo PUT con la misma URL crea otra versión que no se confirma
+    confirm_upload.lambda_handler(s3_event(body['s3_key'], 4096, version_id='v2'), None)
+    assert len(mock_sns.messages) == 1
+    assert mock_dynamodb.items[screenshot_id]['raw_version_id'] == 'v1'
+    
+    # Ya moderado: la entrega repetida del evento no vuelve a notificar
+    mock_dynamodb.items[screenshot_id]['status'] = 'APPROVED'
+    confirm_upload.lambda_handler(s3_event(body['s3_key'], 4096), None)
+    assert len(mock_sns.messages) == 1
+    
+    # Claves fuera de raw/{user_id}/ se ignoran
+    confirm_upload.lambda_handler(s3_event('other/file.png', 4096), None)
+    assert len(mock_sns.messages) == 1
+    print("\n✅ Test pasado!")
+
+def test_confirm_publish_retry():
+    """Si publish falla, el reintento del evento de S3 vuelve a publicar"""
+    print("\n=== TEST: Reintento tras fallo de SNS ===\n")
+    
+    status, body = request_upload('screenshot.png', 4096)
+    screenshot_id = body['screenshot_id']
+    mock_sns.messages = []
+    mock_sns.failures = 1
+    
+    try:
+        confirm_upload.lambda_handler(s3_event(body['s3_key'], 4096), None)
+        assert False, 'El fallo de publish debe propagarse para que S3 reintente'
+    except ClientError:
+        pass
+    assert mock_dynamodb.items[screenshot_id]['status'] == 'PROCESSING'
+    assert mock_sns.messages == []
+    
+    confirm_upload.lambda_handler(s3_event(body['s3_key'], 4096), None)
+    assert [message['screenshot_id'] for message in mock_sns.messages] == [screenshot_id]
+    assert mock_dynamodb.items[screenshot_id]['raw_version_id'] == 'v1'
+    print("\n✅ Test pasado!")
+
+if __name__ == '__main__':
+    print("🧪 Iniciando tests de subida directa a S3...\n")
+    
+    try:
+        test_single_upload()
+        test_multipart_upload()
+        test_invalid_requests()
+        test_confirm_from_s3_event()
+        test_confirm_publish_retry()
+        
+        print("\n" + "="*50)
+        print("✅ TODOS LOS TESTS PASARON")
+        print("="*50)
+    except AssertionError as e:
+        print(f"\n❌ TEST FALLÓ: {e}")
+    except Exception as e:
+        print(f"\n❌ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
@@ -26,20 +26,22 @@ $headers = @{
     "Content-Type" = "application/json"
 }
 
-# Step 1: Request pre-signed URL
+# Step 1: Request pre-signed URL (size and type are part of the signature)
 Write-Host "`nStep 1: Requesting upload URL..." -ForegroundColor Cyan
+$imageBytes = [System.IO.File]::ReadAllBytes($IMAGE_PATH)
+Write-Host "File size: $($imageBytes.Length) bytes" -ForegroundColor Yellow
+
 $requestBody = @{
     filename = $filename
     game_title = "ACME Labs"
     description = "Screenshot from game level 3-2"
-    content_type = $contentType
+    file_size = $imageBytes.Length
 } | ConvertTo-Json
 
 try {
     $urlResponse = Invoke-RestMethod -Uri "$API_ENDPOINT/request-upload" -Method POST -Headers $headers -Body $requestBody
-    Write-Host "Success! Screenshot ID: $($urlResponse.screenshot_id)" -ForegroundColor Green
+    Write-Host "Success! Screenshot ID: $($urlResponse.screenshot_id) ($($urlResponse.upload_type) upload)" -ForegroundColor Green
     $screenshotId = $urlResponse.screenshot_id
-    $uploadUrl = $urlResponse.upload_url
 } catch {
     Write-Host "Error requesting URL: $($_.Exception.Message)" -ForegroundColor Red
     if ($_.ErrorDetails.Message) {
@@ -51,37 +53,29 @@ try {
 # Step 2: Upload file directly to S3
 Write-Host "`nStep 2: Uploading file to S3..." -ForegroundColor Cyan
 try {
-    $imageBytes = [System.IO.File]::ReadAllBytes($IMAGE_PATH)
-    Write-Host "File size: $($imageBytes.Length) bytes" -ForegroundColor Yellow
-    
-    $uploadHeaders = @{
-        "Content-Type" = $contentType
+    if ($urlResponse.upload_type -eq "multipart") {
+        $completeParts = ""
+        foreach ($part in $urlResponse.parts) {
+            $offset = ($part.part_number - 1) * $urlResponse.part_size
+            $chunk = New-Object byte[] $part.size
+            [Array]::Copy($imageBytes, $offset, $chunk, 0, $part.size)
+            $partResponse = Invoke-WebRequest -Uri $part.upload_url -Method PUT -Body $chunk -UseBasicParsing
+            $etag = $partResponse.Headers["ETag"]
+            $completeParts += "<Part><PartNumber>$($part.part_number)</PartNumber><ETag>$etag</ETag></Part>"
+            Write-Host "  Part $($part.part_number)/$($urlResponse.parts.Count) uploaded" -ForegroundColor Yellow
+        }
+        $completeBody = "<CompleteMultipartUpload>$completeParts</CompleteMultipartUpload>"
+        Invoke-RestMethod -Uri $urlResponse.complete_url -Method POST -Body $completeBody -ContentType "application/xml"
+    } else {
+        Invoke-RestMethod -Uri $urlResponse.upload_url -Method PUT -Body $imageBytes -ContentType $contentType
     }
-    
-    Invoke-RestMethod -Uri $uploadUrl -Method PUT -Headers $uploadHeaders -Body $imageBytes -ContentType $contentType
     Write-Host "Success! File uploaded to S3" -ForegroundColor Green
 } catch {
     Write-Host "Error uploading to S3: $($_.Exception.Message)" -ForegroundColor Red
     exit
 }
 
-# Step 3: Confirm upload and trigger processing
-Write-Host "`nStep 3: Confirming upload..." -ForegroundColor Cyan
-$confirmBody = @{
-    screenshot_id = $screenshotId
-} | ConvertTo-Json
-
-try {
-    $confirmResponse = Invoke-RestMethod -Uri "$API_ENDPOINT/confirm-upload" -Method POST -Headers $headers -Body $confirmBody
-    Write-Host "Success!" -ForegroundColor Green
-    Write-Host "Status: $($confirmResponse.status)" -ForegroundColor Green
-    Write-Host "Message: $($confirmResponse.message)" -ForegroundColor Green
-} catch {
-    Write-Host "Error confirming upload: $($_.Exception.Message)" -ForegroundColor Red
-    if ($_.ErrorDetails.Message) {
-        Write-Host "Details: $($_.ErrorDetails.Message)" -ForegroundColor Red
-    }
-}
-
+# Processing starts automatically: S3 triggers confirm_upload when the upload completes
 Write-Host "`n=== Upload Complete ===" -ForegroundColor Cyan
 Write-Host "Screenshot ID: $screenshotId" -ForegroundColor Green
+Write-Host "Processing started by S3 event (check status with GET /screenshots)" -ForegroundColor Green